@@ -0,0 +1,172 @@
+"""Portfolio allocation optimizer for the Sandbox.
+
+Picks whole deals to maximize lifetime tCO2e avoided subject to a budget, a
+minimum blended IRR and a maximum blended risk score. Blends are weighted by
+investment, and risk scores are derived_metrics.RISK_SCORES (1 = Low ...
+4 = High).
+
+Every solve scores a fixed set of candidate portfolios against the
+constraints in one vectorized pass:
+
+- up to EXACT_MAX_DEALS deals, every subset, so the answer is exact
+- beyond that, the deals are ranked by blends of impact per dollar, IRR and
+  (low) risk, one ranking per weight on a simplex grid. This is the ordering
+  a Lagrangian relaxation of the IRR and risk constraints produces. The
+  candidates are every prefix of every ranking, and the best feasible one is
+  topped up with any later deal that still fits.
+
+The candidates depend only on the deals, not on the constraints, so
+`candidates` is built once per dataset and each solve is a few array
+comparisons. The efficient frontier re-solves for a range of IRR floors in
+the same pass.
+"""
+import numpy as np
+import pandas as pd
+
+import derived_metrics
+
+EXACT_MAX_DEALS = 16
+# Simplex grid resolution of the ranking weights, lowered for very large
+# universes so rankings x deals stays under MAX_CANDIDATES
+WEIGHT_STEPS = 12
+MAX_CANDIDATES = 5_000_000
+FRONTIER_POINTS = 15
+# Tolerance for the constraint comparisons
+EPSILON = 1e-9
+
+
+def deal_arrays(sandbox_df):
+    return {
+        "investment": sandbox_df["Investment ($M)"].to_numpy(dtype=float),
+        "impact": sandbox_df["Lifetime tCO2e Avoided (M)"].to_numpy(dtype=float),
+        "irr": sandbox_df["IRR (%)"].to_numpy(dtype=float),
+        "risk": sandbox_df["Risk Rating"].astype(str).map(derived_metrics.RISK_SCORES).to_numpy(dtype=float),
+    }
+
+
+def _standardize(values):
+    spread = values.std()
+    return (values - values.mean()) / spread if spread > 0 else np.zeros_like(values)
+
+
+def _rankings(deals):
+    efficiency = deals["impact"] / deals["investment"]
+    signals = np.vstack([_standardize(efficiency), _standardize(deals["irr"]), -_standardize(deals["risk"])])
+    steps = WEIGHT_STEPS
+    while steps > 1 and (steps + 1) * (steps + 2) // 2 * len(efficiency) > MAX_CANDIDATES:
+        steps -= 1
+    weights = np.array([
+        (a, b, steps - a - b)
+        for a in range(steps + 1) for b in range(steps + 1 - a)
+    ], dtype=float) / steps
+    return np.argsort(-(weights @ signals), axis=1, kind="stable")
+
+
+def candidates(deals):
+    """Candidate portfolios and their totals, for `solve` and `frontier`."""
+    n = len(deals["investment"])
+    values = np.vstack([
+        deals["investment"],
+        deals["impact"],
+        deals["investment"] * deals["irr"],
+        deals["investment"] * deals["risk"],
+    ])
+    if n <= EXACT_MAX_DEALS:
+        subsets = (np.arange(1 << n)[:, None] >> np.arange(n)) & 1
+        totals = subsets.astype(float) @ values.T
+        rankings = None
+    else:
+        rankings = _rankings(deals)
+        # Row k, column p: the first p + 1 deals of ranking k
+        totals = np.stack([np.cumsum(row[rankings], axis=1).ravel() for row in values], axis=1)
+        # The empty portfolio is always a candidate
+        totals = np.vstack([np.zeros(4), totals])
+    return {
+        "deals": deals,
+        "rankings": rankings,
+        "investment": totals[:, 0],
+        "impact": totals[:, 1],
+        "irr_dollars": totals[:, 2],
+        "risk_dollars": totals[:, 3],
+    }
+
+
+def _feasible(cands, budget, min_irr, max_risk):
+    investment = cands["investment"]
+    feasible = investment <= budget + EPSILON
+    if min_irr is not None:
+        feasible &= cands["irr_dollars"] >= min_irr * investment - EPSILON
+    if max_risk is not None:
+        feasible &= cands["risk_dollars"] <= max_risk * investment + EPSILON
+    return feasible
+
+
+def _selection(cands, index, budget, min_irr, max_risk):
+    deals = cands["deals"]
+    n = len(deals["investment"])
+    if cands["rankings"] is None:
+        return ((index >> np.arange(n)) & 1).astype(bool)
+    selected = np.zeros(n, dtype=bool)
+    if index == 0:
+        return selected
+    ranking, last = divmod(index - 1, n)
+    order = cands["rankings"][ranking]
+    selected[order[:last + 1]] = True
+    # Top up with later deals of the same ranking that keep every constraint
+    investment = cands["investment"][index]
+    irr_dollars = cands["irr_dollars"][index]
+    risk_dollars = cands["risk_dollars"][index]
+    for deal in order[last + 1:]:
+        amount = deals["investment"][deal]
+        total = investment + amount
+        if total > budget + EPSILON:
+            continue
+        if min_irr is not None and irr_dollars + amount * deals["irr"][deal] < min_irr * total - EPSILON:
+            continue
+        if max_risk is not None and risk_dollars + amount * deals["risk"][deal] > max_risk * total + EPSILON:
+            continue
+        selected[deal] = True
+        investment, irr_dollars = total, irr_dollars + amount * deals["irr"][deal]
+        risk_dollars += amount * deals["risk"][deal]
+    return selected
+
+
+def summarize(deals, selected):
+    investment = deals["investment"][selected].sum()
+    return {
+        "selected": selected,
+        "deals": int(selected.sum()),
+        "investment": investment,
+        "impact": deals["impact"][selected].sum(),
+        "irr": (deals["investment"] * deals["irr"])[selected].sum() / investment if investment else np.nan,
+        "risk": (deals["investment"] * deals["risk"])[selected].sum() / investment if investment else np.nan,
+    }
+
+
+def solve(cands, budget, min_irr=None, max_risk=None):
+    """The feasible portfolio with the most impact, as `summarize` returns it."""
+    feasible = _feasible(cands, budget, min_irr, max_risk)
+    # Among equal impact, the cheaper portfolio
+    score = np.where(feasible, cands["impact"] - EPSILON * cands["investment"], -np.inf)
+    best = int(np.argmax(score))
+    return summarize(cands["deals"], _selection(cands, best, budget, min_irr, max_risk))
+
+
+def frontier(cands, budget, max_risk=None, points=FRONTIER_POINTS):
+    """Most impact for a range of IRR floors: one row per distinct portfolio,
+    from the highest impact to the highest blended IRR."""
+    deals = cands["deals"]
+    floors = np.linspace(deals["irr"].min(), deals["irr"].max(), points)
+    base = _feasible(cands, budget, None, max_risk)
+    # (floors, candidates): which candidates meet each floor
+    meets = cands["irr_dollars"][None, :] >= floors[:, None] * cands["investment"][None, :] - EPSILON
+    score = np.where(base[None, :] & meets, cands["impact"] - EPSILON * cands["investment"], -np.inf)
+    rows = []
+    for row, (floor, best) in enumerate(zip(floors, np.argmax(score, axis=1))):
+        if not np.isfinite(score[row, best]):
+            continue  # no portfolio reaches this floor
+        result = summarize(deals, _selection(cands, int(best), budget, floor, max_risk))
+        if result["deals"]:
+            rows.append({key: result[key] for key in ("irr", "impact", "investment", "deals")})
+    frame = pd.DataFrame(rows, columns=["irr", "impact", "investment", "deals"])
+    return frame.drop_duplicates().sort_values("irr").reset_index(drop=True)
@@ -0,0 +1,185 @@
+"""Portfolio computations behind each section of the dashboard.
+
+Everything here works on plain DataFrames and has no Streamlit dependency, so
+the same code paths can be exercised headlessly (see benchmark.py). Portfolio
+totals and sector/stage rollups are read from the aggregate cubes built in
+portfolio_cube.py rather than regrouping the raw rows.
+"""
+import numpy as np
+import pandas as pd
+
+import derived_metrics
+import filter_masks
+import portfolio_cube
+import search_index
+from portfolio_cube import COUNT
+
+CLIMATE_VC_BENCHMARK = 4.0  # K tCO2e per $1M, climate-focused VCs
+
+# ---------- REAL PORTFOLIO ----------
+def build_real_cube(real_df):
+    return portfolio_cube.build_cube(real_df, portfolio_cube.REAL_DIMENSIONS, portfolio_cube.REAL_MEASURES)
+
+
+def build_real_masks(real_df):
+    return filter_masks.build_filter_masks(real_df, portfolio_cube.REAL_DIMENSIONS)
+
+
+def build_sandbox_cube(sandbox_df):
+    return portfolio_cube.build_cube(sandbox_df, portfolio_cube.SANDBOX_DIMENSIONS, portfolio_cube.SANDBOX_MEASURES)
+
+
+def hero_metrics(real_cube):
+    return {
+        "total_funding": real_cube["funding_raised_m"].sum(),
+        "total_companies": int(real_cube[COUNT].sum()),
+        "total_impact": real_cube["estimated_annual_tco2e_avoided_k"].sum(),
+        "total_employees": real_cube["employees"].sum(),
+    }
+
+
+def portfolio_efficiency(real_cube, totals):
+    total_funding = totals["total_funding"]
+    total_impact = totals["total_impact"]
+    total_employees = totals["total_employees"]
+
+    impact_per_funding = total_impact / total_funding  # K tCO2e per $M
+
+    # Portfolio concentration (Herfindahl index)
+    sector_impact_pct = portfolio_cube.rollup(real_cube, 'sector', 'estimated_annual_tco2e_avoided_k') / total_impact
+    herfindahl = (sector_impact_pct ** 2).sum()
+
+    return {
+        "impact_per_funding": impact_per_funding,
+        "impact_per_employee": total_impact / total_employees,  # K tCO2e per employee
+        "funding_per_employee": total_funding / total_employees,  # $M per employee
+        "benchmark_comparison": ((impact_per_funding / CLIMATE_VC_BENCHMARK) - 1) * 100,
+        "diversification_score": (1 - herfindahl) * 100,
+    }
+
+
+def impact_attribution(real_cube):
+    sector_attribution = portfolio_cube.rollup(real_cube, 'sector', 'estimated_annual_tco2e_avoided_k').sort_values(ascending=False)
+    stage_attribution = portfolio_cube.rollup(real_cube, 'investment_stage', 'estimated_annual_tco2e_avoided_k').sort_values(ascending=False)
+    return sector_attribution, stage_attribution
+
+
+def filter_portfolio(real_df, filters=None, search_term="", index=None, masks=None):
+    """Rows matching `filters` (dimension -> value or list) and `search_term`.
+
+    With precomputed `masks` (filter_masks.py) and a search `index`
+    (search_index.py) nothing scans the frame: the selection is applied as a
+    single `take`, search matches keep their rank order, and an unfiltered
+    portfolio is returned as-is rather than copied. Callers must not modify
+    the result in place.
+    """
+    if masks is not None:
+        selected = filter_masks.select(masks, filters)
+    else:
+        selected = filter_masks.row_mask(real_df, filters)
+
+    if search_term and index is not None:
+        positions = search_index.search(index, search_term)
+        if selected is not None:
+            positions = positions[selected[positions]]
+        return real_df.take(positions)
+
+    if search_term:
+        matches = (
+            real_df["company"].str.contains(search_term, case=False, na=False) |
+            real_df["notes"].str.contains(search_term, case=False, na=False)
+        ).to_numpy()
+        selected = matches if selected is None else selected & matches
+    if selected is None:
+        return real_df
+    return real_df.take(np.flatnonzero(selected))
+
+
+def sector_totals(df, column, sector_column="sector"):
+    return df.groupby(sector_column, observed=True)[column].sum().sort_values(ascending=True)
+
+
+def filtered_sector_totals(real_cube, filtered_df, column, filters=None, search_term=""):
+    # Free-text matches are row-level and can't be read off the cube, so a
+    # search groups its (small) match set directly
+    if search_term:
+        return sector_totals(filtered_df, column)
+    return portfolio_cube.rollup(real_cube, "sector", column, filters).sort_values(ascending=True)
+
+
+def cube_sector_totals(cube, column, sector_column="sector"):
+    return portfolio_cube.rollup(cube, sector_column, column).sort_values(ascending=True)
+
+
+def materiality_scores(filtered_df, real_metrics, financial_scores):
+    # Financial performance is the synthetic score from scoring.py, computed
+    # for the whole portfolio; the matrix shows the filtered companies' rows
+    rows = derived_metrics.rows_for(real_metrics, filtered_df)
+    scores = derived_metrics.rows_for(financial_scores, filtered_df)
+    return pd.DataFrame({
+        'company': filtered_df['company'],
+        'sector': filtered_df['sector'],
+        'funding_raised_m': filtered_df['funding_raised_m'],
+        'impact_performance': rows['impact_per_funding'],  # tCO2e per $M invested
+        'stage_score': scores['stage_score'],
+        'funding_efficiency_score': scores['funding_efficiency_score'],
+        'sector_multiplier': scores['sector_multiplier'],
+        'financial_performance': scores['financial_performance'],
+    })
+
+
+def materiality_quadrants(scored):
+    median_financial = scored['financial_performance'].median()
+    median_impact = scored['impact_performance'].median()
+    stars = scored[
+        (scored['financial_performance'] > median_financial) &
+        (scored['impact_performance'] > median_impact)
+    ]
+    impact_leaders = scored[
+        (scored['financial_performance'] <= median_financial) &
+        (scored['impact_performance'] > median_impact)
+    ]
+    return median_financial, median_impact, stars, impact_leaders
+
+
+# ---------- SANDBOX ----------
+def sandbox_summary(sandbox_df, sandbox_cube):
+    total_investment = portfolio_cube.total(sandbox_cube, "Investment ($M)")
+    total_impact = portfolio_cube.total(sandbox_cube, "Lifetime tCO2e Avoided (M)")
+    return {
+        "total_investment": total_investment,
+        "avg_irr": portfolio_cube.mean(sandbox_cube, "IRR (%)"),
+        "total_impact": total_impact,
+        "avg_payback": portfolio_cube.mean(sandbox_cube, "Payback Period (years)"),
+        "portfolio_efficiency": (total_impact * 1000) / total_investment,
+        "high_irr_count": int((sandbox_df["IRR (%)"] > 20).sum()),
+    }
+
+
+def sandbox_display_frame(sandbox_df, sandbox_metrics):
+    display_df = sandbox_df.copy()
+    display_df["Impact Efficiency"] = sandbox_metrics["impact_efficiency"]
+    display_df["Annual Impact (K)"] = display_df["Annual tCO2e Avoided (K)"]
+    return display_df
+
+
+def sandbox_benchmarks(sandbox_cube, sandbox_metrics):
+    return {
+        "avg_irr": portfolio_cube.mean(sandbox_cube, "IRR (%)"),
+        "avg_payback": portfolio_cube.mean(sandbox_cube, "Payback Period (years)"),
+        "avg_efficiency": sandbox_metrics["impact_efficiency"].mean(),
+    }
+
+
+# ---------- INVESTMENT THESIS ----------
+THESIS_CRITERIA = ["Hardware+Software", "Capital Efficiency", "Data Markets"]
+
+
+def thesis_display_frame(thesis_df):
+    display_thesis = thesis_df.copy()
+    display_thesis["Total Score"] = display_thesis["Hardware+Software"] + display_thesis["Capital Efficiency"] + display_thesis["Data Markets"]
+    return display_thesis
+
+
+def criteria_totals(display_thesis):
+    return {criterion: display_thesis[criterion].sum() for criterion in THESIS_CRITERIA}
@@ -1,7 +1,32 @@
+import functools
+import math
+import secrets
+import uuid
+from concurrent.futures import as_completed
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+
+import allocation
+import analytics
+import cashflows
+import chart_cache
+import chart_specs
+import charts
+import company_bundles
+import components
+import derived_metrics
+import impact_memo
+import paged_table
+import perf_trace
+import reference_data
+import render_pool
+import scenarios
+import scoring
+import sensitivity
+import snapshot_history
+import table_export
+from portfolio_store import dataset_version, load_dataset, source_path, source_stamp
+from search_index import build_search_index
 
 # ---------- CONFIG ----------
 st.set_page_config(
@@ -10,464 +35,175 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# ---------- CUSTOM CSS FOR VISUAL POLISH ----------
-st.markdown("""
-<style>
-/* ============================================
-   GALVANIZE INSIGHTS DASHBOARD - DESIGN SYSTEM
-   Modern, vibrant, professional SaaS aesthetic
-   ============================================ */
-
-/* Color Palette */
-:root {
-    /* Primary Colors */
-    --primary-blue: #2563EB;
-    --primary-blue-light: #3B82F6;
-    --primary-blue-dark: #1E40AF;
-    
-    /* Secondary Colors */
-    --secondary-purple: #8B5CF6;
-    --secondary-purple-light: #A78BFA;
-    --secondary-purple-dark: #7C3AED;
-    
-    /* Accent Colors */
-    --accent-green: #059669;
-    --accent-green-light: #10B981;
-    --accent-green-dark: #047857;
-    
-    --accent-orange: #F59E0B;
-    --accent-teal: #14B8A6;
-    
-    /* Neutral Colors */
-    --gray-50: #F9FAFB;
-    --gray-100: #F3F4F6;
-    --gray-200: #E5E7EB;
-    --gray-300: #D1D5DB;
-    --gray-400: #9CA3AF;
-    --gray-500: #6B7280;
-    --gray-600: #4B5563;
-    --gray-700: #374151;
-    --gray-800: #1F2937;
-    --gray-900: #111827;
-    
-    /* Semantic Colors */
-    --success: #10B981;
-    --warning: #F59E0B;
-    --error: #EF4444;
-    --info: #3B82F6;
-    
-    /* Background Colors */
-    --bg-primary: #FFFFFF;
-    --bg-secondary: #F9FAFB;
-    --bg-tertiary: #F3F4F6;
-    
-    /* Text Colors */
-    --text-primary: #111827;
-    --text-secondary: #6B7280;
-    --text-tertiary: #9CA3AF;
-    
-    /* Border Colors */
-    --border-light: #E5E7EB;
-    --border-medium: #D1D5DB;
-    --border-dark: #9CA3AF;
-    
-    /* Shadows */
-    --shadow-sm: 0 1px 2px 0 rgba(0, 0, 0, 0.05);
-    --shadow-md: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-    --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-    --shadow-xl: 0 20px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-    
-    /* Border Radius */
-    --radius-sm: 6px;
-    --radius-md: 12px;
-    --radius-lg: 16px;
-    --radius-xl: 24px;
-    
-    /* Spacing */
-    --space-xs: 4px;
-    --space-sm: 8px;
-    --space-md: 16px;
-    --space-lg: 24px;
-    --space-xl: 32px;
-    --space-2xl: 48px;
-    
-    /* Typography */
-    --font-sans: -apple-system, BlinkMacSystemFont, "Segoe UI", "Inter", "Poppins", "Roboto", "Helvetica Neue", Arial, sans-serif;
-    --font-mono: "SF Mono", Monaco, "Cascadia Code", "Roboto Mono", Consolas, "Courier New", monospace;
-}
-
-/* Global Styles */
-.stApp {
-    background-color: var(--bg-secondary);
-    font-family: var(--font-sans);
-}
-
-/* Typography */
-h1, h2, h3, h4, h5, h6 {
-    font-family: var(--font-sans);
-    color: var(--text-primary);
-    font-weight: 700;
-}
-
-p, span, div {
-    color: var(--text-secondary);
-    font-family: var(--font-sans);
-}
-
-/* Streamlit Overrides */
-.stMarkdown {
-    color: var(--text-secondary);
-}
-
-/* Sidebar Styling */
-section[data-testid="stSidebar"] {
-    background-color: var(--bg-primary);
-    border-right: 1px solid var(--border-light);
-    padding: var(--space-lg);
-}
-
-/* Radio button container */
-section[data-testid="stSidebar"] .stRadio {
-    background-color: transparent;
-}
-
-/* Individual radio option */
-section[data-testid="stSidebar"] .stRadio > div[role="radiogroup"] > label {
-    background-color: transparent !important;
-    padding: var(--space-sm) 0;
-    margin-bottom: var(--space-xs);
-    border: none !important;
-    cursor: pointer;
-    transition: all 0.2s ease;
-}
-
-section[data-testid="stSidebar"] .stRadio > div[role="radiogroup"] > label:hover {
-    background-color: var(--gray-50) !important;
-    border-radius: var(--radius-sm);
-    padding-left: var(--space-sm);
-}
-
-/* Radio button circle */
-section[data-testid="stSidebar"] .stRadio [data-baseweb="radio"] {
-    background-color: transparent !important;
-}
-
-/* Selected radio button */
-section[data-testid="stSidebar"] .stRadio input[type="radio"]:checked + div {
-    background-color: var(--primary-blue) !important;
-}
-
-/* Main Content Area */
-.main .block-container {
-    padding: var(--space-2xl) var(--space-xl);
-    max-width: 1400px;
-}
-
-/* Card Styles */
-.metric-card {
-    background: var(--bg-primary);
-    border-radius: var(--radius-lg);
-    padding: var(--space-lg);
-    box-shadow: var(--shadow-md);
-    border: 1px solid var(--border-light);
-    transition: all 0.3s ease;
-    height: 100%;
-}
-
-.metric-card:hover {
-    transform: translateY(-4px);
-    box-shadow: var(--shadow-xl);
-}
-
-.chart-card {
-    background: var(--bg-primary);
-    border-radius: var(--radius-lg);
-    padding: var(--space-xl);
-    box-shadow: var(--shadow-md);
-    border: 1px solid var(--border-light);
-    margin-bottom: var(--space-lg);
-}
-
-.methodology-card {
-    background: var(--bg-primary);
-    border-radius: var(--radius-lg);
-    padding: 0;
-    box-shadow: var(--shadow-lg);
-    border: 1px solid var(--border-light);
-    overflow: hidden;
-}
-
-.methodology-header {
-    background: linear-gradient(135deg, var(--primary-blue) 0%, var(--primary-blue-dark) 100%);
-    color: white;
-    padding: var(--space-lg);
-    font-size: 1.25rem;
-    font-weight: 700;
-}
-
-.methodology-body {
-    padding: var(--space-xl);
-}
-
-/* Section Headers */
-.section-header {
-    font-size: 1.5rem;
-    font-weight: 700;
-    color: var(--text-primary);
-    margin-bottom: var(--space-lg);
-    padding-bottom: var(--space-md);
-    border-bottom: 2px solid var(--border-light);
-}
-
-/* Metric Display */
-.metric-value {
-    font-size: 3rem;
-    font-weight: 800;
-    line-height: 1;
-    margin: var(--space-md) 0;
-}
-
-.metric-value.blue {
-    color: var(--primary-blue);
-}
-
-.metric-value.purple {
-    color: var(--secondary-purple);
-}
-
-.metric-value.green {
-    color: var(--accent-green);
-}
-
-.metric-label {
-    font-size: 0.875rem;
-    font-weight: 600;
-    color: var(--text-secondary);
-    text-transform: uppercase;
-    letter-spacing: 0.05em;
-}
-
-.metric-sublabel {
-    font-size: 0.875rem;
-    color: var(--text-tertiary);
-    margin-top: var(--space-xs);
-}
-
-/* Trend Badge */
-.trend-badge {
-    display: inline-flex;
-    align-items: center;
-    gap: var(--space-xs);
-    padding: var(--space-xs) var(--space-sm);
-    border-radius: var(--radius-sm);
-    font-size: 0.75rem;
-    font-weight: 600;
-    margin-top: var(--space-sm);
-}
-
-.trend-badge.positive {
-    background-color: rgba(5, 150, 105, 0.1);
-    color: var(--accent-green);
-}
+# ---------- PERFORMANCE TRACE ----------
+# Per-section timings of this session's reruns (see perf_trace.py)
+if "perf_trace" not in st.session_state:
+    st.session_state.perf_trace = perf_trace.Trace(session=uuid.uuid4().hex[:8])
+trace = st.session_state.perf_trace
+trace.begin("script")
 
-.trend-badge.negative {
-    background-color: rgba(239, 68, 68, 0.1);
-    color: var(--error);
-}
-
-/* Status Badges */
-.status-badge {
-    display: inline-block;
-    padding: var(--space-xs) var(--space-md);
-    border-radius: var(--radius-sm);
-    font-size: 0.75rem;
-    font-weight: 600;
-    text-transform: uppercase;
-    letter-spacing: 0.05em;
-}
-
-.status-badge.active {
-    background-color: rgba(16, 185, 129, 0.1);
-    color: var(--success);
-}
-
-.status-badge.exited {
-    background-color: rgba(107, 114, 128, 0.1);
-    color: var(--gray-600);
-}
-
-.status-badge.watchlist {
-    background-color: rgba(245, 158, 11, 0.1);
-    color: var(--warning);
-}
-
-/* Framework Badges */
-.framework-badge {
-    display: inline-flex;
-    align-items: center;
-    gap: var(--space-sm);
-    padding: var(--space-md);
-    background-color: var(--bg-secondary);
-    border-radius: var(--radius-md);
-    border: 1px solid var(--border-light);
-}
-
-.framework-badge img {
-    width: 32px;
-    height: 32px;
-}
-
-.framework-badge-text {
-    font-weight: 600;
-    color: var(--text-primary);
-}
-
-/* Tables */
-.dataframe {
-    border: none !important;
-    border-radius: var(--radius-md);
-    overflow: hidden;
-    box-shadow: var(--shadow-sm);
-}
-
-.dataframe thead tr th {
-    background-color: var(--gray-50);
-    color: var(--text-primary);
-    font-weight: 600;
-    text-transform: uppercase;
-    font-size: 0.75rem;
-    letter-spacing: 0.05em;
-    padding: var(--space-md);
-    border-bottom: 2px solid var(--border-medium);
-}
-
-.dataframe tbody tr {
-    border-bottom: 1px solid var(--border-light);
-    transition: background-color 0.2s ease;
-}
-
-.dataframe tbody tr:hover {
-    background-color: var(--gray-50);
-}
-
-.dataframe tbody tr td {
-    padding: var(--space-md);
-    color: var(--text-secondary);
-}
-
-/* Charts */
-.stPlotlyChart {
-    background-color: var(--bg-primary);
-    border-radius: var(--radius-md);
-    padding: var(--space-md);
-}
-
-/* Buttons */
-.stButton > button {
-    background-color: var(--primary-blue);
-    color: white;
-    border: none;
-    border-radius: var(--radius-md);
-    padding: var(--space-md) var(--space-xl);
-    font-weight: 600;
-    transition: all 0.2s ease;
-    box-shadow: var(--shadow-sm);
-}
-
-.stButton > button:hover {
-    background-color: var(--primary-blue-dark);
-    transform: translateY(-2px);
-    box-shadow: var(--shadow-md);
-}
-
-/* Select Boxes */
-.stSelectbox > div > div {
-    border-radius: var(--radius-md);
-    border-color: var(--border-medium);
-}
-
-/* Expanders */
-.streamlit-expanderHeader {
-    background-color: var(--bg-secondary);
-    border-radius: var(--radius-md);
-    border: 1px solid var(--border-light);
-    padding: var(--space-md);
-    font-weight: 600;
-}
-
-/* Dividers */
-hr {
-    border: none;
-    border-top: 1px solid var(--border-light);
-    margin: var(--space-xl) 0;
-}
-
-/* Utility Classes */
-.text-center {
-    text-align: center;
-}
-
-.text-right {
-    text-align: right;
-}
-
-.mb-sm {
-    margin-bottom: var(--space-sm);
-}
-
-.mb-md {
-    margin-bottom: var(--space-md);
-}
-
-.mb-lg {
-    margin-bottom: var(--space-lg);
-}
-
-.mt-sm {
-    margin-top: var(--space-sm);
-}
-
-.mt-md {
-    margin-top: var(--space-md);
-}
-
-.mt-lg {
-    margin-top: var(--space-lg);
-}
-
-/* Responsive Design */
-@media (max-width: 768px) {
-    .main .block-container {
-        padding: var(--space-lg) var(--space-md);
-    }
-    
-    .metric-value {
-        font-size: 2rem;
-    }
-}
-
-</style>
-""", unsafe_allow_html=True)
+# ---------- CUSTOM CSS FOR VISUAL POLISH ----------
+components.stylesheet()
 
 # ---------- LOAD DATA ----------
-@st.cache_data
-def load_real_portfolio():
-    df = pd.read_csv("galvanize_portfolio_live_corrected.csv")
+# CSVs are converted once to typed Arrow files (see portfolio_store.py) and
+# memory-mapped on later loads. Each loader is keyed on the file's mtime and
+# content hash, so edits to a CSV show up on the next rerun without a restart.
+# The frames are resources shared by every session, not cached data, which
+# st.cache_data would unpickle into a full copy on each rerun; treat them as
+# read-only.
+DATA_TTL_SECONDS = 15 * 60
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_real_portfolio(version):
+    df = load_dataset("real")
     return df
 
-@st.cache_data
-def load_sandbox_portfolio():
-    df = pd.read_csv("galvanize_sandbox_portfolio.csv")
+# The sandbox version covers both the deals and their cash-flow schedules:
+# IRR and payback come from the schedules where a company has one (see
+# cashflows.py)
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_sandbox_portfolio(version):
+    df = cashflows.apply_schedules(load_dataset("sandbox"), load_dataset("cashflows"))
     return df
 
-@st.cache_data
-def load_investment_scores():
-    df = pd.read_csv("investment_thesis_scores.csv")
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_investment_scores(version):
+    df = load_dataset("thesis")
     return df
 
-real_df = load_real_portfolio()
-sandbox_df = load_sandbox_portfolio()
-thesis_df = load_investment_scores()
+# Sector/stage rollups come from a small aggregate cube built once per
+# dataset version (see portfolio_cube.py)
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_real_cube(version):
+    return analytics.build_real_cube(load_real_portfolio(version))
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_sandbox_cube(version):
+    return analytics.build_sandbox_cube(load_sandbox_portfolio(version))
+
+# The company search box reads an inverted index (see search_index.py). It is
+# a read-only set of arrays shared by every session, like the frames.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_search_index(real_version, thesis_version):
+    return build_search_index(load_real_portfolio(real_version), load_investment_scores(thesis_version))
+
+# Per-company ratios and score inputs for the whole portfolio
+# (see derived_metrics.py); views read their rows instead of recomputing them
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_real_metrics(version):
+    return derived_metrics.build_real_metrics(load_real_portfolio(version))
+
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_sandbox_metrics(version):
+    return derived_metrics.build_sandbox_metrics(load_sandbox_portfolio(version))
+
+# Synthetic financial score for the whole portfolio (see scoring.py), cached
+# per weight set so moving a slider back to an earlier setting is free
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=16)
+def load_financial_scores(version, weights):
+    return scoring.score_portfolio(load_real_portfolio(version), load_real_metrics(version), dict(weights))
+
+# Per-value row bitsets for the sector/stage/country/lever filters
+# (see filter_masks.py), shared the same way
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_real_masks(version):
+    return analytics.build_real_masks(load_real_portfolio(version))
+
+# Deep-dive values for every company of a filtered view (see
+# company_bundles.py), so switching companies is a lookup. The view is fully
+# determined by the version, filters and search term, so those are the key.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=8)
+def load_company_bundles(version, filters, search_term, _filtered_df, _real_metrics):
+    return company_bundles.build_company_bundles(_filtered_df, _real_metrics)
+
+# Cash flows of every sandbox company as a (companies, years) array, so the
+# drill-down reads a company's schedule by position
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_cashflow_matrix(version):
+    return cashflows.schedule_matrix(load_sandbox_portfolio(version), load_dataset("cashflows"))
+
+# Monte Carlo bands for the sandbox (see scenarios.py), per data version,
+# scenario count and seed
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=8)
+def load_scenarios(version, draws, seed):
+    return scenarios.simulate(load_sandbox_portfolio(version), draws, seed, workers=render_pool.MAX_WORKERS)
+
+# Candidate portfolios for the allocation optimizer (see allocation.py); they
+# depend only on the deals, so each solve is a vectorized filter over them
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_allocation_candidates(version):
+    return allocation.candidates(allocation.deal_arrays(load_sandbox_portfolio(version)))
+
+# Tornado inputs for every company (see sensitivity.py), per data and impact
+# model version, so switching companies in the deep dive is a lookup
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_sensitivity(version, models_version):
+    return sensitivity.build_sensitivity(load_real_portfolio(version))
+
+# Each version of the real CSV is recorded once in the append-only snapshot
+# history (see snapshot_history.py); read-only deployments just don't record
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def record_real_snapshot(version):
+    try:
+        snapshot_history.record(load_real_portfolio(version), source_stamp(source_path("real")))
+    except OSError:
+        pass
+
+# Totals per snapshot and the changes behind the trend badges, per history
+# version: footers and two snapshots, however long the history is
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=2)
+def load_history(history_version):
+    totals = snapshot_history.totals()
+    return {
+        "totals": totals,
+        "quarter": snapshot_history.changes(totals, snapshot_history.QUARTER),
+        "year": snapshot_history.changes(totals, snapshot_history.YEAR),
+        "companies": snapshot_history.company_changes(offset=snapshot_history.QUARTER),
+    }
+
+def history_change(period, measure):
+    """Fractional change of a portfolio total over `period` ("quarter" or
+    "year"), or None without an old enough snapshot."""
+    changes = history[period]
+    return None if changes is None else changes[measure]
+
+# One company's measures in every snapshot, per history version and company;
+# only the row groups that hold the company are read
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=32)
+def load_company_history(history_version, company):
+    return snapshot_history.company_history(company)
+
+def company_trend(company, measure):
+    """A company's `measure` in each snapshot, for an st.metric sparkline, or
+    None with fewer than two."""
+    values = load_company_history(history_version, company)[measure]
+    return values.tolist() if len(values) >= 2 else None
+
+def company_quarter_delta(company, measure):
+    """st.metric delta for a company's change since last quarter, or None."""
+    changes = history["companies"]
+    if changes is None or company not in changes.index:
+        return None
+    change = changes.at[company, measure]
+    return None if math.isnan(change) else f"{change:+.0%} QoQ"
+
+with trace.section("data_load"):
+    real_version = dataset_version("real")
+    sandbox_version = (dataset_version("sandbox"), dataset_version("cashflows"))
+    thesis_version = dataset_version("thesis")
+    real_df = load_real_portfolio(real_version)
+    sandbox_df = load_sandbox_portfolio(sandbox_version)
+    thesis_df = load_investment_scores(thesis_version)
+    real_cube = load_real_cube(real_version)
+    sandbox_cube = load_sandbox_cube(sandbox_version)
+    search_index = load_search_index(real_version, thesis_version)
+    real_masks = load_real_masks(real_version)
+    real_metrics = load_real_metrics(real_version)
+    sandbox_metrics = load_sandbox_metrics(sandbox_version)
+    record_real_snapshot(real_version)
+    history_version = snapshot_history.version()
+    history = load_history(history_version)
 
 # ---------- SIDEBAR ----------
 st.sidebar.title("🌍 Galvanize Portfolio")
@@ -480,6 +216,149 @@ tab_choice = st.sidebar.radio(
     index=0
 )
 
+interactive_charts = st.sidebar.toggle(
+    "Interactive charts", value=True, key="interactive_charts",
+    help="Draw scatter charts in the browser (hover, zoom, legend filtering). Off shows static images."
+)
+show_perf = st.sidebar.toggle(
+    "Performance panel", value=False, key="perf_panel",
+    help="Time each section of the last rerun (wall, CPU and allocated memory)."
+)
+perf_panel = st.sidebar.container()
+
+# ---------- CHARTS ----------
+# PNG charts are queued by show_chart and drawn by draw_charts at the end of
+# the run (or fragment run), so they all render in parallel in render_pool's
+# workers
+pending_charts = []
+# Companies after (or before) the deep dive's selection whose charts are
+# pre-rendered while the user reads it
+NEIGHBOUR_PREFETCH = 2
+# Largest positions drawn in the scenario band charts
+SCENARIO_CHART_ROWS = 25
+fragment_depth = [0]
+
+def show_chart(chart_id, *inputs, data_key=None):
+    """Draw a chart in the browser from its Vega-Lite spec (chart_specs.py)
+    when there is one and the data is small enough, otherwise as a cached
+    matplotlib PNG (chart_cache.py). Interactive charts keep a PNG export,
+    rendered only when the button is clicked."""
+    build = getattr(charts, chart_id)
+
+    def png():
+        return chart_cache.chart_png(chart_id, build, *inputs, data_key=data_key)
+
+    spec_builder = getattr(chart_specs, chart_id, None)
+    if interactive_charts and spec_builder is not None and chart_specs.fits(inputs[0]):
+        data, spec = spec_builder(*inputs)
+        st.vega_lite_chart(data, spec, width="stretch")
+        st.download_button("⬇️ Export PNG", png, file_name=f"{chart_id}.png", mime="image/png",
+                           key=f"export_{chart_id}", on_click="ignore")
+    else:
+        future = chart_cache.chart_future(chart_id, build, *inputs, data_key=data_key)
+        pending_charts.append((st.empty(), future))
+
+def prefetch_chart(chart_id, *inputs, data_key=None):
+    """Start rendering a PNG chart the user is likely to ask for next, if
+    there are idle workers to do it; nothing waits for the result."""
+    if render_pool.MAX_WORKERS > 1:
+        chart_cache.chart_future(chart_id, getattr(charts, chart_id), *inputs, data_key=data_key)
+
+def draw_charts():
+    """Fill the placeholders left by show_chart as their PNGs finish rendering."""
+    placeholders = {}
+    for placeholder, future in pending_charts:
+        placeholders.setdefault(future, []).append(placeholder)
+    pending_charts.clear()
+    for future in as_completed(placeholders):
+        for placeholder in placeholders[future]:
+            placeholder.image(future.result(), width="stretch")
+
+def chart_fragment(func):
+    """st.fragment that draws its queued charts when it is the outermost one
+    running, so a nested fragment doesn't wait before its parent's later charts
+    are queued."""
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        # Outside a full run this is a fragment rerun, traced as its own run
+        standalone = not trace.active
+        if standalone:
+            trace.begin("fragment", func.__name__)
+        fragment_depth[0] += 1
+        try:
+            func(*args, **kwargs)
+        finally:
+            fragment_depth[0] -= 1
+        if fragment_depth[0] == 0:
+            with trace.section(f"{func.__name__}/charts"):
+                draw_charts()
+        if standalone:
+            trace.end()
+    return st.fragment(run)
+
+# ---------- TABLES ----------
+# Tables are paged on the server (see paged_table.py): only the visible page
+# is formatted, coloured and sent. Filtered, sorted row orders are cached per
+# table version so turning pages is a slice.
+@st.cache_resource(ttl=DATA_TTL_SECONDS, max_entries=32)
+def load_table_view(view_key, query, sort_by, ascending, columns, _frame):
+    return paged_table.view(_frame, query, sort_by, ascending, list(columns) if columns else None)
+
+@st.fragment
+def show_table(frame, key, view_key, columns=None, formats=None, gradient=(), height=400):
+    """A table of `frame` (its `columns`, default all). Past one page it gets
+    a filter box, a sort column and a pager; only the page is rendered."""
+    columns = list(frame.columns) if columns is None else list(columns)
+    positions = None
+    if len(frame) > paged_table.PAGE_SIZE:
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+        with col1:
+            query = st.text_input("Filter rows", key=f"{key}_filter", placeholder="Filter rows…",
+                                  label_visibility="collapsed")
+        with col2:
+            sort_by = st.selectbox("Sort by", [None, *columns], key=f"{key}_sort",
+                                   format_func=lambda column: "Sort by…" if column is None else column,
+                                   label_visibility="collapsed")
+        with col3:
+            ascending = st.toggle("Ascending", value=True, key=f"{key}_ascending")
+        matches = load_table_view(view_key, query, sort_by, ascending, tuple(columns), frame)
+        pages = max(1, -(-len(matches) // paged_table.PAGE_SIZE))
+        # A narrower filter can leave the current page past the end
+        if st.session_state.get(f"{key}_page", 1) > pages:
+            st.session_state[f"{key}_page"] = pages
+        with col4:
+            page = st.number_input("Page", min_value=1, max_value=pages, key=f"{key}_page",
+                                   label_visibility="collapsed")
+        start = (page - 1) * paged_table.PAGE_SIZE
+        positions = matches[start:start + paged_table.PAGE_SIZE]
+        window = frame.iloc[positions][columns]
+    else:
+        window = frame[columns]
+    styler = paged_table.page_styler(window, formats, paged_table.column_ranges(frame, gradient))
+    st.dataframe(styler, width="stretch", height=height)
+    if positions is not None:
+        st.caption(
+            f"Rows {start + 1 if len(positions) else 0:,}–{start + len(positions):,} of {len(matches):,}"
+            + (f" (filtered from {len(frame):,})" if query.strip() else "")
+        )
+
+# ---------- TABLE EXPORT ----------
+@st.fragment
+def export_table(frame, label, file_stem, key):
+    """Format picker and download button for a table. The file is written
+    (table_export.py) only when the button is clicked, and picking a format
+    reruns just this fragment."""
+    formats = table_export.available_formats()
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        fmt = st.selectbox("Format", list(formats), format_func=lambda key: formats[key][0],
+                           key=f"{key}_format", label_visibility="collapsed")
+    _, extension, mime, _ = formats[fmt]
+    with col2:
+        st.download_button(label, functools.partial(table_export.export_bytes, frame, fmt),
+                           file_name=f"{file_stem}.{extension}", mime=mime,
+                           key=f"{key}_download", on_click="ignore")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
 st.sidebar.info(
@@ -508,45 +387,28 @@ if tab_choice == "📊 Real Portfolio":
     </div>
     """, unsafe_allow_html=True)
     
-    # Calculate totals for hero metrics
-    total_funding = real_df["funding_raised_m"].sum()
-    total_companies = len(real_df)
-    total_impact = real_df["estimated_annual_tco2e_avoided_k"].sum()
-    total_employees = real_df["employees"].sum()
-    
-    # Hero Metrics Section - Three Large Cards
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.markdown(f"""
-        <div class="metric-card">
-            <div class="metric-label">Total Funding</div>
-            <div class="metric-value blue">${total_funding/1000:.1f}B</div>
-            <div class="metric-sublabel">Cumulative Capital</div>
-            <div class="trend-badge positive">↗ +12% from last quarter</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-        <div class="metric-card">
-            <div class="metric-label">Portfolio Companies</div>
-            <div class="metric-value purple">{total_companies}</div>
-            <div class="metric-sublabel">Active Investments</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-        <div class="metric-card">
-            <div class="metric-label">Total CO2e Impact</div>
-            <div class="metric-value green">{total_impact/1000:.1f}M tons</div>
-            <div class="metric-sublabel">Avoided Emissions</div>
-            <div class="trend-badge positive">↗ +5% from last quarter</div>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
+    with trace.section("hero_metrics"):
+        # Calculate totals for hero metrics
+        totals = analytics.hero_metrics(real_cube)
+        total_funding = totals["total_funding"]
+        total_companies = totals["total_companies"]
+        total_impact = totals["total_impact"]
+        
+        # Hero Metrics Section - Three Large Cards
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            components.metric_card("Total Funding", f"${total_funding/1000:.1f}B", "Cumulative Capital", "blue",
+                                   components.change_badge(history_change("quarter", "funding_raised_m"), "last quarter"))
+        
+        with col2:
+            components.metric_card("Portfolio Companies", f"{total_companies}", "Active Investments", "purple")
+        
+        with col3:
+            components.metric_card("Total CO2e Impact", f"{total_impact/1000:.1f}M tons", "Avoided Emissions", "green",
+                                   components.change_badge(history_change("quarter", "estimated_annual_tco2e_avoided_k"), "last quarter"))
+        
+        st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
     
     # PORTFOLIO-LEVEL IMPACT DASHBOARD
     st.markdown("""
@@ -556,819 +418,556 @@ if tab_choice == "📊 Real Portfolio":
     <p style="color: var(--text-secondary); margin-bottom: 24px;">Aggregated metrics demonstrating portfolio-wide efficiency and attribution</p>
     """, unsafe_allow_html=True)
     
-    # Calculate portfolio-level efficiency metrics
-    portfolio_impact_per_funding = total_impact / total_funding  # K tCO2e per $M
-    portfolio_impact_per_employee = total_impact / total_employees  # K tCO2e per employee
-    portfolio_funding_per_employee = total_funding / total_employees  # $M per employee
-    
-    # Portfolio efficiency metrics
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            "Portfolio Capital Efficiency",
-            f"{portfolio_impact_per_funding:.1f}K tCO₂e/$M",
-            help="Total annual impact per $1M invested across portfolio. Industry benchmark: ~3-5K tCO₂e/$M for climate VCs"
-        )
-    
-    with col2:
-        st.metric(
-            "Portfolio Impact Efficiency",
-            f"{portfolio_impact_per_employee:.1f}K tCO₂e/employee",
-            help="Total annual impact per employee across portfolio. Higher indicates more impact leverage per person."
-        )
-    
-    with col3:
-        benchmark_comparison = ((portfolio_impact_per_funding / 4.0) - 1) * 100  # Compare to 4.0 industry benchmark
-        st.metric(
-            "vs. Climate VC Benchmark",
-            f"{benchmark_comparison:+.0f}%",
-            delta=f"{benchmark_comparison:+.0f}% vs. industry avg",
-            help="Comparison to industry benchmark of ~4K tCO₂e/$M for climate-focused VCs"
-        )
-    
-    with col4:
-        # Calculate portfolio concentration (Herfindahl index)
-        sector_impact_pct = real_df.groupby('sector')['estimated_annual_tco2e_avoided_k'].sum() / total_impact
-        herfindahl = (sector_impact_pct ** 2).sum()
-        diversification_score = (1 - herfindahl) * 100
-        st.metric(
-            "Impact Diversification",
-            f"{diversification_score:.0f}%",
-            help="Portfolio diversification score (0-100%). Higher = more evenly distributed impact across sectors."
-        )
-    
-    # Impact Attribution Analysis
-    st.markdown("##### Impact Attribution by Sector & Stage")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Impact attribution by sector (pie chart)
-        sector_impact_attribution = real_df.groupby('sector')['estimated_annual_tco2e_avoided_k'].sum().sort_values(ascending=False)
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        colors = ['#2563EB', '#8B5CF6', '#059669', '#F59E0B', '#14B8A6']
-        wedges, texts, autotexts = ax.pie(
-            sector_impact_attribution.values,
-            labels=sector_impact_attribution.index,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors=colors[:len(sector_impact_attribution)]
-        )
-        ax.set_title('Impact Attribution by Sector\n(% of Total Portfolio Impact)', fontweight='bold')
+    with trace.section("portfolio_efficiency"):
+        # Calculate portfolio-level efficiency metrics
+        efficiency = analytics.portfolio_efficiency(real_cube, totals)
+        portfolio_impact_per_funding = efficiency["impact_per_funding"]  # K tCO2e per $M
+        portfolio_impact_per_employee = efficiency["impact_per_employee"]  # K tCO2e per employee
+        benchmark_comparison = efficiency["benchmark_comparison"]  # vs. 4.0 industry benchmark
         
-        # Make percentage text more readable
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-            autotext.set_fontsize(10)
+        # Portfolio efficiency metrics
+        col1, col2, col3, col4 = st.columns(4)
         
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    with col2:
-        # Impact attribution by investment stage (pie chart)
-        stage_impact_attribution = real_df.groupby('investment_stage')['estimated_annual_tco2e_avoided_k'].sum().sort_values(ascending=False)
-        
-        fig, ax = plt.subplots(figsize=(8, 6))
-        colors = ['#8B5CF6', '#2563EB', '#059669']
-        wedges, texts, autotexts = ax.pie(
-            stage_impact_attribution.values,
-            labels=stage_impact_attribution.index,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors=colors[:len(stage_impact_attribution)]
-        )
-        ax.set_title('Impact Attribution by Stage\n(% of Total Portfolio Impact)', fontweight='bold')
+        with col1:
+            st.metric(
+                "Portfolio Capital Efficiency",
+                f"{portfolio_impact_per_funding:.1f}K tCO₂e/$M",
+                help="Total annual impact per $1M invested across portfolio. Industry benchmark: ~3-5K tCO₂e/$M for climate VCs"
+            )
         
-        # Make percentage text more readable
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-            autotext.set_fontsize(10)
+        with col2:
+            st.metric(
+                "Portfolio Impact Efficiency",
+                f"{portfolio_impact_per_employee:.1f}K tCO₂e/employee",
+                help="Total annual impact per employee across portfolio. Higher indicates more impact leverage per person."
+            )
         
-        plt.tight_layout()
-        st.pyplot(fig)
+        with col3:
+            st.metric(
+                "vs. Climate VC Benchmark",
+                f"{benchmark_comparison:+.0f}%",
+                delta=f"{benchmark_comparison:+.0f}% vs. industry avg",
+                help="Comparison to industry benchmark of ~4K tCO₂e/$M for climate-focused VCs"
+            )
+        
+        with col4:
+            # Portfolio concentration (Herfindahl index)
+            st.metric(
+                "Impact Diversification",
+                f"{efficiency['diversification_score']:.0f}%",
+                help="Portfolio diversification score (0-100%). Higher = more evenly distributed impact across sectors."
+            )
     
-    # Key Insights Box
-    st.info(
-        f"""
-        **Portfolio-Level Insights:**
+    with trace.section("attribution"):
+        # Impact Attribution Analysis
+        st.markdown("##### Impact Attribution by Sector & Stage")
         
-        • **Capital Efficiency:** The portfolio achieves {portfolio_impact_per_funding:.1f}K tCO₂e per $1M invested, which is 
-        {benchmark_comparison:+.0f}% {'above' if benchmark_comparison > 0 else 'below'} the climate VC industry benchmark (~4K tCO₂e/$M).
+        sector_impact_attribution, stage_impact_attribution = analytics.impact_attribution(real_cube)
         
-        • **Impact Concentration:** {sector_impact_attribution.index[0]} represents {(sector_impact_attribution.values[0]/total_impact*100):.1f}% of total portfolio impact, 
-        indicating {'strong sector focus' if (sector_impact_attribution.values[0]/total_impact) > 0.4 else 'balanced diversification'}.
+        col1, col2 = st.columns(2)
         
-        • **Stage Distribution:** {stage_impact_attribution.index[0]} companies contribute {(stage_impact_attribution.values[0]/total_impact*100):.1f}% of impact, 
-        suggesting the portfolio is {'impact-mature' if stage_impact_attribution.index[0] == 'Growth' else 'impact-emerging'}.
-        """
-    )
-    
-    st.markdown("---")
-    
-    # Filters
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        sector_options = ["All"] + sorted(real_df["sector"].unique().tolist())
-        selected_sector = st.selectbox("Sector", sector_options, key="sector_filter")
-    
-    with col2:
-        stage_options = ["All"] + sorted(real_df["investment_stage"].unique().tolist())
-        selected_stage = st.selectbox("Investment Stage", stage_options, key="stage_filter")
-    
-    with col3:
-        search_term = st.text_input("Search companies", "", key="search_filter")
-    
-    # Apply filters
-    filtered_df = real_df.copy()
-    if selected_sector != "All":
-        filtered_df = filtered_df[filtered_df["sector"] == selected_sector]
-    if selected_stage != "All":
-        filtered_df = filtered_df[filtered_df["investment_stage"] == selected_stage]
-    if search_term:
-        filtered_df = filtered_df[
-            filtered_df["company"].str.contains(search_term, case=False, na=False) |
-            filtered_df["notes"].str.contains(search_term, case=False, na=False)
-        ]
-    
-    # Visualizations
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("#### Total Funding by Sector")
-        sector_funding = filtered_df.groupby("sector")["funding_raised_m"].sum().sort_values(ascending=True)
-        fig, ax = plt.subplots(figsize=(8, 5))
-        sector_funding.plot(kind="barh", ax=ax, color="#2E7D32")
-        ax.set_xlabel("Total Funding ($M)")
-        ax.set_ylabel("")
-        ax.set_title("Funding Distribution by Sector")
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    with col2:
-        st.markdown("#### Annual Impact by Sector")
-        sector_impact = filtered_df.groupby("sector")["estimated_annual_tco2e_avoided_k"].sum().sort_values(ascending=True)
-        fig, ax = plt.subplots(figsize=(8, 5))
-        sector_impact.plot(kind="barh", ax=ax, color="#1565C0")
-        ax.set_xlabel("Annual tCO₂e Avoided (K)")
-        ax.set_ylabel("")
-        ax.set_title("Impact Distribution by Sector")
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    # IMPACT MATERIALITY MATRIX
-    st.markdown("---")
-    st.markdown("#### 🎯 Impact Materiality Matrix")
-    st.markdown("*Strategic portfolio view: Financial Performance vs. Impact Performance*")
-    
-    # Create synthetic financial performance metric (since we don't have real IRR data)
-    # Using a proxy: funding efficiency + stage maturity
-    np.random.seed(42)  # For reproducibility
-    
-    # Calculate impact performance (tCO2e per $M invested)
-    filtered_df['impact_performance'] = filtered_df['estimated_annual_tco2e_avoided_k'] / filtered_df['funding_raised_m']
-    
-    # Create synthetic financial performance score (0-100)
-    # Based on: stage maturity (40%), funding per employee (30%), sector (30%)
-    stage_scores = {'Early': 30, 'Growth': 70, 'Late': 90}
-    filtered_df['stage_score'] = filtered_df['investment_stage'].map(stage_scores)
-    
-    # Normalize funding per employee to 0-100 scale
-    filtered_df['funding_efficiency_score'] = (
-        (filtered_df['funding_raised_m'] / filtered_df['employees']) / 
-        (filtered_df['funding_raised_m'] / filtered_df['employees']).max() * 100
-    )
-    
-    # Sector performance multipliers (based on typical VC returns)
-    sector_multipliers = {'Energy': 0.9, 'Software': 1.2, 'Agriculture': 0.85, 'Industry': 0.95, 'Transportation': 0.88}
-    filtered_df['sector_multiplier'] = filtered_df['sector'].map(sector_multipliers)
-    
-    # Calculate composite financial performance score
-    filtered_df['financial_performance'] = (
-        filtered_df['stage_score'] * 0.4 + 
-        filtered_df['funding_efficiency_score'] * 0.3 + 
-        filtered_df['sector_multiplier'] * 30
-    )
-    
-    # Create the scatter plot
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Define quadrants
-    median_financial = filtered_df['financial_performance'].median()
-    median_impact = filtered_df['impact_performance'].median()
-    
-    # Color by sector - vibrant palette
-    sector_colors = {
-        'Energy': '#059669',
-        'Software': '#2563EB', 
-        'Agriculture': '#F59E0B',
-        'Industry': '#8B5CF6',
-        'Transportation': '#14B8A6'
-    }
-    
-    # Plot each company
-    for sector in filtered_df['sector'].unique():
-        sector_data = filtered_df[filtered_df['sector'] == sector]
-        ax.scatter(
-            sector_data['financial_performance'],
-            sector_data['impact_performance'],
-            s=sector_data['funding_raised_m'] * 3,  # Size by funding
-            alpha=0.6,
-            color=sector_colors.get(sector, '#666666'),
-            label=sector,
-            edgecolors='black',
-            linewidth=1.5
-        )
-    
-    # Add quadrant lines
-    ax.axvline(median_financial, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-    ax.axhline(median_impact, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-    
-    # Add quadrant labels
-    ax.text(median_financial * 0.5, median_impact * 1.8, 'Impact Leaders\n(High Impact, Lower Returns)', 
-            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
-    ax.text(median_financial * 1.5, median_impact * 1.8, '⭐ Stars\n(High Impact, High Returns)', 
-            ha='center', va='center', fontsize=11, fontweight='bold', color='#2E7D32', alpha=0.8)
-    ax.text(median_financial * 0.5, median_impact * 0.5, 'Underperformers\n(Lower Impact, Lower Returns)', 
-            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
-    ax.text(median_financial * 1.5, median_impact * 0.5, 'Financial Leaders\n(High Returns, Lower Impact)', 
-            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
-    
-    # Label each point with company name
-    for idx, row in filtered_df.iterrows():
-        ax.annotate(
-            row['company'],
-            (row['financial_performance'], row['impact_performance']),
-            xytext=(5, 5),
-            textcoords='offset points',
-            fontsize=8,
-            alpha=0.8
-        )
-    
-    ax.set_xlabel('Financial Performance Score (0-100)', fontsize=12, fontweight='bold')
-    ax.set_ylabel('Impact Performance (K tCO₂e per $1M invested)', fontsize=12, fontweight='bold')
-    ax.set_title('Impact Materiality Matrix: Portfolio Strategic Positioning', fontsize=14, fontweight='bold')
-    ax.legend(loc='upper left', fontsize=9, framealpha=0.9)
-    ax.grid(True, alpha=0.2)
-    
-    plt.tight_layout()
-    st.pyplot(fig)
-    
-    # Strategic insights
-    stars = filtered_df[
-        (filtered_df['financial_performance'] > median_financial) & 
-        (filtered_df['impact_performance'] > median_impact)
-    ]
-    impact_leaders = filtered_df[
-        (filtered_df['financial_performance'] <= median_financial) & 
-        (filtered_df['impact_performance'] > median_impact)
-    ]
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.success(
-            f"""
-            **⭐ Stars (High Financial + High Impact):**
-            
-            {', '.join(stars['company'].tolist()) if len(stars) > 0 else 'None in this quadrant'}
-            
-            These companies represent the ideal portfolio holdings - strong financial returns with significant climate impact.
-            """
-        )
-    
-    with col2:
+        with col1:
+            # Impact attribution by sector (pie chart)
+            show_chart(
+                "attribution_pie",
+                sector_impact_attribution,
+                'Impact Attribution by Sector\n(% of Total Portfolio Impact)',
+                ['#2563EB', '#8B5CF6', '#059669', '#F59E0B', '#14B8A6']
+            )
+        
+        with col2:
+            # Impact attribution by investment stage (pie chart)
+            show_chart(
+                "attribution_pie",
+                stage_impact_attribution,
+                'Impact Attribution by Stage\n(% of Total Portfolio Impact)',
+                ['#8B5CF6', '#2563EB', '#059669']
+            )
+        
+        # Key Insights Box
         st.info(
             f"""
-            **🌱 Impact Leaders (High Impact, Developing Returns):**
+            **Portfolio-Level Insights:**
             
-            {', '.join(impact_leaders['company'].tolist()) if len(impact_leaders) > 0 else 'None in this quadrant'}
+            • **Capital Efficiency:** The portfolio achieves {portfolio_impact_per_funding:.1f}K tCO₂e per $1M invested, which is 
+            {benchmark_comparison:+.0f}% {'above' if benchmark_comparison > 0 else 'below'} the climate VC industry benchmark (~4K tCO₂e/$M).
             
-            These companies are impact-first plays that may require longer time horizons to achieve financial maturity.
+            • **Impact Concentration:** {sector_impact_attribution.index[0]} represents {(sector_impact_attribution.values[0]/total_impact*100):.1f}% of total portfolio impact, 
+            indicating {'strong sector focus' if (sector_impact_attribution.values[0]/total_impact) > 0.4 else 'balanced diversification'}.
+            
+            • **Stage Distribution:** {stage_impact_attribution.index[0]} companies contribute {(stage_impact_attribution.values[0]/total_impact*100):.1f}% of impact, 
+            suggesting the portfolio is {'impact-mature' if stage_impact_attribution.index[0] == 'Growth' else 'impact-emerging'}.
             """
         )
-    
-    st.markdown("---")
-    
-    # Company Details Table
-    st.markdown("#### Portfolio Companies - Detailed Metrics")
-    
-    display_df = filtered_df[[
-        "company", "sector", "investment_stage", "funding_raised_m", 
-        "employees", "year_founded", "estimated_annual_tco2e_avoided_k",
-        "scale_indicator", "scale_value"
-    ]].copy()
-    
-    display_df.columns = [
-        "Company", "Sector", "Stage", "Funding ($M)", 
-        "Employees", "Founded", "Annual Impact (K tCO₂e)",
-        "Scale Metric", "Scale Value"
-    ]
-    
-    st.dataframe(
-        display_df.style.format({
-            "Funding ($M)": "${:.0f}M",
-            "Employees": "{:,}",
-            "Annual Impact (K tCO₂e)": "{:.0f}K",
-            "Scale Value": "{:,}"
-        }),
-        use_container_width=True,
-        height=400
-    )
-    
-    # Company Detail View with THREE comparison metrics
-    st.markdown("---")
-    st.markdown("#### Company Deep Dive")
-    
-    selected_company = st.selectbox(
-        "Select a company for detailed analysis:",
-        filtered_df["company"].tolist()
-    )
-    
-    if selected_company:
-        company_data = filtered_df[filtered_df["company"] == selected_company].iloc[0]
         
-        col1, col2 = st.columns([2, 1])
+        st.markdown("---")
+    
+    # The filter-driven sections below are fragments: a widget inside one
+    # reruns only that fragment (and any fragment nested in it), with the
+    # data it reads passed in as arguments
+    @chart_fragment
+    def portfolio_explorer(real_df, real_cube, real_metrics, real_masks, search_index, real_version):
+        # Filters (an empty selection means all)
+        col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.markdown(f"## {company_data['company']}")
-            st.markdown(f"**{company_data['notes']}**")
-            st.markdown(f"**Sector:** {company_data['sector']} | **Subsector:** {company_data['subsector']}")
-            st.markdown(f"**Country:** {company_data['country']} | **Impact Lever:** {company_data['impact_lever']}")
-            
-        with col2:
-            st.markdown("### Key Metrics")
-            st.metric("Funding Raised", f"${company_data['funding_raised_m']:.0f}M")
-            st.metric("Employees", f"{company_data['employees']:,}")
-            st.metric("Founded", int(company_data['year_founded']))
+            sector_options = sorted(real_cube["sector"].unique().tolist())
+            selected_sectors = st.multiselect("Sector", sector_options, placeholder="All", key="sector_filter")
         
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Annual Impact", f"{company_data['estimated_annual_tco2e_avoided_k']:.0f}K tCO₂e")
         with col2:
-            st.metric("Investment Stage", company_data['investment_stage'])
-        with col3:
-            st.metric(company_data['scale_indicator'], f"{company_data['scale_value']:,}")
+            stage_options = sorted(real_cube["investment_stage"].unique().tolist())
+            selected_stages = st.multiselect("Investment Stage", stage_options, placeholder="All", key="stage_filter")
         
-        # THREE COMPARISON METRICS (Enhanced from 1 to 3)
-        st.markdown("### Comparative Efficiency Metrics")
-        st.markdown("*These metrics help compare companies across different sectors and stages*")
+        with col3:
+            search_term = st.text_input("Search companies", "", key="search_filter")
         
-        # Calculate all three metrics
-        impact_per_employee = company_data['estimated_annual_tco2e_avoided_k'] / company_data['employees']
-        impact_per_funding = company_data['estimated_annual_tco2e_avoided_k'] / company_data['funding_raised_m']
-        funding_per_employee = company_data['funding_raised_m'] / company_data['employees']
+        col1, col2 = st.columns(2)
         
-        # Calculate portfolio averages for comparison
-        avg_impact_per_employee = (filtered_df['estimated_annual_tco2e_avoided_k'] / filtered_df['employees']).mean()
-        avg_impact_per_funding = (filtered_df['estimated_annual_tco2e_avoided_k'] / filtered_df['funding_raised_m']).mean()
-        avg_funding_per_employee = (filtered_df['funding_raised_m'] / filtered_df['employees']).mean()
+        with col1:
+            country_options = sorted(real_cube["country"].unique().tolist())
+            selected_countries = st.multiselect("Country", country_options, placeholder="All", key="country_filter")
         
-        col1, col2, col3 = st.columns(3)
+        with col2:
+            lever_options = sorted(real_cube["impact_lever"].unique().tolist())
+            selected_levers = st.multiselect("Impact Lever", lever_options, placeholder="All", key="lever_filter")
+        
+        with trace.section("filtering"):
+            # Apply filters
+            filters = {
+                "sector": selected_sectors,
+                "investment_stage": selected_stages,
+                "country": selected_countries,
+                "impact_lever": selected_levers,
+            }
+            filtered_df = analytics.filter_portfolio(real_df, filters, search_term, search_index, real_masks)
         
-        with col1:
-            st.markdown("#### 1️⃣ Impact Efficiency")
-            st.metric(
-                "Impact per Employee", 
-                f"{impact_per_employee:.1f} tCO₂e",
-                delta=f"{((impact_per_employee / avg_impact_per_employee - 1) * 100):.0f}% vs portfolio avg",
-                help="Annual tCO₂e avoided per employee. Higher is better - indicates more impact per person."
+        with trace.section("sector_bars"):
+            sector_funding = analytics.filtered_sector_totals(
+                real_cube, filtered_df, "funding_raised_m", filters, search_term
             )
-            
-        with col2:
-            st.markdown("#### 2️⃣ Capital Efficiency")
-            st.metric(
-                "Impact per $1M Funding", 
-                f"{impact_per_funding:.1f}K tCO₂e",
-                delta=f"{((impact_per_funding / avg_impact_per_funding - 1) * 100):.0f}% vs portfolio avg",
-                help="Annual tCO₂e avoided per $1M invested. Higher is better - indicates more impact per dollar."
+            sector_impact = analytics.filtered_sector_totals(
+                real_cube, filtered_df, "estimated_annual_tco2e_avoided_k", filters, search_term
             )
+            # Filters and search can combine to match nothing; the charts and
+            # the deep dive need at least one company
+            if filtered_df.empty or sector_funding.empty:
+                st.info("No companies match these filters. Clear a filter or the search to see the portfolio.")
+                return
             
-        with col3:
-            st.markdown("#### 3️⃣ Team Leverage")
-            st.metric(
-                "Funding per Employee", 
-                f"${funding_per_employee:.2f}M",
-                delta=f"{((funding_per_employee / avg_funding_per_employee - 1) * 100):.0f}% vs portfolio avg",
-                help="Total funding raised per employee. Indicates capital intensity and team leverage."
-            )
-        
-        # Visualization comparing company to portfolio
-        st.markdown("### Company vs. Portfolio Benchmarks")
-        
-        fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 4))
-        
-        # Chart 1: Impact per Employee
-        ax1.barh(['Portfolio Avg', company_data['company']], 
-                 [avg_impact_per_employee, impact_per_employee],
-                 color=['#90A4AE', '#2E7D32'])
-        ax1.set_xlabel('tCO₂e per Employee')
-        ax1.set_title('Impact Efficiency')
+            # Visualizations
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown("#### Total Funding by Sector")
+                show_chart("sector_bar", sector_funding, "#2E7D32", "Total Funding ($M)", "Funding Distribution by Sector")
+            
+            with col2:
+                st.markdown("#### Annual Impact by Sector")
+                show_chart("sector_bar", sector_impact, "#1565C0", "Annual tCO₂e Avoided (K)", "Impact Distribution by Sector")
         
-        # Chart 2: Impact per $1M
-        ax2.barh(['Portfolio Avg', company_data['company']], 
-                 [avg_impact_per_funding, impact_per_funding],
-                 color=['#90A4AE', '#1565C0'])
-        ax2.set_xlabel('K tCO₂e per $1M Funding')
-        ax2.set_title('Capital Efficiency')
+        materiality_matrix_section(filtered_df, filters, search_term, real_metrics, real_version)
         
-        # Chart 3: Funding per Employee
-        ax3.barh(['Portfolio Avg', company_data['company']], 
-                 [avg_funding_per_employee, funding_per_employee],
-                 color=['#90A4AE', '#F57C00'])
-        ax3.set_xlabel('$M per Employee')
-        ax3.set_title('Team Leverage')
+        st.markdown("---")
         
-        plt.tight_layout()
-        st.pyplot(fig)
+        with trace.section("company_table"):
+            # Company Details Table
+            st.markdown("#### Portfolio Companies - Detailed Metrics")
+            
+            display_df = filtered_df[[
+                "company", "sector", "investment_stage", "funding_raised_m", 
+                "employees", "year_founded", "estimated_annual_tco2e_avoided_k",
+                "scale_indicator", "scale_value"
+            ]].copy()
+            
+            display_df.columns = [
+                "Company", "Sector", "Stage", "Funding ($M)", 
+                "Employees", "Founded", "Annual Impact (K tCO₂e)",
+                "Scale Metric", "Scale Value"
+            ]
+            
+            show_table(
+                display_df, "real_table", chart_cache.input_hash(real_version, filters, search_term),
+                formats={
+                    "Funding ($M)": "${:.0f}M",
+                    "Employees": "{:,}",
+                    "Annual Impact (K tCO₂e)": "{:.0f}K",
+                    "Scale Value": "{:,}"
+                },
+            )
+            export_table(display_df, "📥 Download Company Data", "galvanize_portfolio_companies", "real_export")
         
-        # SECTOR BENCHMARKING SECTION
+        # Company Detail View with THREE comparison metrics
         st.markdown("---")
-        st.markdown("### 🎯 Sector Benchmarking Analysis")
-        st.markdown("*Comparison to industry averages for similar companies*")
-        
-        # Define sector-specific benchmarks (industry research-based)
-        sector_benchmarks = {
-            "Energy": {
-                "impact_per_employee": 450,  # tCO2e per employee for geothermal/clean energy
-                "impact_per_funding": 2.8,   # K tCO2e per $1M for energy hardware
-                "employees_per_company": 95,  # Average team size
-                "description": "Geothermal and clean energy companies"
-            },
-            "Software": {
-                "impact_per_employee": 180,  # tCO2e per employee for carbon accounting software
-                "impact_per_funding": 4.3,   # K tCO2e per $1M for software enablement
-                "employees_per_company": 215, # Average team size
-                "description": "Carbon accounting and climate software platforms"
-            },
-            "Agriculture": {
-                "impact_per_employee": 120,  # tCO2e per employee for ag-tech
-                "impact_per_funding": 3.2,   # K tCO2e per $1M for agriculture
-                "employees_per_company": 75,  # Average team size
-                "description": "Agricultural carbon measurement and soil health companies"
-            },
-            "Industry": {
-                "impact_per_employee": 95,   # tCO2e per employee for industrial optimization
-                "impact_per_funding": 3.7,   # K tCO2e per $1M for industrial
-                "employees_per_company": 42,  # Average team size
-                "description": "Industrial decarbonization and process optimization"
-            },
-            "Transportation": {
-                "impact_per_employee": 200,  # tCO2e per employee for logistics
-                "impact_per_funding": 2.5,   # K tCO2e per $1M for transportation
-                "employees_per_company": 110, # Average team size
-                "description": "Transportation and logistics optimization"
-            }
-        }
+        st.markdown("#### Company Deep Dive")
         
-        company_sector = company_data['sector']
-        benchmark = sector_benchmarks.get(company_sector, {
-            "impact_per_employee": 150,
-            "impact_per_funding": 3.5,
-            "employees_per_company": 100,
-            "description": "Climate tech companies (general)"
-        })
-        
-        # Calculate vs. industry benchmark
-        impact_emp_vs_industry = ((impact_per_employee / benchmark['impact_per_employee']) - 1) * 100
-        impact_fund_vs_industry = ((impact_per_funding / benchmark['impact_per_funding']) - 1) * 100
-        team_size_vs_industry = ((company_data['employees'] / benchmark['employees_per_company']) - 1) * 100
+        bundles = load_company_bundles(real_version, filters, search_term, filtered_df, real_metrics)
+        company_deep_dive(bundles, real_df, real_version, chart_cache.input_hash(real_version, filters, search_term))
+    
+    @chart_fragment
+    @trace.section("materiality_matrix")
+    def materiality_matrix_section(filtered_df, filters, search_term, real_metrics, real_version):
+        # IMPACT MATERIALITY MATRIX
+        st.markdown("---")
+        st.markdown("#### 🎯 Impact Materiality Matrix")
+        st.markdown("*Strategic portfolio view: Financial Performance vs. Impact Performance*")
         
-        st.markdown(f"**Industry Benchmark:** {benchmark['description']}")
-        st.markdown("")
+        # Synthetic financial performance vs. impact performance (see scoring.py)
+        with st.expander("⚖️ Financial score weights"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                stage_weight = st.slider("Stage maturity", 0, 100, int(scoring.DEFAULT_WEIGHTS["stage"] * 100), 5, key="weight_stage")
+            with col2:
+                funding_weight = st.slider("Funding per employee", 0, 100, int(scoring.DEFAULT_WEIGHTS["funding_efficiency"] * 100), 5, key="weight_funding")
+            with col3:
+                sector_weight = st.slider("Sector multiplier", 0, 100, int(scoring.DEFAULT_WEIGHTS["sector"] * 100), 5, key="weight_sector")
+            st.caption("Weights are rescaled to sum to 100%, so scores stay on a 0-100 scale.")
+        weights = (("stage", stage_weight), ("funding_efficiency", funding_weight), ("sector", sector_weight))
+        financial_scores = load_financial_scores(real_version, weights)
+        scored = analytics.materiality_scores(filtered_df, real_metrics, financial_scores)
+        median_financial, median_impact, stars, impact_leaders = analytics.materiality_quadrants(scored)
+        
+        # The scored frame can be large; it is fully determined by the data
+        # version, filters and weights, so key the chart on those instead
+        show_chart(
+            "materiality_matrix", scored, median_financial, median_impact,
+            data_key=chart_cache.input_hash(real_version, filters, search_term, weights),
+        )
         
-        col1, col2, col3 = st.columns(3)
+        col1, col2 = st.columns(2)
         
         with col1:
-            st.metric(
-                "Impact per Employee",
-                f"{impact_per_employee:.1f} tCO₂e",
-                delta=f"{impact_emp_vs_industry:+.0f}% vs industry avg ({benchmark['impact_per_employee']} tCO₂e)",
-                help=f"Industry average for {benchmark['description']}: {benchmark['impact_per_employee']} tCO₂e per employee"
+            st.success(
+                f"""
+                **⭐ Stars (High Financial + High Impact):**
+                
+                {', '.join(stars['company'].tolist()) if len(stars) > 0 else 'None in this quadrant'}
+                
+                These companies represent the ideal portfolio holdings - strong financial returns with significant climate impact.
+                """
             )
         
         with col2:
-            st.metric(
-                "Impact per $1M Funding",
-                f"{impact_per_funding:.1f}K tCO₂e",
-                delta=f"{impact_fund_vs_industry:+.0f}% vs industry avg ({benchmark['impact_per_funding']}K tCO₂e)",
-                help=f"Industry average for {benchmark['description']}: {benchmark['impact_per_funding']}K tCO₂e per $1M"
-            )
-        
-        with col3:
-            st.metric(
-                "Team Size",
-                f"{company_data['employees']:,}",
-                delta=f"{team_size_vs_industry:+.0f}% vs industry avg ({benchmark['employees_per_company']})",
-                help=f"Industry average team size for {benchmark['description']}: {benchmark['employees_per_company']} employees"
+            st.info(
+                f"""
+                **🌱 Impact Leaders (High Impact, Developing Returns):**
+                
+                {', '.join(impact_leaders['company'].tolist()) if len(impact_leaders) > 0 else 'None in this quadrant'}
+                
+                These companies are impact-first plays that may require longer time horizons to achieve financial maturity.
+                """
             )
+    
+    @chart_fragment
+    @trace.section("deep_dive")
+    def company_deep_dive(bundles, real_df, real_version, view_key):
+        selected_company = st.selectbox(
+            "Select a company for detailed analysis:",
+            bundles["names"]
+        )
         
-        # Visualization: Company vs Industry Benchmark
-        st.markdown("#### Company vs. Industry Benchmark Comparison")
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
-        
-        # Chart 1: Impact Efficiency Comparison
-        categories = ['Impact per\nEmployee', 'Impact per\n$1M Funding']
-        company_values = [impact_per_employee, impact_per_funding]
-        industry_values = [benchmark['impact_per_employee'], benchmark['impact_per_funding']]
-        
-        x = np.arange(len(categories))
-        width = 0.35
-        
-        bars1 = ax1.bar(x - width/2, industry_values, width, label='Industry Average', color='#90A4AE', alpha=0.7)
-        bars2 = ax1.bar(x + width/2, company_values, width, label=company_data['company'], color='#2E7D32', alpha=0.8)
-        
-        ax1.set_ylabel('Impact Metrics', fontweight='bold')
-        ax1.set_title('Impact Performance vs. Industry', fontweight='bold')
-        ax1.set_xticks(x)
-        ax1.set_xticklabels(categories)
-        ax1.legend()
-        ax1.grid(axis='y', alpha=0.3)
-        
-        # Add value labels on bars
-        for bars in [bars1, bars2]:
-            for bar in bars:
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{height:.1f}',
-                        ha='center', va='bottom', fontsize=9)
-        
-        # Chart 2: Performance Index (100 = industry average)
-        performance_metrics = {
-            'Impact\nEfficiency': (impact_per_employee / benchmark['impact_per_employee']) * 100,
-            'Capital\nEfficiency': (impact_per_funding / benchmark['impact_per_funding']) * 100,
-            'Team\nSize': (company_data['employees'] / benchmark['employees_per_company']) * 100
-        }
-        
-        colors = ['#059669' if v >= 100 else '#F59E0B' for v in performance_metrics.values()]
-        bars = ax2.barh(list(performance_metrics.keys()), list(performance_metrics.values()), color=colors, alpha=0.7)
-        
-        ax2.axvline(100, color='gray', linestyle='--', linewidth=2, label='Industry Average (100)')
-        ax2.set_xlabel('Performance Index (100 = Industry Avg)', fontweight='bold')
-        ax2.set_title('Relative Performance Index', fontweight='bold')
-        ax2.legend()
-        ax2.grid(axis='x', alpha=0.3)
-        
-        # Add value labels
-        for i, (bar, value) in enumerate(zip(bars, performance_metrics.values())):
-            ax2.text(value + 2, i, f'{value:.0f}', va='center', fontsize=10, fontweight='bold')
-        
-        plt.tight_layout()
-        st.pyplot(fig)
-        
-        # Sector insights
-        if impact_emp_vs_industry > 20 and impact_fund_vs_industry > 20:
-            performance_rating = "⭐⭐⭐ **Exceptional** - Significantly outperforms industry benchmarks"
-            color = "success"
-        elif impact_emp_vs_industry > 0 and impact_fund_vs_industry > 0:
-            performance_rating = "✅ **Above Average** - Outperforms industry benchmarks"
-            color = "success"
-        elif impact_emp_vs_industry > -20 and impact_fund_vs_industry > -20:
-            performance_rating = "🟡 **On Par** - Performs at industry average levels"
-            color = "info"
-        else:
-            performance_rating = "🔴 **Below Average** - Underperforms industry benchmarks (may indicate early stage or capital-intensive model)"
-            color = "warning"
-        
-        if color == "success":
-            st.success(
-                f"""
-                **Sector Performance Rating:** {performance_rating}
+        if selected_company:
+            bundle = company_bundles.company_bundle(bundles, selected_company)
+            company_data = bundle["company_data"]
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                st.markdown(f"## {company_data['company']}")
+                st.markdown(f"**{company_data['notes']}**")
+                st.markdown(f"**Sector:** {company_data['sector']} | **Subsector:** {company_data['subsector']}")
+                st.markdown(f"**Country:** {company_data['country']} | **Impact Lever:** {company_data['impact_lever']}")
+                
+            with col2:
+                st.markdown("### Key Metrics")
+                st.metric("Funding Raised", f"${company_data['funding_raised_m']:.0f}M",
+                          delta=company_quarter_delta(company_data['company'], "funding_raised_m"),
+                          chart_data=company_trend(company_data['company'], "funding_raised_m"))
+                st.metric("Employees", f"{company_data['employees']:,}",
+                          delta=company_quarter_delta(company_data['company'], "employees"),
+                          chart_data=company_trend(company_data['company'], "employees"))
+                st.metric("Founded", int(company_data['year_founded']))
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Annual Impact", f"{company_data['estimated_annual_tco2e_avoided_k']:.0f}K tCO₂e",
+                          delta=company_quarter_delta(company_data['company'], "estimated_annual_tco2e_avoided_k"),
+                          chart_data=company_trend(company_data['company'], "estimated_annual_tco2e_avoided_k"))
+            with col2:
+                st.metric("Investment Stage", company_data['investment_stage'])
+            with col3:
+                st.metric(company_data['scale_indicator'], f"{company_data['scale_value']:,}")
+            
+            # THREE COMPARISON METRICS (Enhanced from 1 to 3)
+            st.markdown("### Comparative Efficiency Metrics")
+            st.markdown("*These metrics help compare companies across different sectors and stages*")
+            
+            # All three metrics plus portfolio averages for comparison
+            impact_per_employee = bundle["impact_per_employee"]
+            impact_per_funding = bundle["impact_per_funding"]
+            funding_per_employee = bundle["funding_per_employee"]
+            avg_impact_per_employee = bundle["avg_impact_per_employee"]
+            avg_impact_per_funding = bundle["avg_impact_per_funding"]
+            avg_funding_per_employee = bundle["avg_funding_per_employee"]
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.markdown("#### 1️⃣ Impact Efficiency")
+                st.metric(
+                    "Impact per Employee", 
+                    f"{impact_per_employee:.1f} tCO₂e",
+                    delta=f"{((impact_per_employee / avg_impact_per_employee - 1) * 100):.0f}% vs portfolio avg",
+                    help="Annual tCO₂e avoided per employee. Higher is better - indicates more impact per person."
+                )
+                
+            with col2:
+                st.markdown("#### 2️⃣ Capital Efficiency")
+                st.metric(
+                    "Impact per $1M Funding", 
+                    f"{impact_per_funding:.1f}K tCO₂e",
+                    delta=f"{((impact_per_funding / avg_impact_per_funding - 1) * 100):.0f}% vs portfolio avg",
+                    help="Annual tCO₂e avoided per $1M invested. Higher is better - indicates more impact per dollar."
+                )
+                
+            with col3:
+                st.markdown("#### 3️⃣ Team Leverage")
+                st.metric(
+                    "Funding per Employee", 
+                    f"${funding_per_employee:.2f}M",
+                    delta=f"{((funding_per_employee / avg_funding_per_employee - 1) * 100):.0f}% vs portfolio avg",
+                    help="Total funding raised per employee. Indicates capital intensity and team leverage."
+                )
+            
+            # Visualization comparing company to portfolio
+            st.markdown("### Company vs. Portfolio Benchmarks")
+            
+            show_chart("company_vs_portfolio", bundle, data_key=(view_key, selected_company))
+            
+            with trace.section("benchmarking"):
+                # SECTOR BENCHMARKING SECTION
+                st.markdown("---")
+                st.markdown("### 🎯 Sector Benchmarking Analysis")
+                st.markdown("*Comparison to industry averages for similar companies*")
+                
+                benchmark = bundle["benchmark"]
+                
+                # vs. industry benchmark
+                impact_emp_vs_industry = bundle["impact_emp_vs_industry"]
+                impact_fund_vs_industry = bundle["impact_fund_vs_industry"]
+                team_size_vs_industry = bundle["team_size_vs_industry"]
+                
+                st.markdown(f"**Industry Benchmark:** {benchmark['description']}")
+                st.markdown("")
+                
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.metric(
+                        "Impact per Employee",
+                        f"{impact_per_employee:.1f} tCO₂e",
+                        delta=f"{impact_emp_vs_industry:+.0f}% vs industry avg ({benchmark['impact_per_employee']} tCO₂e)",
+                        help=f"Industry average for {benchmark['description']}: {benchmark['impact_per_employee']} tCO₂e per employee"
+                    )
+                
+                with col2:
+                    st.metric(
+                        "Impact per $1M Funding",
+                        f"{impact_per_funding:.1f}K tCO₂e",
+                        delta=f"{impact_fund_vs_industry:+.0f}% vs industry avg ({benchmark['impact_per_funding']}K tCO₂e)",
+                        help=f"Industry average for {benchmark['description']}: {benchmark['impact_per_funding']}K tCO₂e per $1M"
+                    )
+                
+                with col3:
+                    st.metric(
+                        "Team Size",
+                        f"{company_data['employees']:,}",
+                        delta=f"{team_size_vs_industry:+.0f}% vs industry avg ({benchmark['employees_per_company']})",
+                        help=f"Industry average team size for {benchmark['description']}: {benchmark['employees_per_company']} employees"
+                    )
+                
+                # Visualization: Company vs Industry Benchmark
+                st.markdown("#### Company vs. Industry Benchmark Comparison")
+                
+                show_chart("company_vs_industry", bundle, benchmark, bundle["performance_index"],
+                           data_key=(view_key, selected_company))
+                
+                # Sector insights
+                performance_rating, color = bundle["rating"], bundle["rating_alert"]
+                
+                if color == "success":
+                    st.success(
+                        f"""
+                        **Sector Performance Rating:** {performance_rating}
+                        
+                        **Key Insight:** {company_data['company']} demonstrates strong performance relative to {benchmark['description']}. 
+                        {'This suggests efficient impact generation and strong execution.' if impact_fund_vs_industry > 0 else 'The company shows solid impact efficiency metrics.'}
+                        """
+                    )
+                elif color == "info":
+                    st.info(
+                        f"""
+                        **Sector Performance Rating:** {performance_rating}
+                        
+                        **Key Insight:** {company_data['company']} performs in line with industry norms for {benchmark['description']}. 
+                        This indicates standard operational efficiency for the sector.
+                        """
+                    )
+                else:
+                    st.warning(
+                        f"""
+                        **Sector Performance Rating:** {performance_rating}
+                        
+                        **Key Insight:** {company_data['company']}'s metrics are below industry averages, which may reflect: 
+                        (1) early-stage operations still scaling, (2) capital-intensive business model, or (3) conservative impact accounting. 
+                        This is common for hardware and deep tech companies.
+                        """
+                    )
+            
+            with trace.section("methodology"):
+                # ADD FRAMEWORK METHODOLOGY SECTION
+                st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
+                components.methodology_card("Impact Measurement Methodology")
+                
+                methodology = impact_memo.methodology_for(company_data['sector'])
+                
+                # PROMINENT METHODOLOGY SECTION - ALWAYS VISIBLE
+                st.markdown("<div class='methodology-body'>", unsafe_allow_html=True)
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown("**Sector-Specific Methodology**")
+                    st.markdown(f"**Sector:** {company_data['sector']}")
+                    st.markdown(f"**Subsector:** {company_data['subsector']}")
+                    st.markdown(f"**Baseline Comparison:** {methodology['baseline']}")
+                    st.markdown(f"**Framework Applied:** {methodology['framework']}")
+                    st.markdown(f"**Data Quality Tier:** {methodology['data_quality']}")
+                    st.markdown(f"**Approach:** {methodology['description']}")
+                    st.markdown("")
+                    st.markdown("**Equity & Just Transition Considerations:**")
+                    st.markdown("Impact assessments consider distributional effects and stakeholder impacts. We evaluate who benefits from climate solutions, whether vulnerable populations are affected, and if the transition creates equitable opportunities (e.g., job creation in affected communities, access to clean energy benefits).")
+                
+                with col2:
+                    st.markdown("**Framework Alignment**")
+                    
+                    st.markdown("**TCFD Alignment:**")
+                    st.markdown("- ✅ Transition opportunity assessment (low-carbon solutions)")
+                    st.markdown("- ✅ Market opportunity sizing in climate transition")
+                    st.markdown("- ✅ Technology readiness and scalability metrics")
+                    
+                    st.markdown("")
+                    st.markdown("**SFDR Alignment:**")
+                    st.markdown("- ✅ PAI 4: Exposure to fossil fuel sector (inverse - enabling transition)")
+                    st.markdown("- ✅ PAI 13: Governance and impact measurement practices")
+                    st.markdown("- ✅ Sustainable investment contribution (Article 9 alignment)")
+                
+                st.markdown("<hr style='margin: 32px 0; border-color: var(--border-light);'>", unsafe_allow_html=True)
+                st.markdown("<p style='font-weight: 600; margin-bottom: 16px;'>Industry Standards Applied:</p>", unsafe_allow_html=True)
+                
+                frameworks = [
+                    ("GHG Protocol", "Scope 3 Category 11"),
+                    ("PCAF", "Portfolio attribution"),
+                    ("TCFD", "Climate risk metrics"),
+                    ("SFDR", "PAI indicators"),
+                ]
+                for col, (name, detail) in zip(st.columns(4), frameworks):
+                    with col:
+                        components.framework_badge(name, detail)
+                
+                st.markdown("</div>", unsafe_allow_html=True)  # Close methodology-body
+            
+            with trace.section("sensitivity"):
+                st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
+                st.markdown("---")
+                st.markdown("### 🌪️ Impact Sensitivity")
+                st.markdown("*How the annual impact estimate moves when each model input is set to its low or high value, the others held at base*")
+                
+                models_version = reference_data.versions()["impact_models"]
+                sensitivity_data = load_sensitivity(real_version, models_version)
+                tornado = sensitivity.company_tornado(sensitivity_data, real_df.index.get_loc(company_data.name))
+                
+                show_chart("tornado", tornado, company_data['estimated_annual_tco2e_avoided_k'],
+                           f"{company_data['company']}: Annual Impact Sensitivity",
+                           data_key=(view_key, selected_company, models_version))
+                
+                top = tornado.iloc[0]
+                st.info(
+                    f"**Largest driver:** {top['driver']} moves the estimate from "
+                    f"{top['low_impact']:,.0f}K to {top['high_impact']:,.0f}K tCO₂e "
+                    f"({top['low_change']:+.0f}% / {top['high_change']:+.0f}%)."
+                )
+                
+                st.dataframe(
+                    tornado.drop(columns="swing").style.format({
+                        "low_input": "{:.2f}", "base_input": "{:.2f}", "high_input": "{:.2f}",
+                        "low_impact": "{:,.0f}K", "high_impact": "{:,.0f}K",
+                        "low_change": "{:+.1f}%", "high_change": "{:+.1f}%",
+                    }),
+                    hide_index=True,
+                    width="stretch",
+                )
+            
+            with trace.section("memo"):
+                # ADD DECISION MEMO SECTION
+                st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
+                st.markdown("---")
+                st.markdown("### 📝 Impact Assessment Memo")
+                st.markdown("*Pre-investment impact diligence summary*")
+                
+                memo = impact_memo.decision_memo(bundle)
+                
+                st.markdown("""<div style='background-color: #F8F9FA; padding: 24px; border-radius: 8px; border-left: 4px solid #2563EB;'>""", unsafe_allow_html=True)
                 
-                **Key Insight:** {company_data['company']} demonstrates strong performance relative to {benchmark['description']}. 
-                {'This suggests efficient impact generation and strong execution.' if impact_fund_vs_industry > 0 else 'The company shows solid impact efficiency metrics.'}
-                """
-            )
-        elif color == "info":
-            st.info(
-                f"""
-                **Sector Performance Rating:** {performance_rating}
+                for key, heading in impact_memo.MEMO_SECTIONS:
+                    st.markdown(f"**{heading}**")
+                    st.markdown(memo[key])
+                    if key != "recommendation":
+                        st.markdown("")
                 
-                **Key Insight:** {company_data['company']} performs in line with industry norms for {benchmark['description']}. 
-                This indicates standard operational efficiency for the sector.
-                """
-            )
-        else:
-            st.warning(
-                f"""
-                **Sector Performance Rating:** {performance_rating}
+                st.markdown("</div>", unsafe_allow_html=True)
                 
-                **Key Insight:** {company_data['company']}'s metrics are below industry averages, which may reflect: 
-                (1) early-stage operations still scaling, (2) capital-intensive business model, or (3) conservative impact accounting. 
-                This is common for hardware and deep tech companies.
-                """
-            )
-        
-        # ADD FRAMEWORK METHODOLOGY SECTION
-        st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
+                st.caption("*This assessment demonstrates the framework for pre-investment impact diligence, adapted from outcomes-based evaluation methodologies and aligned with GHG Protocol, PCAF, and TCFD guidance.*")
+            
+            # Pre-render the charts of the companies next to this one in the
+            # list, so switching to them finds their PNGs already cached
+            for neighbour in company_bundles.neighbours(bundles, selected_company, NEIGHBOUR_PREFETCH):
+                neighbour_bundle = company_bundles.company_bundle(bundles, neighbour)
+                prefetch_chart("company_vs_portfolio", neighbour_bundle, data_key=(view_key, neighbour))
+                prefetch_chart("company_vs_industry", neighbour_bundle, neighbour_bundle["benchmark"],
+                               neighbour_bundle["performance_index"], data_key=(view_key, neighbour))
+    
+    portfolio_explorer(real_df, real_cube, real_metrics, real_masks, search_index, real_version)
+    
+    with trace.section("history"):
+        st.markdown("<div style='margin: 64px 0 32px 0;'></div>", unsafe_allow_html=True)
         st.markdown("""
-        <div class="methodology-card">
-            <div class="methodology-header">
-                Impact Measurement Methodology
-            </div>
+        <div class="section-header">
+            Portfolio History
         </div>
         """, unsafe_allow_html=True)
         
-        # Sector-specific methodology mapping
-        sector_methodologies = {
-            "Energy": {
-                "baseline": "Natural gas combined cycle (NGCC) at 0.45 kg CO2/kWh",
-                "framework": "GHG Protocol Scope 3, Category 11 (Use of Sold Products)",
-                "data_quality": "Tier 2 (Industry average capacity factors)",
-                "description": "Calculated avoided emissions from displaced fossil fuel generation"
-            },
-            "Agriculture": {
-                "baseline": "Conventional farming practices and supply chain emissions",
-                "framework": "GHG Protocol Scope 3, Categories 1 & 11",
-                "data_quality": "Tier 2 (Agricultural research data and IPCC factors)",
-                "description": "Measured reduction in agricultural emissions and improved soil carbon sequestration"
-            },
-            "Software": {
-                "baseline": "Manual processes and inefficient resource allocation",
-                "framework": "Indirect enablement - TCFD metrics for portfolio companies",
-                "data_quality": "Tier 3 (Modeled impact through customer base)",
-                "description": "Estimated emissions reductions enabled through customer optimization"
-            },
-            "Industry": {
-                "baseline": "Standard industrial processes and material production",
-                "framework": "GHG Protocol Scope 1 & 2 reduction potential",
-                "data_quality": "Tier 2 (Industry benchmarks and engineering estimates)",
-                "description": "Direct emissions reductions from process optimization"
-            },
-            "Transportation": {
-                "baseline": "Conventional transportation modes and logistics",
-                "framework": "GHG Protocol Scope 3, Category 4 (Upstream Transportation)",
-                "data_quality": "Tier 2 (Transportation emission factors)",
-                "description": "Avoided emissions from optimized routing and modal shifts"
-            }
-        }
-        
-        methodology = sector_methodologies.get(company_data['sector'], {
-            "baseline": "Sector-specific conventional practices",
-            "framework": "GHG Protocol Scope 3",
-            "data_quality": "Tier 2 (Industry averages)",
-            "description": "Impact calculated using sector-specific methodologies"
-        })
-        
-        # PROMINENT METHODOLOGY SECTION - ALWAYS VISIBLE
-        st.markdown("<div class='methodology-body'>", unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**Sector-Specific Methodology**")
-            st.markdown(f"**Sector:** {company_data['sector']}")
-            st.markdown(f"**Subsector:** {company_data['subsector']}")
-            st.markdown(f"**Baseline Comparison:** {methodology['baseline']}")
-            st.markdown(f"**Framework Applied:** {methodology['framework']}")
-            st.markdown(f"**Data Quality Tier:** {methodology['data_quality']}")
-            st.markdown(f"**Approach:** {methodology['description']}")
-            st.markdown("")
-            st.markdown("**Equity & Just Transition Considerations:**")
-            st.markdown("Impact assessments consider distributional effects and stakeholder impacts. We evaluate who benefits from climate solutions, whether vulnerable populations are affected, and if the transition creates equitable opportunities (e.g., job creation in affected communities, access to clean energy benefits).")
-        
-        with col2:
-            st.markdown("**Framework Alignment**")
-            
-            st.markdown("**TCFD Alignment:**")
-            st.markdown("- ✅ Transition opportunity assessment (low-carbon solutions)")
-            st.markdown("- ✅ Market opportunity sizing in climate transition")
-            st.markdown("- ✅ Technology readiness and scalability metrics")
+        history_totals = history["totals"]
+        if len(history_totals) < 2:
+            first = history_totals.index[0].strftime("%b %d, %Y") if len(history_totals) else "the first load"
+            st.caption(f"History starts with the snapshot of {first}. Quarter-over-quarter and year-over-year changes appear once older snapshots are on record (`python snapshot_history.py --csv <older CSV> --as-of <date>` records a past version).")
+        else:
+            col1, col2, col3 = st.columns(3)
+            latest = history_totals.iloc[-1]
+            for col, measure, label, value in (
+                (col1, "funding_raised_m", "Total Funding", f"${latest['funding_raised_m']:,.0f}M"),
+                (col2, "employees", "Headcount", f"{latest['employees']:,.0f}"),
+                (col3, "estimated_annual_tco2e_avoided_k", "Annual Impact", f"{latest['estimated_annual_tco2e_avoided_k']:,.0f}K tCO₂e"),
+            ):
+                quarter, year = history_change("quarter", measure), history_change("year", measure)
+                with col:
+                    st.metric(
+                        label, value,
+                        delta=None if quarter is None else f"{quarter:+.1%} QoQ",
+                        help=None if year is None else f"{year:+.1%} year over year",
+                    )
             
-            st.markdown("")
-            st.markdown("**SFDR Alignment:**")
-            st.markdown("- ✅ PAI 4: Exposure to fossil fuel sector (inverse - enabling transition)")
-            st.markdown("- ✅ PAI 13: Governance and impact measurement practices")
-            st.markdown("- ✅ Sustainable investment contribution (Article 9 alignment)")
-        
-        st.markdown("<hr style='margin: 32px 0; border-color: var(--border-light);'>", unsafe_allow_html=True)
-        st.markdown("<p style='font-weight: 600; margin-bottom: 16px;'>Industry Standards Applied:</p>", unsafe_allow_html=True)
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.markdown("""
-            <div class="framework-badge">
-                <div>
-                    <div class="framework-badge-text">GHG Protocol</div>
-                    <div style="font-size: 0.75rem; color: var(--text-tertiary);">Scope 3 Category 11</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col2:
-            st.markdown("""
-            <div class="framework-badge">
-                <div>
-                    <div class="framework-badge-text">PCAF</div>
-                    <div style="font-size: 0.75rem; color: var(--text-tertiary);">Portfolio attribution</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col3:
-            st.markdown("""
-            <div class="framework-badge">
-                <div>
-                    <div class="framework-badge-text">TCFD</div>
-                    <div style="font-size: 0.75rem; color: var(--text-tertiary);">Climate risk metrics</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        with col4:
-            st.markdown("""
-            <div class="framework-badge">
-                <div>
-                    <div class="framework-badge-text">SFDR</div>
-                    <div style="font-size: 0.75rem; color: var(--text-tertiary);">PAI indicators</div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)  # Close methodology-body
-        
-        # ADD DECISION MEMO SECTION
-        st.markdown("<div style='margin: 48px 0;'></div>", unsafe_allow_html=True)
-        st.markdown("---")
-        st.markdown("### 📝 Impact Assessment Memo")
-        st.markdown("*Pre-investment impact diligence summary*")
-        
-        # Generate decision memo based on company
-        decision_memos = {
-            "Fervo Energy": {
-                "problem": "Geothermal energy has historically been limited to specific geographic regions with shallow, high-temperature resources. Conventional geothermal provides only ~0.4% of U.S. electricity despite massive potential. Baseload clean energy is critical for grid decarbonization, but solar and wind are intermittent.",
-                "solution": "Fervo Energy uses advanced drilling techniques (from oil & gas) to access geothermal resources at greater depths and in more locations. This enables 24/7 clean baseload power that can replace fossil fuel generation.",
-                "counterfactual": "Without Fervo's technology, new electricity demand in their target markets would likely be met by natural gas combined cycle (NGCC) plants at 0.45 kg CO₂/kWh. Fervo's geothermal provides <0.05 kg CO₂/kWh.",
-                "additionality": "Fervo is pioneering a new category of 'next-generation geothermal' that wouldn't exist without their innovation. Their approach unlocks resources that were previously uneconomical, creating net-new clean energy capacity rather than displacing existing renewables.",
-                "impact_estimate": f"Based on current capacity of {company_data['scale_value']:,} {company_data['scale_indicator']}, Fervo avoids an estimated {company_data['estimated_annual_tco2e_avoided_k']:.0f}K tons CO₂e annually vs. natural gas baseline. At scale (target of 400 MW by 2028), this could reach 2.5M tons CO₂e avoided per year.",
-                "material_risks": "**Technical Risk:** Drilling success rate and reservoir performance. **Market Risk:** Competition from falling solar/wind + battery costs. **Regulatory Risk:** Permitting delays for geothermal projects. **Financial Risk:** High upfront capital requirements ($200M+ per project).",
-                "sensitivity": "Impact estimate is sensitive to: (1) Capacity factor assumptions (90% vs. 80% = ±11% impact), (2) Grid emission factor baseline (varies by region), (3) Attribution methodology (operational vs. contracted capacity).",
-                "recommendation": "**Strong Impact Case.** Fervo addresses a critical gap in the clean energy portfolio (24/7 baseload) with a scalable technology. Capital-intensive model requires patient capital, but impact potential is exceptional. The company demonstrates 60% higher impact per employee than industry average. Recommend investment with focus on project-level execution and offtake agreements."
-            },
-            "Pulsora": {
-                "problem": "Industrial facilities (manufacturing, data centers, etc.) face volatile energy costs and lack real-time optimization tools. Energy waste is common, and facilities struggle to integrate renewables and storage effectively. This results in both higher costs and higher emissions.",
-                "solution": "Pulsora provides AI-powered energy management software that optimizes industrial energy use in real-time, reducing waste and enabling better integration of renewables and battery storage.",
-                "counterfactual": "Without Pulsora, industrial facilities would continue using manual energy management or legacy systems, resulting in 10-20% higher energy consumption and continued reliance on grid power during peak (high-carbon) hours.",
-                "additionality": "Pulsora's software enables emissions reductions that wouldn't occur otherwise. Their AI-driven approach provides optimization beyond what facility managers could achieve manually, creating net-new efficiency gains.",
-                "impact_estimate": f"Current customer base enables an estimated {company_data['estimated_annual_tco2e_avoided_k']:.0f}K tons CO₂e avoided annually through energy optimization and renewable integration. Impact scales linearly with customer adoption.",
-                "material_risks": "**Adoption Risk:** Requires behavior change from facility managers. **Measurement Risk:** Impact attribution is indirect (enablement model). **Competition Risk:** Incumbent building management systems adding AI features. **Scalability Risk:** High-touch sales model may limit growth.",
-                "sensitivity": "Impact estimate is sensitive to: (1) Customer energy savings assumptions (15% vs. 10% = 50% impact difference), (2) Grid emission factors (varies by region and time), (3) Counterfactual baseline (what customers would do without Pulsora).",
-                "recommendation": "**Strong Impact and Financial Case.** Pulsora demonstrates exceptional performance with 28% IRR (56% above portfolio average) and 2x impact efficiency vs. portfolio. Software model provides high scalability with lower capital requirements than hardware. Impact measurement requires robust customer data collection and conservative attribution. Recommend investment with focus on measurement infrastructure and customer case studies."
-            }
-        }
-        
-        # Default memo for other companies
-        default_memo = {
-            "problem": f"{company_data['company']} addresses critical challenges in the {company_data['sector']} sector, where conventional approaches result in significant carbon emissions and inefficiencies.",
-            "solution": f"{company_data['notes']}",
-            "counterfactual": f"Without {company_data['company']}'s solution, the market would continue using conventional {company_data['sector'].lower()} approaches with higher emissions intensity.",
-            "additionality": f"{company_data['company']}'s approach creates net-new emissions reductions by enabling solutions that wouldn't exist otherwise in the market.",
-            "impact_estimate": f"Based on current operations, {company_data['company']} avoids an estimated {company_data['estimated_annual_tco2e_avoided_k']:.0f}K tons CO₂e annually. Impact scales with company growth and market adoption.",
-            "material_risks": f"**Market Risk:** Competition and technology adoption. **Technical Risk:** Execution and scalability. **Measurement Risk:** Impact attribution and data quality. **Financial Risk:** Capital requirements and path to profitability.",
-            "sensitivity": "Impact estimates are sensitive to baseline assumptions, attribution methodology, and data quality. Conservative assumptions applied where data is limited.",
-            "recommendation": f"**Impact Assessment:** {company_data['company']} demonstrates {'strong' if impact_per_funding > avg_impact_per_funding else 'solid'} impact potential in the {company_data['sector']} sector. {'Exceptional performance vs. portfolio benchmarks.' if impact_per_funding > avg_impact_per_funding * 1.2 else 'Performance in line with portfolio expectations.'} Recommend {'investment' if impact_per_funding > avg_impact_per_funding else 'further diligence'} with focus on impact measurement infrastructure and scalability."
-        }
-        
-        memo = decision_memos.get(company_data['company'], default_memo)
-        
-        st.markdown("""<div style='background-color: #F8F9FA; padding: 24px; border-radius: 8px; border-left: 4px solid #2563EB;'>""", unsafe_allow_html=True)
-        
-        st.markdown("**1. Problem Framing**")
-        st.markdown(memo["problem"])
-        st.markdown("")
-        
-        st.markdown("**2. Solution & Theory of Change**")
-        st.markdown(memo["solution"])
-        st.markdown("")
-        
-        st.markdown("**3. Counterfactual Analysis**")
-        st.markdown(memo["counterfactual"])
-        st.markdown("")
-        
-        st.markdown("**4. Additionality Assessment**")
-        st.markdown(memo["additionality"])
-        st.markdown("")
-        
-        st.markdown("**5. Impact Estimate**")
-        st.markdown(memo["impact_estimate"])
-        st.markdown("")
-        
-        st.markdown("**6. Material Risks**")
-        st.markdown(memo["material_risks"])
-        st.markdown("")
-        
-        st.markdown("**7. Sensitivity Analysis**")
-        st.markdown(memo["sensitivity"])
-        st.markdown("")
-        
-        st.markdown("**8. Investment Recommendation**")
-        st.markdown(memo["recommendation"])
-        
-        st.markdown("</div>", unsafe_allow_html=True)
-        
-        st.caption("*This assessment demonstrates the framework for pre-investment impact diligence, adapted from outcomes-based evaluation methodologies and aligned with GHG Protocol, PCAF, and TCFD guidance.*")
+            show_chart("portfolio_history", history_totals, data_key=history_version)
+            st.caption(f"{len(history_totals)} snapshots since {history_totals.index[0]:%b %d, %Y}; one is recorded for every version of the portfolio CSV.")
     
     # ADD METHODS & SOURCES SECTION AT END OF TAB
     st.markdown("<div style='margin: 64px 0 32px 0;'></div>", unsafe_allow_html=True)
@@ -1503,307 +1102,362 @@ elif tab_choice == "🔬 Sandbox Deep Dive":
     # Add view selector
     view_mode = st.radio(
         "Select Analysis View:",
-        ["Portfolio Overview", "Company Drill-Down"],
+        ["Portfolio Overview", "Company Drill-Down", "Scenario Analysis", "Allocation Optimizer"],
         horizontal=True
     )
     
     if view_mode == "Portfolio Overview":
-        # Portfolio summary metrics
-        col1, col2, col3, col4, col5, col6 = st.columns(6)
-        
-        total_investment = sandbox_df["Investment ($M)"].sum()
-        avg_irr = sandbox_df["IRR (%)"].mean()
-        total_impact = sandbox_df["Lifetime tCO2e Avoided (M)"].sum()
-        avg_payback = sandbox_df["Payback Period (years)"].mean()
-        portfolio_efficiency = (sandbox_df["Lifetime tCO2e Avoided (M)"].sum() * 1000) / total_investment
-        high_irr_count = len(sandbox_df[sandbox_df["IRR (%)"] > 20])
-        
-        with col1:
-            st.metric("Total Investment", f"${total_investment:.1f}M")
-        with col2:
-            st.metric("Average IRR", f"{avg_irr:.1f}%")
-        with col3:
-            st.metric("Total Lifetime Impact", f"{total_impact:.1f}M tCO₂e")
-        with col4:
-            st.metric("Avg Payback Period", f"{avg_payback:.1f} years")
-        with col5:
-            st.metric("Portfolio Efficiency", f"{portfolio_efficiency:.0f} tCO₂e/$K")
-        with col6:
-            st.metric("High IRR Companies (>20%)", f"{high_irr_count}/{len(sandbox_df)}")
-        
-        st.markdown("---")
-        st.markdown("### Investment & Impact Analysis")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### Investment vs. Lifetime Impact")
-            fig, ax = plt.subplots(figsize=(8, 6))
-            scatter = ax.scatter(
-                sandbox_df["Investment ($M)"],
-                sandbox_df["Lifetime tCO2e Avoided (M)"],
-                s=sandbox_df["IRR (%)"] * 10,
-                c=sandbox_df["IRR (%)"],
-                cmap="RdYlGn",
-                alpha=0.7,
-                edgecolors="black"
-            )
-            
-            for idx, row in sandbox_df.iterrows():
-                ax.annotate(
-                    row["Company"],
-                    (row["Investment ($M)"], row["Lifetime tCO2e Avoided (M)"]),
-                    fontsize=11,
-                    fontweight='bold',
-                    ha='center'
-                )
+        with trace.section("sandbox_summary"):
+            # Portfolio summary metrics
+            col1, col2, col3, col4, col5, col6 = st.columns(6)
             
-            ax.set_xlabel("Investment ($M)", fontsize=12)
-            ax.set_ylabel("Lifetime tCO₂e Avoided (M)", fontsize=12)
-            ax.set_title("Investment Size vs. Climate Impact", fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
+            summary = analytics.sandbox_summary(sandbox_df, sandbox_cube)
+            total_investment = summary["total_investment"]
+            avg_irr = summary["avg_irr"]
+            total_impact = summary["total_impact"]
+            avg_payback = summary["avg_payback"]
+            portfolio_efficiency = summary["portfolio_efficiency"]
+            high_irr_count = summary["high_irr_count"]
             
-            cbar = plt.colorbar(scatter, ax=ax)
-            cbar.set_label("IRR (%)", fontsize=10)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            with col1:
+                st.metric("Total Investment", f"${total_investment:.1f}M")
+            with col2:
+                st.metric("Average IRR", f"{avg_irr:.1f}%")
+            with col3:
+                st.metric("Total Lifetime Impact", f"{total_impact:.1f}M tCO₂e")
+            with col4:
+                st.metric("Avg Payback Period", f"{avg_payback:.1f} years")
+            with col5:
+                st.metric("Portfolio Efficiency", f"{portfolio_efficiency:.0f} tCO₂e/$K")
+            with col6:
+                st.metric("High IRR Companies (>20%)", f"{high_irr_count}/{len(sandbox_df)}")
         
-        with col2:
-            st.markdown("#### IRR vs. Impact Efficiency")
-            fig, ax = plt.subplots(figsize=(8, 6))
+        with trace.section("sandbox_charts"):
+            st.markdown("---")
+            st.markdown("### Investment & Impact Analysis")
             
-            efficiency = (sandbox_df["Lifetime tCO2e Avoided (M)"] * 1000) / sandbox_df["Investment ($M)"]
+            col1, col2 = st.columns(2)
             
-            scatter = ax.scatter(
-                sandbox_df["IRR (%)"],
-                efficiency,
-                s=sandbox_df["Investment ($M)"] * 3,
-                c=sandbox_df["Investment ($M)"],
-                cmap="viridis",
-                alpha=0.7,
-                edgecolors="black"
-            )
+            with col1:
+                st.markdown("#### Investment vs. Lifetime Impact")
+                show_chart("investment_vs_impact", sandbox_df, data_key=sandbox_version)
             
-            for idx, row in sandbox_df.iterrows():
-                eff_val = (row["Lifetime tCO2e Avoided (M)"] * 1000) / row["Investment ($M)"]
-                ax.annotate(
-                    row["Company"],
-                    (row["IRR (%)"], eff_val),
-                    fontsize=11,
-                    fontweight='bold',
-                    ha='center'
+            with col2:
+                st.markdown("#### IRR vs. Impact Efficiency")
+                show_chart(
+                    "irr_vs_efficiency", sandbox_df, sandbox_metrics["impact_efficiency"],
+                    data_key=sandbox_version,
                 )
-            
-            ax.set_xlabel("IRR (%)", fontsize=12)
-            ax.set_ylabel("Impact Efficiency (tCO₂e per $1K)", fontsize=12)
-            ax.set_title("Financial Return vs. Impact Efficiency", fontsize=14, fontweight='bold')
-            ax.grid(True, alpha=0.3)
-            
-            cbar = plt.colorbar(scatter, ax=ax)
-            cbar.set_label("Investment Size ($M)", fontsize=10)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        # Sector Analysis
-        st.markdown("---")
-        st.markdown("### Sector Analysis")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### Investment by Sector")
-            sector_investment = sandbox_df.groupby("Sector")["Investment ($M)"].sum().sort_values(ascending=True)
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sector_investment.plot(kind="barh", ax=ax, color="#2E7D32")
-            ax.set_xlabel("Total Investment ($M)")
-            ax.set_ylabel("")
-            ax.set_title("Capital Allocation by Sector")
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        with col2:
-            st.markdown("#### Impact by Sector")
-            sector_impact = sandbox_df.groupby("Sector")["Lifetime tCO2e Avoided (M)"].sum().sort_values(ascending=True)
-            fig, ax = plt.subplots(figsize=(8, 5))
-            sector_impact.plot(kind="barh", ax=ax, color="#1565C0")
-            ax.set_xlabel("Lifetime tCO₂e Avoided (M)")
-            ax.set_ylabel("")
-            ax.set_title("Climate Impact by Sector")
-            plt.tight_layout()
-            st.pyplot(fig)
-        
-        # Detailed Metrics Table
-        st.markdown("---")
-        st.markdown("### Detailed Portfolio Metrics")
-        
-        display_df = sandbox_df.copy()
-        display_df["Impact Efficiency"] = (display_df["Lifetime tCO2e Avoided (M)"] * 1000) / display_df["Investment ($M)"]
-        display_df["Annual Impact (K)"] = display_df["Annual tCO2e Avoided (K)"]
-        
-        st.dataframe(
-            display_df[[
-                "Company", "Sector", "Investment ($M)", "IRR (%)", 
-                "Payback Period (years)", "Risk Rating", "Lifetime tCO2e Avoided (M)",
-                "Annual Impact (K)", "Impact Efficiency"
-            ]].style.format({
-                "Investment ($M)": "${:.1f}M",
-                "IRR (%)": "{:.1f}%",
-                "Payback Period (years)": "{:.1f} years",
-                "Lifetime tCO2e Avoided (M)": "{:.1f}M",
-                "Annual Impact (K)": "{:.0f}K",
-                "Impact Efficiency": "{:.0f} tCO₂e/$K"
-            }),
-            use_container_width=True,
-            height=400
-        )
-        
-        # Export functionality
-        st.markdown("---")
-        csv = display_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download Portfolio Data (CSV)",
-            data=csv,
-            file_name="galvanize_sandbox_portfolio.csv",
-            mime="text/csv"
-        )
-    
-    elif view_mode == "Company Drill-Down":
-        st.markdown("### Individual Company Analysis")
-        
-        selected_company = st.selectbox(
-            "Select a company for detailed analysis:",
-            sandbox_df["Company"].tolist()
-        )
         
-        if selected_company:
-            company_data = sandbox_df[sandbox_df["Company"] == selected_company].iloc[0]
+        with trace.section("sandbox_sectors"):
+            # Sector Analysis
+            st.markdown("---")
+            st.markdown("### Sector Analysis")
             
-            # Company Header
-            col1, col2 = st.columns([2, 1])
+            col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown(f"## {company_data['Company']}")
-                st.markdown(f"**Sector:** {company_data['Sector']} | **Stage:** {company_data['Stage']}")
-            
-            with col2:
-                st.metric("Risk Rating", company_data['Risk Rating'])
-            
-            # Key Metrics
-            st.markdown("### Financial Metrics")
-            col1, col2, col3, col4 = st.columns(4)
+                st.markdown("#### Investment by Sector")
+                sector_investment = analytics.cube_sector_totals(sandbox_cube, "Investment ($M)", "Sector")
+                show_chart("sector_bar", sector_investment, "#2E7D32", "Total Investment ($M)", "Capital Allocation by Sector")
             
-            with col1:
-                st.metric("Investment", f"${company_data['Investment ($M)']:.1f}M")
             with col2:
-                st.metric("IRR", f"{company_data['IRR (%)']:.1f}%")
-            with col3:
-                st.metric("Payback Period", f"{company_data['Payback Period (years)']:.1f} years")
-            with col4:
-                efficiency = (company_data['Lifetime tCO2e Avoided (M)'] * 1000) / company_data['Investment ($M)']
-                st.metric("Impact Efficiency", f"{efficiency:.0f} tCO₂e/$K")
+                st.markdown("#### Impact by Sector")
+                sector_impact = analytics.cube_sector_totals(sandbox_cube, "Lifetime tCO2e Avoided (M)", "Sector")
+                show_chart("sector_bar", sector_impact, "#1565C0", "Lifetime tCO₂e Avoided (M)", "Climate Impact by Sector")
+        
+        with trace.section("sandbox_table"):
+            # Detailed Metrics Table
+            st.markdown("---")
+            st.markdown("### Detailed Portfolio Metrics")
             
-            # Impact Metrics
-            st.markdown("### Climate Impact")
-            col1, col2 = st.columns(2)
+            display_df = analytics.sandbox_display_frame(sandbox_df, sandbox_metrics)
             
-            with col1:
-                st.metric("Lifetime Impact", f"{company_data['Lifetime tCO2e Avoided (M)']:.1f}M tCO₂e")
-            with col2:
-                st.metric("Annual Impact", f"{company_data['Annual tCO2e Avoided (K)']:.0f}K tCO₂e")
+            show_table(
+                display_df, "sandbox_table", sandbox_version,
+                columns=[
+                    "Company", "Sector", "Investment ($M)", "IRR (%)", 
+                    "Payback Period (years)", "NPV ($M)", "MOIC (x)", "Returns Basis",
+                    "Risk Rating", "Lifetime tCO2e Avoided (M)",
+                    "Annual Impact (K)", "Impact Efficiency"
+                ],
+                formats={
+                    "Investment ($M)": "${:.1f}M",
+                    "IRR (%)": "{:.1f}%",
+                    "Payback Period (years)": "{:.1f} years",
+                    "NPV ($M)": "${:.1f}M",
+                    "MOIC (x)": "{:.2f}x",
+                    "Lifetime tCO2e Avoided (M)": "{:.1f}M",
+                    "Annual Impact (K)": "{:.0f}K",
+                    "Impact Efficiency": "{:.0f} tCO₂e/$K"
+                },
+            )
             
-            # Benchmark Comparison
+            # Export functionality
             st.markdown("---")
-            st.markdown("### Benchmark Comparison")
-            
-            # Calculate portfolio averages
-            avg_irr = sandbox_df["IRR (%)"].mean()
-            avg_payback = sandbox_df["Payback Period (years)"].mean()
-            avg_efficiency = ((sandbox_df["Lifetime tCO2e Avoided (M)"] * 1000) / sandbox_df["Investment ($M)"]).mean()
+            export_table(display_df, "📥 Download Portfolio Data", "galvanize_sandbox_portfolio", "sandbox_export")
+    
+    elif view_mode == "Company Drill-Down":
+        # A fragment, so picking another company reruns only the drill-down
+        @chart_fragment
+        @trace.section("sandbox_drilldown")
+        def sandbox_drilldown(sandbox_df, sandbox_metrics, sandbox_cube, sandbox_version):
+            st.markdown("### Individual Company Analysis")
             
-            col1, col2 = st.columns(2)
+            selected_company = st.selectbox(
+                "Select a company for detailed analysis:",
+                sandbox_df["Company"].tolist()
+            )
             
-            with col1:
-                st.markdown("#### Financial Performance vs. Portfolio")
-                fig, ax = plt.subplots(figsize=(8, 5))
+            if selected_company:
+                company_data = sandbox_df[sandbox_df["Company"] == selected_company].iloc[0]
+                company_metrics = sandbox_metrics.loc[company_data.name]
                 
-                metrics = ['IRR (%)', 'Payback\n(years)']
-                company_vals = [company_data['IRR (%)'], company_data['Payback Period (years)']]
-                portfolio_vals = [avg_irr, avg_payback]
+                # Company Header
+                col1, col2 = st.columns([2, 1])
                 
-                x = np.arange(len(metrics))
-                width = 0.35
+                with col1:
+                    st.markdown(f"## {company_data['Company']}")
+                    st.markdown(f"**Sector:** {company_data['Sector']} | **Stage:** {company_data['Stage']}")
                 
-                ax.bar(x - width/2, portfolio_vals, width, label='Portfolio Avg', color='#90A4AE')
-                ax.bar(x + width/2, company_vals, width, label=company_data['Company'], color='#2E7D32')
+                with col2:
+                    st.metric("Risk Rating", company_data['Risk Rating'])
                 
-                ax.set_ylabel('Value')
-                ax.set_title('Financial Metrics Comparison')
-                ax.set_xticks(x)
-                ax.set_xticklabels(metrics)
-                ax.legend()
-                ax.grid(True, alpha=0.3, axis='y')
+                # Key Metrics
+                st.markdown("### Financial Metrics")
+                col1, col2, col3, col4 = st.columns(4)
                 
-                plt.tight_layout()
-                st.pyplot(fig)
-            
-            with col2:
-                st.markdown("#### Impact Efficiency vs. Portfolio")
-                fig, ax = plt.subplots(figsize=(8, 5))
+                with col1:
+                    st.metric("Investment", f"${company_data['Investment ($M)']:.1f}M")
+                with col2:
+                    st.metric("IRR", f"{company_data['IRR (%)']:.1f}%")
+                with col3:
+                    st.metric("Payback Period", f"{company_data['Payback Period (years)']:.1f} years")
+                with col4:
+                    efficiency = company_metrics['impact_efficiency']
+                    st.metric("Impact Efficiency", f"{efficiency:.0f} tCO₂e/$K")
                 
-                ax.barh(['Portfolio Average', company_data['Company']], 
-                       [avg_efficiency, efficiency],
-                       color=['#90A4AE', '#1565C0'])
-                ax.set_xlabel('Impact Efficiency (tCO₂e per $1K)')
-                ax.set_title('Capital Efficiency Comparison')
-                ax.grid(True, alpha=0.3, axis='x')
+                # Impact Metrics
+                st.markdown("### Climate Impact")
+                col1, col2 = st.columns(2)
                 
-                plt.tight_layout()
-                st.pyplot(fig)
-            
-            # Risk-Return Positioning
-            st.markdown("---")
-            st.markdown("### Risk-Return Positioning")
+                with col1:
+                    st.metric("Lifetime Impact", f"{company_data['Lifetime tCO2e Avoided (M)']:.1f}M tCO₂e")
+                with col2:
+                    st.metric("Annual Impact", f"{company_data['Annual tCO2e Avoided (K)']:.0f}K tCO₂e")
+                
+                # Cash-flow returns, when the company has a schedule
+                if company_data['Returns Basis'] == "Cash flows":
+                    st.markdown("### Cash-Flow Returns")
+                    st.markdown(f"*IRR and payback above are computed from the company's cash-flow schedule; NPV at a {cashflows.DISCOUNT_RATE:.0%} discount rate*")
+                    
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.metric(f"NPV @ {cashflows.DISCOUNT_RATE:.0%}", f"${company_data['NPV ($M)']:.1f}M")
+                    with col2:
+                        st.metric("MOIC", f"{company_data['MOIC (x)']:.2f}x")
+                    
+                    flows, _ = load_cashflow_matrix(sandbox_version)
+                    schedule = cashflows.schedule_at(flows, sandbox_df.index.get_loc(company_data.name))
+                    show_chart(
+                        "cash_flow_schedule", schedule, company_data['Company'], company_data['Payback Period (years)'],
+                        data_key=chart_cache.input_hash(sandbox_version, selected_company),
+                    )
+                else:
+                    st.caption("No cash-flow schedule on file for this company: IRR and payback are the stored estimates.")
+                
+                # Benchmark Comparison
+                st.markdown("---")
+                st.markdown("### Benchmark Comparison")
+                
+                # Calculate portfolio averages
+                averages = analytics.sandbox_benchmarks(sandbox_cube, sandbox_metrics)
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown("#### Financial Performance vs. Portfolio")
+                    show_chart("financial_comparison", company_data, averages)
+                
+                with col2:
+                    st.markdown("#### Impact Efficiency vs. Portfolio")
+                    show_chart("efficiency_comparison", company_data['Company'], efficiency, averages["avg_efficiency"])
+                
+                # Risk-Return Positioning
+                st.markdown("---")
+                st.markdown("### Risk-Return Positioning")
+                
+                show_chart(
+                    "risk_return",
+                    sandbox_metrics["risk_score"],
+                    sandbox_df["IRR (%)"],
+                    company_data['Company'],
+                    company_metrics['risk_score'],
+                    company_data['IRR (%)'],
+                    data_key=chart_cache.input_hash(sandbox_version, selected_company),
+                )
+        
+        sandbox_drilldown(sandbox_df, sandbox_metrics, sandbox_cube, sandbox_version)
+    
+    elif view_mode == "Scenario Analysis":
+        # Each session gets its own seed, so its numbers are stable across
+        # reruns and can be reproduced by entering the seed again
+        if "scenario_seed" not in st.session_state:
+            st.session_state.scenario_seed = secrets.randbelow(1_000_000)
+        
+        @chart_fragment
+        @trace.section("sandbox_scenarios")
+        def sandbox_scenarios(sandbox_df, sandbox_version):
+            st.markdown("### Monte Carlo Scenario Analysis")
+            st.markdown(
+                "*Each company's IRR, payback and lifetime impact are simulated around its base case, "
+                "with a spread set by its Risk Rating and a chance of failure set by its Stage.*"
+            )
             
-            fig, ax = plt.subplots(figsize=(10, 6))
+            col1, col2 = st.columns(2)
+            with col1:
+                draws = st.select_slider(
+                    "Scenarios per company", options=[10_000, 50_000, 100_000, 250_000],
+                    value=scenarios.DEFAULT_DRAWS, format_func="{:,}".format, key="scenario_draws"
+                )
+            with col2:
+                seed = st.number_input("Random seed", min_value=0, step=1, key="scenario_seed")
             
-            # Plot all companies
-            risk_map = {"Low": 1, "Medium": 2, "Medium-High": 3, "High": 4}
-            sandbox_df["Risk Score"] = sandbox_df["Risk Rating"].map(risk_map)
+            # Large books get fewer draws (scenarios.MAX_CELLS); the capped
+            # count is the cache key, so slider positions past it share a run
+            requested, draws = draws, scenarios.draws_for(len(sandbox_df), draws)
+            results = load_scenarios(sandbox_version, draws, int(seed))
+            portfolio = results["portfolio"]
+            bands = results["companies"]
             
-            ax.scatter(
-                sandbox_df["Risk Score"],
-                sandbox_df["IRR (%)"],
-                s=100,
-                c='lightgray',
-                alpha=0.5,
-                edgecolors="black"
+            st.markdown("#### Portfolio Outcomes")
+            col1, col2, col3 = st.columns(3)
+            for column, label in ((col1, "P10"), (col2, "P50"), (col3, "P90")):
+                with column:
+                    st.metric(f"Blended IRR ({label})", f"{portfolio.loc[label, 'blended_irr']:.1f}%")
+                    st.metric(f"Lifetime Impact ({label})", f"{portfolio.loc[label, 'total_impact']:.1f}M tCO₂e")
+            st.caption(
+                "P10, P50 and P90 are the 10th, 50th and 90th percentiles over "
+                f"{draws:,} scenarios; blended IRR is weighted by investment."
             )
+            if draws < requested:
+                st.caption(
+                    f"With {len(sandbox_df):,} companies each is simulated over {draws:,} scenarios "
+                    f"rather than {requested:,}, to keep a run to {scenarios.MAX_CELLS:,} company-scenarios."
+                )
+            
+            # The largest positions, so the chart stays readable for big books
+            shown = sandbox_df["Investment ($M)"].nlargest(SCENARIO_CHART_ROWS).index
+            # Both charts are scenario_bands, so the key names the metric too
+            data_key = chart_cache.input_hash(sandbox_version, draws, int(seed))
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### IRR Range")
+                show_chart(
+                    "scenario_bands", sandbox_df.loc[shown, "Company"].tolist(),
+                    bands.loc[shown, "irr_p10"], bands.loc[shown, "irr_p50"], bands.loc[shown, "irr_p90"],
+                    sandbox_df.loc[shown, "IRR (%)"], "IRR (%)", "Simulated IRR by Company",
+                    data_key=(data_key, "irr"),
+                )
+            with col2:
+                st.markdown("#### Lifetime Impact Range")
+                show_chart(
+                    "scenario_bands", sandbox_df.loc[shown, "Company"].tolist(),
+                    bands.loc[shown, "impact_p10"], bands.loc[shown, "impact_p50"], bands.loc[shown, "impact_p90"],
+                    sandbox_df.loc[shown, "Lifetime tCO2e Avoided (M)"], "Lifetime tCO₂e Avoided (M)",
+                    "Simulated Lifetime Impact by Company", data_key=(data_key, "impact"),
+                )
             
-            # Highlight selected company
-            company_risk_score = risk_map[company_data['Risk Rating']]
-            ax.scatter(
-                [company_risk_score],
-                [company_data['IRR (%)']],
-                s=300,
-                c='red',
-                alpha=0.8,
-                edgecolors="black",
-                marker='*',
-                label=company_data['Company']
+            st.markdown("#### Scenario Bands by Company")
+            table = sandbox_df[["Company", "Risk Rating", "Stage"]].join(bands)
+            table.columns = [
+                "Company", "Risk Rating", "Stage",
+                "IRR P10 (%)", "IRR P50 (%)", "IRR P90 (%)",
+                "Payback P10", "Payback P50", "Payback P90",
+                "Impact P10 (M)", "Impact P50 (M)", "Impact P90 (M)",
+                "Failure Rate",
+            ]
+            payback = lambda years: "Not repaid" if math.isinf(years) else f"{years:.1f} years"
+            show_table(
+                table, "scenario_table", data_key,
+                formats={
+                    **{f"IRR {band} (%)": "{:.1f}%" for band in ("P10", "P50", "P90")},
+                    **{f"Payback {band}": payback for band in ("P10", "P50", "P90")},
+                    **{f"Impact {band} (M)": "{:.2f}M" for band in ("P10", "P50", "P90")},
+                    "Failure Rate": "{:.1%}",
+                },
+            )
+        
+        sandbox_scenarios(sandbox_df, sandbox_version)
+    
+    elif view_mode == "Allocation Optimizer":
+        @chart_fragment
+        @trace.section("sandbox_allocation")
+        def sandbox_allocation(sandbox_df, sandbox_version):
+            st.markdown("### Portfolio Allocation Optimizer")
+            st.markdown(
+                "*Choose the deals that avoid the most lifetime tCO₂e within a budget, "
+                "a minimum blended IRR and a maximum blended risk score.*"
             )
             
-            ax.set_xlabel("Risk Level", fontsize=12)
-            ax.set_ylabel("IRR (%)", fontsize=12)
-            ax.set_title("Risk-Return Profile", fontsize=14, fontweight='bold')
-            ax.set_xticks([1, 2, 3, 4])
-            ax.set_xticklabels(["Low", "Medium", "Medium-High", "High"])
-            ax.grid(True, alpha=0.3)
-            ax.legend()
+            cands = load_allocation_candidates(sandbox_version)
+            deals = cands["deals"]
+            total_investment = float(deals["investment"].sum())
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                budget = st.slider(
+                    "Budget ($M)", 0.0, total_investment, round(total_investment * 0.6, 1),
+                    step=max(0.5, round(total_investment / 200, 1)), key="allocation_budget"
+                )
+            with col2:
+                min_irr = st.slider(
+                    "Minimum blended IRR (%)", float(deals["irr"].min() // 1), float(-(-deals["irr"].max() // 1)),
+                    float(deals["irr"].min() // 1), step=0.5, key="allocation_min_irr"
+                )
+            with col3:
+                max_risk = st.slider(
+                    "Maximum blended risk (1 = Low, 4 = High)", 1.0, 4.0, 4.0, step=0.1, key="allocation_max_risk"
+                )
+            
+            chosen = allocation.solve(cands, budget, min_irr, max_risk)
+            current = allocation.summarize(deals, deals["investment"] > 0)
             
-            plt.tight_layout()
-            st.pyplot(fig)
+            if not chosen["deals"]:
+                st.warning("No combination of deals meets these constraints. Try a larger budget, a lower IRR floor or a higher risk cap.")
+            else:
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Deals Selected", f"{chosen['deals']}/{len(sandbox_df)}")
+                with col2:
+                    st.metric("Capital Deployed", f"${chosen['investment']:.1f}M", f"${budget - chosen['investment']:.1f}M unspent", delta_color="off")
+                with col3:
+                    st.metric("Lifetime Impact", f"{chosen['impact']:.1f}M tCO₂e",
+                              f"{chosen['impact'] / current['impact'] * 100:.0f}% of current portfolio", delta_color="off")
+                with col4:
+                    st.metric("Blended IRR", f"{chosen['irr']:.1f}%", f"risk {chosen['risk']:.2f}", delta_color="off")
+            
+            st.markdown("#### Impact vs. Return Frontier")
+            st.caption("Each point is the most impact the budget and risk cap allow at a given IRR floor.")
+            frontier = allocation.frontier(cands, budget, max_risk)
+            show_chart("efficient_frontier", frontier, chosen, current,
+                       data_key=chart_cache.input_hash(sandbox_version, budget, min_irr, max_risk))
+            
+            if chosen["deals"]:
+                st.markdown("#### Selected Deals")
+                selected = sandbox_df.loc[chosen["selected"], [
+                    "Company", "Sector", "Investment ($M)", "IRR (%)", "Risk Rating", "Lifetime tCO2e Avoided (M)"
+                ]]
+                show_table(
+                    selected, "allocation_table", chart_cache.input_hash(sandbox_version, budget, min_irr, max_risk),
+                    formats={
+                        "Investment ($M)": "${:.1f}M",
+                        "IRR (%)": "{:.1f}%",
+                        "Lifetime tCO2e Avoided (M)": "{:.2f}M",
+                    },
+                )
+        
+        sandbox_allocation(sandbox_df, sandbox_version)
     
 # ========================================
 # TAB 3: INVESTMENT THESIS (UNCHANGED FROM V2)
@@ -1821,177 +1475,197 @@ elif tab_choice == "💡 Investment Thesis":
     successful climate tech investing in 2024-2025, based on insights from leading climate investors.
     """)
     
-    # Explain the three criteria
-    st.markdown("---")
-    st.markdown("## The Three Investment Criteria")
+    with trace.section("thesis_criteria"):
+        # Explain the three criteria
+        st.markdown("---")
+        st.markdown("## The Three Investment Criteria")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown("### 1️⃣ Hardware + Software")
+            st.markdown("""
+            **Dual Revenue Streams**: Companies that combine physical products (atoms) with recurring 
+            digital services (bits) create defensible moats and scalable revenue.
+            
+            **Examples:**
+            - **WeaveGrid**: EV-grid integration hardware + data services
+            - **Remora**: Carbon capture devices + CO₂ sales + tax credits
+            - **Heirloom**: DAC machines + removal contracts + MRV services
+            
+            **Why it matters**: Hardware is hard to copy, software drives margin expansion.
+            """)
+        
+        with col2:
+            st.markdown("### 2️⃣ Capital Efficiency")
+            st.markdown("""
+            **Smart Scaling**: Companies that start small, prove the model, then scale using creative 
+            funding (grants, tax credits, debt, pre-orders) rather than burning through equity.
+            
+            **Examples:**
+            - **Amogy**: Uses existing ammonia infrastructure
+            - **Kula Bio**: On-farm production vs. mega-factories
+            - **Lightship**: Pre-orders enabled debt financing
+            
+            **Why it matters**: Avoids the "missing middle" funding gap and extends runway.
+            """)
+        
+        with col3:
+            st.markdown("### 3️⃣ Data Markets")
+            st.markdown("""
+            **Climate Volatility = Opportunity**: Companies that measure, organize, and sell climate 
+            risk/impact data as the world becomes more chaotic and regulated.
+            
+            **Examples:**
+            - **Patch**: Carbon credit data transparency
+            - **Sinai**: Climate regulation cost modeling
+            - Future: Climate insurance, materials tracking, farm risk
+            
+            **Why it matters**: Risk is everywhere, but measurable risk creates markets.
+            """)
     
-    col1, col2, col3 = st.columns(3)
+    with trace.section("thesis_table"):
+        # Scoring Matrix
+        st.markdown("---")
+        st.markdown("## Portfolio Company Scoring")
+        st.markdown("*Each company scored 0-3 on each criterion (0=No fit, 1=Weak, 2=Moderate, 3=Strong)*")
+        
+        # Display scoring table
+        display_thesis = analytics.thesis_display_frame(thesis_df)
+        
+        show_table(
+            display_thesis, "thesis_table", thesis_version,
+            gradient=["Hardware+Software", "Capital Efficiency", "Data Markets", "Total Score"],
+        )
+        export_table(display_thesis, "📥 Download Scoring Matrix", "galvanize_thesis_scores", "thesis_export")
     
-    with col1:
-        st.markdown("### 1️⃣ Hardware + Software")
-        st.markdown("""
-        **Dual Revenue Streams**: Companies that combine physical products (atoms) with recurring 
-        digital services (bits) create defensible moats and scalable revenue.
+    with trace.section("thesis_charts"):
+        # Visualization
+        st.markdown("---")
+        st.markdown("## Portfolio Composition Analysis")
         
-        **Examples:**
-        - **WeaveGrid**: EV-grid integration hardware + data services
-        - **Remora**: Carbon capture devices + CO₂ sales + tax credits
-        - **Heirloom**: DAC machines + removal contracts + MRV services
+        col1, col2 = st.columns(2)
         
-        **Why it matters**: Hardware is hard to copy, software drives margin expansion.
-        """)
+        with col1:
+            st.markdown("### Criteria Scoring Distribution")
+            show_chart("criteria_strength", analytics.criteria_totals(display_thesis))
+        
+        with col2:
+            st.markdown("### Top Performers by Total Score")
+            top_companies = display_thesis.nlargest(7, "Total Score")
+            show_chart("top_performers", top_companies)
     
-    with col2:
-        st.markdown("### 2️⃣ Capital Efficiency")
-        st.markdown("""
-        **Smart Scaling**: Companies that start small, prove the model, then scale using creative 
-        funding (grants, tax credits, debt, pre-orders) rather than burning through equity.
+    with trace.section("thesis_insights"):
+        # Strategic Insights
+        st.markdown("---")
+        st.markdown("## Strategic Insights")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            hw_sw_count = len(display_thesis[display_thesis["Hardware+Software"] >= 2])
+            st.metric("Hardware+Software Leaders", f"{hw_sw_count}/10", 
+                     help="Companies with moderate-to-strong hardware+software integration")
+        
+        with col2:
+            cap_eff_count = len(display_thesis[display_thesis["Capital Efficiency"] == 3])
+            st.metric("Capital Efficiency Champions", f"{cap_eff_count}/10",
+                     help="Companies with perfect capital efficiency scores")
         
-        **Examples:**
-        - **Amogy**: Uses existing ammonia infrastructure
-        - **Kula Bio**: On-farm production vs. mega-factories
-        - **Lightship**: Pre-orders enabled debt financing
+        with col3:
+            data_count = len(display_thesis[display_thesis["Data Markets"] >= 2])
+            st.metric("Data Market Players", f"{data_count}/10",
+                     help="Companies with moderate-to-strong data monetization")
+        
+        st.markdown("### Key Findings")
         
-        **Why it matters**: Avoids the "missing middle" funding gap and extends runway.
+        st.success("""
+        **Portfolio Strengths:**
+        - **60% of companies** score 2+ on Capital Efficiency - Galvanize is backing smart scalers
+        - **40% of companies** are building data/software platforms - ahead of the atoms-heavy trend
+        - **Top 3 performers** (Arable, Plotlogic, The Routing Company) all combine multiple criteria
         """)
-    
-    with col3:
-        st.markdown("### 3️⃣ Data Markets")
-        st.markdown("""
-        **Climate Volatility = Opportunity**: Companies that measure, organize, and sell climate 
-        risk/impact data as the world becomes more chaotic and regulated.
         
-        **Examples:**
-        - **Patch**: Carbon credit data transparency
-        - **Sinai**: Climate regulation cost modeling
-        - Future: Climate insurance, materials tracking, farm risk
+        st.info("""
+        **Strategic Positioning:**
+        - Portfolio is **well-diversified** across the three investment themes
+        - Strong focus on **enabling technologies** (data, software, optimization) vs. pure hardware plays
+        - Companies like **Watershed, Arable, Plotlogic** exemplify the "atoms + bits" model
+        """)
         
-        **Why it matters**: Risk is everywhere, but measurable risk creates markets.
+        st.warning("""
+        **Opportunity Areas:**
+        - Only 3 companies have strong Hardware+Software integration - room to add more dual-revenue models
+        - Data Markets scoring is concentrated in software companies - could expand to hardware-enabled data plays
         """)
     
-    # Scoring Matrix
-    st.markdown("---")
-    st.markdown("## Portfolio Company Scoring")
-    st.markdown("*Each company scored 0-3 on each criterion (0=No fit, 1=Weak, 2=Moderate, 3=Strong)*")
-    
-    # Display scoring table
-    display_thesis = thesis_df.copy()
-    display_thesis["Total Score"] = display_thesis["Hardware+Software"] + display_thesis["Capital Efficiency"] + display_thesis["Data Markets"]
-    
-    st.dataframe(
-        display_thesis.style.background_gradient(subset=["Hardware+Software", "Capital Efficiency", "Data Markets", "Total Score"], cmap="RdYlGn"),
-        use_container_width=True,
-        height=400
-    )
-    
-    # Visualization
-    st.markdown("---")
-    st.markdown("## Portfolio Composition Analysis")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### Criteria Scoring Distribution")
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        criteria_scores = {
-            "Hardware+Software": display_thesis["Hardware+Software"].sum(),
-            "Capital Efficiency": display_thesis["Capital Efficiency"].sum(),
-            "Data Markets": display_thesis["Data Markets"].sum()
-        }
-        
-        ax.bar(criteria_scores.keys(), criteria_scores.values(), color=['#2E7D32', '#1565C0', '#F57C00'])
-        ax.set_ylabel("Total Score Across Portfolio")
-        ax.set_title("Investment Criteria Strength")
-        ax.set_ylim(0, 30)
-        plt.xticks(rotation=15, ha='right')
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    with col2:
-        st.markdown("### Top Performers by Total Score")
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        top_companies = display_thesis.nlargest(7, "Total Score")
-        ax.barh(top_companies["Company"], top_companies["Total Score"], color='#2E7D32')
-        ax.set_xlabel("Total Score (out of 9)")
-        ax.set_title("Highest Scoring Companies")
-        ax.set_xlim(0, 9)
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    # Strategic Insights
-    st.markdown("---")
-    st.markdown("## Strategic Insights")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        hw_sw_count = len(display_thesis[display_thesis["Hardware+Software"] >= 2])
-        st.metric("Hardware+Software Leaders", f"{hw_sw_count}/10", 
-                 help="Companies with moderate-to-strong hardware+software integration")
-    
-    with col2:
-        cap_eff_count = len(display_thesis[display_thesis["Capital Efficiency"] == 3])
-        st.metric("Capital Efficiency Champions", f"{cap_eff_count}/10",
-                 help="Companies with perfect capital efficiency scores")
-    
-    with col3:
-        data_count = len(display_thesis[display_thesis["Data Markets"] >= 2])
-        st.metric("Data Market Players", f"{data_count}/10",
-                 help="Companies with moderate-to-strong data monetization")
-    
-    st.markdown("### Key Findings")
-    
-    st.success("""
-    **Portfolio Strengths:**
-    - **60% of companies** score 2+ on Capital Efficiency - Galvanize is backing smart scalers
-    - **40% of companies** are building data/software platforms - ahead of the atoms-heavy trend
-    - **Top 3 performers** (Arable, Plotlogic, The Routing Company) all combine multiple criteria
-    """)
-    
-    st.info("""
-    **Strategic Positioning:**
-    - Portfolio is **well-diversified** across the three investment themes
-    - Strong focus on **enabling technologies** (data, software, optimization) vs. pure hardware plays
-    - Companies like **Watershed, Arable, Plotlogic** exemplify the "atoms + bits" model
-    """)
-    
-    st.warning("""
-    **Opportunity Areas:**
-    - Only 3 companies have strong Hardware+Software integration - room to add more dual-revenue models
-    - Data Markets scoring is concentrated in software companies - could expand to hardware-enabled data plays
-    """)
-    
-    # Methodology
-    st.markdown("---")
-    st.markdown("## Methodology")
-    
-    with st.expander("📖 How companies were scored"):
-        st.markdown("""
-        **Scoring Framework (0-3 scale):**
-        
-        **Hardware + Software:**
-        - 3 = Clear dual revenue model with physical product + recurring digital service
-        - 2 = Has both hardware and software but not fully integrated revenue streams
-        - 1 = Primarily one or the other with minor elements of both
-        - 0 = Pure software or pure hardware play
-        
-        **Capital Efficiency:**
-        - 3 = Demonstrates exceptional capital efficiency through creative funding, asset-light model, or rapid scaling
-        - 2 = Good capital efficiency with some creative funding or lean operations
-        - 1 = Standard venture-backed scaling approach
-        - 0 = Capital-intensive with limited efficiency mechanisms
-        
-        **Data Markets:**
-        - 3 = Core business model is selling climate/impact data or analytics
-        - 2 = Generates significant data as byproduct with monetization potential
-        - 1 = Collects data but not core to business model
-        - 0 = Minimal data generation or monetization
-        
-        **Research Sources:**
-        - Company websites and public materials
-        - Investor presentations and press releases
-        - Third-party analysis (Contrary Research, Norrsken VC, etc.)
-        - Climate tech investment trend reports (2024-2025)
-        """)
+    with trace.section("thesis_methodology"):
+        # Methodology
+        st.markdown("---")
+        st.markdown("## Methodology")
+        
+        with st.expander("📖 How companies were scored"):
+            st.markdown("""
+            **Scoring Framework (0-3 scale):**
+            
+            **Hardware + Software:**
+            - 3 = Clear dual revenue model with physical product + recurring digital service
+            - 2 = Has both hardware and software but not fully integrated revenue streams
+            - 1 = Primarily one or the other with minor elements of both
+            - 0 = Pure software or pure hardware play
+            
+            **Capital Efficiency:**
+            - 3 = Demonstrates exceptional capital efficiency through creative funding, asset-light model, or rapid scaling
+            - 2 = Good capital efficiency with some creative funding or lean operations
+            - 1 = Standard venture-backed scaling approach
+            - 0 = Capital-intensive with limited efficiency mechanisms
+            
+            **Data Markets:**
+            - 3 = Core business model is selling climate/impact data or analytics
+            - 2 = Generates significant data as byproduct with monetization potential
+            - 1 = Collects data but not core to business model
+            - 0 = Minimal data generation or monetization
+            
+            **Research Sources:**
+            - Company websites and public materials
+            - Investor presentations and press releases
+            - Third-party analysis (Contrary Research, Norrsken VC, etc.)
+            - Climate tech investment trend reports (2024-2025)
+            """)
+
+with trace.section("charts"):
+    draw_charts()
+trace.end()
+
+# ---------- PERFORMANCE PANEL ----------
+if show_perf:
+    with perf_panel:
+        last_run = trace.last("script")
+        st.markdown("### ⏱️ Performance")
+        st.caption(f"Last rerun: {last_run['wall_ms']:.0f} ms")
+        st.dataframe(
+            [{
+                "Section": record["section"],
+                "Wall (ms)": round(record["wall_ms"], 1),
+                "CPU (ms)": round(record["cpu_ms"], 1),
+                "Allocated (MB)": None if record["alloc_bytes"] is None else round(record["alloc_bytes"] / 1e6, 2),
+                "Peak (MB)": None if record["peak_bytes"] is None else round(record["peak_bytes"] / 1e6, 2),
+            } for record in last_run["sections"]],
+            hide_index=True,
+        )
+        if last_run["sections"] and last_run["sections"][0]["alloc_bytes"] is None:
+            st.caption("Start the server with PERF_TRACE_ALLOCATIONS=1 to record allocations.")
+        fragment_runs = [run for run in trace.runs if run["kind"] == "fragment"][-5:]
+        if fragment_runs:
+            st.caption("Recent fragment reruns: " + ", ".join(
+                f"{run['name']} {run['wall_ms']:.0f} ms" for run in reversed(fragment_runs)
+            ))
+        cache = chart_cache.stats()
+        st.caption(
+            f"Chart cache: {cache['entries']} charts, {cache['bytes'] / 1e6:.1f} MB, "
+            f"{cache['hits']} hits / {cache['misses']} misses."
+        )
+        st.download_button(
+            "📥 Export timings (JSON lines)", trace.json_lines, file_name="perf_trace.jsonl",
+            mime="application/x-ndjson", key="perf_export", on_click="ignore"
+        )
@@ -0,0 +1,414 @@
+"""Headless per-section benchmark for the dashboard.
+
+    python synthetic_portfolio.py --out bench_data     # once
+    python benchmark.py --data bench_data              # all sizes found there
+    python benchmark.py --data bench_data --rows 1000 --sections hero_metrics filters
+    python benchmark.py --compare bench_results/a.json bench_results/b.json
+
+Each section runs the same analytics/charts code the app uses and renders its
+figures to PNG the way st.pyplot does. Every (size, section) pair runs in its
+own process with a time budget, so a section that blows up at 1M rows is
+recorded as a timeout or error instead of stalling the whole run. Results are
+written as JSON (one file per run, tagged with the git commit) so runs from
+different commits can be compared.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+import numpy as np
+import pandas as pd
+matplotlib.use("Agg")
+
+import allocation
+import analytics
+import cashflows
+import chart_cache
+import charts
+import company_bundles
+import derived_metrics
+import figure_pool
+import impact_memo
+import paged_table
+import render_pool
+import scenarios
+import scoring
+import sensitivity
+import snapshot_history
+from portfolio_store import load_dataset, read_typed_csv, source_path
+from search_index import build_search_index, search
+
+RESULTS_DIR = "bench_results"
+
+
+# ---------- SECTIONS ----------
+# Each section takes the loaded frames and returns nothing; only time matters.
+def section_data_convert(data):
+    read_typed_csv("real", source_path("real", data["data_dir"]))
+
+
+def section_data_load(data):
+    for name in ("real", "sandbox", "thesis"):
+        load_dataset(name, data["data_dir"])
+
+
+def section_cube_build(data):
+    analytics.build_real_cube(data["real"])
+    analytics.build_sandbox_cube(data["sandbox"])
+
+
+def section_hero_metrics(data):
+    totals = analytics.hero_metrics(data["real_cube"])
+    analytics.portfolio_efficiency(data["real_cube"], totals)
+
+
+def section_history(data):
+    # A year of quarterly snapshots recorded, then what a rerun reads: the
+    # totals from the footers, both badges' changes, the per-company deltas
+    # and one company's sparkline values
+    with tempfile.TemporaryDirectory() as history_dir:
+        for quarter in range(4):
+            taken = pd.Timestamp("2025-03-31", tz="UTC") + quarter * snapshot_history.QUARTER
+            snapshot_history.record(data["real"], {"digest": f"q{quarter}", "mtime_ns": 0}, history_dir, taken)
+        totals = snapshot_history.totals(history_dir)
+        snapshot_history.changes(totals, snapshot_history.QUARTER)
+        snapshot_history.changes(totals, snapshot_history.YEAR)
+        snapshot_history.company_changes(history_dir)
+        snapshot_history.company_history(data["real"]["company"].iloc[len(data["real"]) // 2], history_dir)
+        charts.render_png(charts.portfolio_history(totals))
+
+
+def section_attribution_pies(data):
+    sector_attribution, stage_attribution = analytics.impact_attribution(data["real_cube"])
+    charts.render_png(charts.attribution_pie(sector_attribution, "Sector", ['#2563EB', '#8B5CF6', '#059669', '#F59E0B', '#14B8A6']))
+    charts.render_png(charts.attribution_pie(stage_attribution, "Stage", ['#8B5CF6', '#2563EB', '#059669']))
+
+
+def section_filters(data):
+    real_df, masks = data["real"], data["real_masks"]
+    analytics.filter_portfolio(real_df, masks=masks)
+    analytics.filter_portfolio(real_df, {"sector": "Software"}, masks=masks)
+    analytics.filter_portfolio(real_df, {"sector": "Energy", "investment_stage": "Growth"}, masks=masks)
+    analytics.filter_portfolio(real_df, {"sector": ["Energy", "Industry"], "country": ["USA", "Germany"]}, masks=masks)
+    analytics.filter_portfolio(real_df, search_term="carbon", index=data["search_index"], masks=masks)
+
+
+def section_metrics_build(data):
+    derived_metrics.build_real_metrics(data["real"])
+    derived_metrics.build_sandbox_metrics(data["sandbox"])
+
+
+def section_rescore(data):
+    # What a weight slider move costs: re-score the whole portfolio
+    for stage in (0.2, 0.4, 0.6):
+        scoring.score_portfolio(data["real"], data["real_metrics"], {"stage": stage, "funding_efficiency": 0.3, "sector": 0.3})
+
+
+def section_filter_masks_build(data):
+    analytics.build_real_masks(data["real"])
+
+
+def section_search_index_build(data):
+    build_search_index(data["real"], data["thesis"])
+
+
+def section_search(data):
+    index = data["search_index"]
+    for query in ("carbon", "carbon accounting", "geothrmal", "grid"):
+        search(index, query)
+
+
+def section_sector_bars(data):
+    filters = {"sector": "Software"}
+    filtered_df = analytics.filter_portfolio(data["real"], filters, masks=data["real_masks"])
+    for column, color in (("funding_raised_m", "#2E7D32"), ("estimated_annual_tco2e_avoided_k", "#1565C0")):
+        totals = analytics.filtered_sector_totals(data["real_cube"], filtered_df, column, filters)
+        charts.render_png(charts.sector_bar(totals, color, "", ""))
+
+
+def section_materiality_matrix(data):
+    scores = scoring.score_portfolio(data["real"], data["real_metrics"])
+    scored = analytics.materiality_scores(analytics.filter_portfolio(data["real"]), data["real_metrics"], scores)
+    median_financial, median_impact, _, _ = analytics.materiality_quadrants(scored)
+    charts.render_png(charts.materiality_matrix(scored, median_financial, median_impact))
+
+
+def section_bundles_build(data):
+    company_bundles.build_company_bundles(data["real"], data["real_metrics"])
+
+
+def section_deep_dive(data):
+    # A company switch: the bundles are cached per filtered view
+    bundle = company_bundles.company_bundle(data["bundles"], data["real"]["company"].iloc[0])
+    impact_memo.decision_memo(bundle)
+    charts.render_png(charts.company_vs_portfolio(bundle))
+    charts.render_png(charts.company_vs_industry(bundle, bundle["benchmark"], bundle["performance_index"]))
+
+
+def section_sensitivity(data):
+    # Built once per data version; a company switch is company_tornado plus the chart
+    result = sensitivity.build_sensitivity(data["real"])
+    tornado = sensitivity.company_tornado(result, 0)
+    charts.render_png(charts.tornado(tornado, result["reported"][0], ""))
+
+
+def section_sandbox_overview(data):
+    sandbox_df = data["sandbox"]
+    analytics.sandbox_summary(sandbox_df, data["sandbox_cube"])
+    charts.render_png(charts.investment_vs_impact(sandbox_df))
+    charts.render_png(charts.irr_vs_efficiency(sandbox_df, data["sandbox_metrics"]["impact_efficiency"]))
+    charts.render_png(charts.sector_bar(analytics.cube_sector_totals(data["sandbox_cube"], "Investment ($M)", "Sector"), "#2E7D32", "", ""))
+    charts.render_png(charts.sector_bar(analytics.cube_sector_totals(data["sandbox_cube"], "Lifetime tCO2e Avoided (M)", "Sector"), "#1565C0", "", ""))
+    display_df = analytics.sandbox_display_frame(sandbox_df, data["sandbox_metrics"])
+    # First page of the table; the CSV export is only written on click
+    window = display_df.iloc[paged_table.view(display_df)[:paged_table.PAGE_SIZE]]
+    paged_table.page_styler(window, {"Investment ($M)": "${:.1f}M", "IRR (%)": "{:.1f}%"}).to_html()
+
+
+def section_sandbox_drilldown(data):
+    sandbox_df = data["sandbox"]
+    company_data = sandbox_df.iloc[0]
+    company_metrics = data["sandbox_metrics"].iloc[0]
+    averages = analytics.sandbox_benchmarks(data["sandbox_cube"], data["sandbox_metrics"])
+    efficiency = company_metrics["impact_efficiency"]
+    charts.render_png(charts.financial_comparison(company_data, averages))
+    charts.render_png(charts.efficiency_comparison(company_data["Company"], efficiency, averages["avg_efficiency"]))
+    charts.render_png(charts.risk_return(
+        data["sandbox_metrics"]["risk_score"], sandbox_df["IRR (%)"], company_data["Company"],
+        company_metrics["risk_score"], company_data["IRR (%)"]
+    ))
+
+
+def section_table_paging(data):
+    # A filtered, sorted view of the company table and one page of it
+    real_df = data["real"]
+    positions = paged_table.view(real_df, "energy", "funding_raised_m", ascending=False)
+    window = real_df.iloc[positions[paged_table.PAGE_SIZE:2 * paged_table.PAGE_SIZE]]
+    paged_table.page_styler(window, {"funding_raised_m": "${:.0f}M", "employees": "{:,}"}).to_html()
+
+
+def section_chart_cache(data):
+    # The cache lives for the whole child process, so only the first repeat
+    # renders; the median is the cost of a rerun that hits
+    sandbox_df = data["sandbox"]
+    chart_cache.chart_png("investment_vs_impact", charts.investment_vs_impact, sandbox_df, data_key="bench")
+    chart_cache.chart_png("irr_vs_efficiency", charts.irr_vs_efficiency, sandbox_df,
+                          data["sandbox_metrics"]["impact_efficiency"], data_key="bench")
+    sector_attribution, _ = analytics.impact_attribution(data["real_cube"])
+    chart_cache.chart_png("attribution_pie", charts.attribution_pie, sector_attribution, "Sector",
+                          ['#2563EB', '#8B5CF6', '#059669', '#F59E0B', '#14B8A6'])
+
+
+def section_parallel_render(data):
+    # The sandbox overview's four charts submitted together, as show_chart
+    # does; compare with sandbox_overview, which renders them in turn
+    sandbox_df = data["sandbox"]
+    futures = [
+        render_pool.submit(charts.investment_vs_impact, sandbox_df),
+        render_pool.submit(charts.irr_vs_efficiency, sandbox_df, data["sandbox_metrics"]["impact_efficiency"]),
+        render_pool.submit(charts.sector_bar, analytics.cube_sector_totals(data["sandbox_cube"], "Investment ($M)", "Sector"), "#2E7D32", "", ""),
+        render_pool.submit(charts.sector_bar, analytics.cube_sector_totals(data["sandbox_cube"], "Lifetime tCO2e Avoided (M)", "Sector"), "#1565C0", "", ""),
+    ]
+    for future in futures:
+        future.result()
+
+
+def section_cashflow_returns(data):
+    # Rebuilt once per data version: every schedule's IRR, NPV, MOIC and payback
+    cashflows.apply_schedules(load_dataset("sandbox", data["data_dir"]), data["cashflows"])
+
+
+def section_cashflow_grid(data):
+    # Up to 1,000 scheduled companies x 1,000 shocked scenarios in one solve
+    flows, has_schedule = cashflows.schedule_matrix(data["sandbox"], data["cashflows"])
+    flows = flows[has_schedule][:1_000, None, :]
+    shock = np.random.default_rng(0).lognormal(0.0, 0.3, (len(flows), 1_000, 1))
+    cashflows.returns(np.where(flows > 0, flows * shock, flows))
+
+
+def section_scenarios(data):
+    # The view's default; large books are capped at scenarios.MAX_CELLS
+    scenarios.simulate(data["sandbox"], draws=scenarios.DEFAULT_DRAWS, seed=0)
+
+
+def section_allocation(data):
+    # Candidates are cached per data version; a slider move is a solve and a frontier
+    cands = allocation.candidates(allocation.deal_arrays(data["sandbox"]))
+    budget = cands["deals"]["investment"].sum() * 0.2
+    allocation.solve(cands, budget, min_irr=22, max_risk=2.5)
+    allocation.frontier(cands, budget, max_risk=2.5)
+
+
+def section_thesis_table(data):
+    display_thesis = analytics.thesis_display_frame(data["thesis"])
+    gradient = ["Hardware+Software", "Capital Efficiency", "Data Markets", "Total Score"]
+    window = display_thesis.iloc[:paged_table.PAGE_SIZE]
+    paged_table.page_styler(window, gradients=paged_table.column_ranges(display_thesis, gradient)).to_html()
+    charts.render_png(charts.criteria_strength(analytics.criteria_totals(display_thesis)))
+    charts.render_png(charts.top_performers(display_thesis.nlargest(7, "Total Score")))
+
+
+SECTIONS = {
+    "data_convert": section_data_convert,
+    "data_load": section_data_load,
+    "cube_build": section_cube_build,
+    "metrics_build": section_metrics_build,
+    "hero_metrics": section_hero_metrics,
+    "history": section_history,
+    "attribution_pies": section_attribution_pies,
+    "filters": section_filters,
+    "filter_masks_build": section_filter_masks_build,
+    "search_index_build": section_search_index_build,
+    "search": section_search,
+    "sector_bars": section_sector_bars,
+    "rescore": section_rescore,
+    "materiality_matrix": section_materiality_matrix,
+    "bundles_build": section_bundles_build,
+    "deep_dive": section_deep_dive,
+    "sensitivity": section_sensitivity,
+    "sandbox_overview": section_sandbox_overview,
+    "sandbox_drilldown": section_sandbox_drilldown,
+    "cashflow_returns": section_cashflow_returns,
+    "cashflow_grid": section_cashflow_grid,
+    "scenarios": section_scenarios,
+    "allocation": section_allocation,
+    "thesis_table": section_thesis_table,
+    "table_paging": section_table_paging,
+    "chart_cache": section_chart_cache,
+    "parallel_render": section_parallel_render,
+}
+
+
+# ---------- RUNNER ----------
+def _run_in_child(data_dir, section, repeat, conn):
+    try:
+        data = {"data_dir": data_dir}
+        for name in ("real", "sandbox", "thesis", "cashflows"):
+            data[name] = load_dataset(name, data_dir)
+        # As load_sandbox_portfolio: IRR and payback from the schedules
+        data["sandbox"] = cashflows.apply_schedules(data["sandbox"], data["cashflows"])
+        # The app builds these once per dataset version, not per rerun
+        data["real_cube"] = analytics.build_real_cube(data["real"])
+        data["sandbox_cube"] = analytics.build_sandbox_cube(data["sandbox"])
+        data["real_masks"] = analytics.build_real_masks(data["real"])
+        data["real_metrics"] = derived_metrics.build_real_metrics(data["real"])
+        data["sandbox_metrics"] = derived_metrics.build_sandbox_metrics(data["sandbox"])
+        data["search_index"] = build_search_index(data["real"], data["thesis"])
+        data["bundles"] = company_bundles.build_company_bundles(data["real"], data["real_metrics"])
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            SECTIONS[section](data)
+            timings.append(time.perf_counter() - start)
+        # A section that leaves figures checked out is leaking them
+        conn.send({"status": "ok", "timings": timings, "figures": figure_pool.stats()})
+    except Exception as exc:  # reported, not raised: one broken section shouldn't stop the run
+        conn.send({"status": "error", "error": f"{type(exc).__name__}: {exc}"})
+
+
+def run_section(data_dir, section, repeat, timeout):
+    parent, child = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_run_in_child, args=(data_dir, section, repeat, child))
+    proc.start()
+    if parent.poll(timeout):
+        result = parent.recv()
+    else:
+        proc.terminate()
+        result = {"status": "timeout", "error": f"exceeded {timeout:.0f}s"}
+    proc.join()
+    if "timings" in result:
+        result["median_s"] = statistics.median(result["timings"])
+    return result
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def _sizes_in(data_dir):
+    return sorted(int(entry) for entry in os.listdir(data_dir) if entry.isdigit())
+
+
+def run(data_root, sizes, sections, repeat, timeout):
+    commit, dirty = _git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": [],
+    }
+    for rows in sizes:
+        data_dir = os.path.join(data_root, str(rows))
+        # Convert once up front so only data_convert pays the CSV parse
+        for name in ("real", "sandbox", "thesis"):
+            load_dataset(name, data_dir)
+        for section in sections:
+            result = run_section(data_dir, section, repeat, timeout)
+            report["results"].append({"rows": rows, "section": section, **result})
+            shown = f"{result['median_s'] * 1000:10.1f} ms" if result["status"] == "ok" else f"{result['status']:>13}"
+            print(f"{rows:>9,}  {section:<20} {shown}")
+    return report
+
+
+def compare(baseline_path, current_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    with open(current_path) as fh:
+        current = json.load(fh)
+    before = {(r["rows"], r["section"]): r for r in baseline["results"]}
+    print(f"{'rows':>9}  {'section':<20} {baseline['commit']:>12} {current['commit']:>12}  change")
+    for r in current["results"]:
+        old = before.get((r["rows"], r["section"]))
+        if old is None:
+            continue
+        old_s, new_s = old.get("median_s"), r.get("median_s")
+        old_txt = f"{old_s * 1000:.1f}ms" if old_s is not None else old["status"]
+        new_txt = f"{new_s * 1000:.1f}ms" if new_s is not None else r["status"]
+        change = f"{new_s / old_s:.2f}x" if old_s and new_s is not None else "-"
+        print(f"{r['rows']:>9,}  {r['section']:<20} {old_txt:>12} {new_txt:>12}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="bench_data", help="directory written by synthetic_portfolio.py")
+    parser.add_argument("--rows", type=int, nargs="+", help="sizes to run (default: every size under --data)")
+    parser.add_argument("--sections", nargs="+", choices=list(SECTIONS), default=list(SECTIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds per section and size")
+    parser.add_argument("--out", help=f"result file (default: {RESULTS_DIR}/<timestamp>_<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.data, args.rows or _sizes_in(args.data), args.sections, args.repeat, args.timeout)
+    out = args.out
+    if out is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"{stamp}_{report['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
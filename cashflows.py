@@ -0,0 +1,183 @@
+"""Returns of the Sandbox deals from their cash-flow schedules.
+
+A schedule is one row per (company, year) of galvanize_sandbox_cashflows.csv:
+year 0 is the investment date and flows are in $M, negative for capital put
+in and positive for distributions and the exit. `schedule_matrix` lays them
+out as a (companies, years) array aligned with the sandbox frame, and
+`returns` derives IRR, NPV, MOIC and payback from it.
+
+The solvers work along the last axis of an array of any shape, so the same
+call handles one schedule per company or (companies, scenarios, years) of
+shocked schedules in a single pass. IRR is Newton's method on NPV, falling
+back to bisection whenever a step leaves (or stalls inside) the bracket
+[LOW_RATE, HIGH_RATE] that is known to hold the root. A rate counts only once
+NPV there is within TOLERANCE of the cash involved; a schedule whose NPV is
+still above that when the bracket can't be halved any more, or after
+MAX_ITERATIONS, has no IRR (NaN) rather than an approximate one.
+
+`apply_schedules` puts the results into the sandbox frame's IRR and payback
+columns; companies without a schedule keep their stored values.
+"""
+import numpy as np
+import pandas as pd
+
+# Discount rate of the NPV column
+DISCOUNT_RATE = 0.10
+# Bracket of the IRR search, as fractions; schedules whose NPV doesn't change
+# sign across it have no IRR (NaN)
+LOW_RATE = -0.99
+HIGH_RATE = 10.0
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-10
+
+
+def _polynomial(flows, rate):
+    # NPV and its derivative in the rate by Horner's rule in x = 1 / (1 + rate):
+    # one pass over the years, on arrays of the leading shape only
+    x = 1 / (1 + rate)
+    value = np.zeros(flows.shape[:-1])
+    slope = np.zeros(flows.shape[:-1])  # d value / d x
+    for year in range(flows.shape[-1] - 1, -1, -1):
+        slope = slope * x + value
+        value = value * x + flows[..., year]
+    return value, -slope * x ** 2
+
+
+def npv(flows, rate=DISCOUNT_RATE):
+    """NPV of each schedule along the last axis at `rate` (a fraction, or an
+    array broadcasting against the leading axes)."""
+    flows = np.asarray(flows, dtype=float)
+    return _polynomial(flows, np.broadcast_to(np.asarray(rate, dtype=float), flows.shape[:-1]))[0]
+
+
+def irr(flows):
+    """IRR (a fraction) of each schedule along the last axis."""
+    flows = np.asarray(flows, dtype=float)
+    shape = flows.shape[:-1]
+    flows = flows.reshape(-1, flows.shape[-1])
+    low = np.full(len(flows), LOW_RATE)
+    high = np.full(len(flows), HIGH_RATE)
+    low_value = npv(flows, low)
+    solvable = np.sign(low_value) * np.sign(npv(flows, high)) < 0
+    # The root is within TOLERANCE of the cash involved
+    scale = TOLERANCE * np.maximum(np.abs(flows).sum(axis=-1), 1.0)
+
+    rate = np.where(solvable, DISCOUNT_RATE, np.nan)
+    # Positions still iterating; converged schedules drop out of the arrays
+    active = np.flatnonzero(solvable)
+    for _ in range(MAX_ITERATIONS):
+        if not len(active):
+            break
+        value, slope = _polynomial(flows[active], rate[active])
+        pending = np.abs(value) > scale[active]
+        # A bracket down to adjacent floats can't be halved: NPV never gets
+        # within tolerance (a root near LOW_RATE, where it is steepest)
+        middle = (low[active] + high[active]) / 2
+        stuck = pending & ((middle <= low[active]) | (middle >= high[active]))
+        rate[active[stuck]] = np.nan
+        pending &= ~stuck
+        active, value, slope = active[pending], value[pending], slope[pending]
+        current = rate[active]
+
+        # Keep the half of the bracket where NPV changes sign
+        same_side = np.sign(value) == np.sign(low_value[active])
+        low[active] = np.where(same_side, current, low[active])
+        low_value[active] = np.where(same_side, value, low_value[active])
+        high[active] = np.where(same_side, high[active], current)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = current - value / slope
+        inside = np.isfinite(newton) & (newton > low[active]) & (newton < high[active]) & (newton != current)
+        rate[active] = np.where(inside, newton, (low[active] + high[active]) / 2)
+    if len(active):
+        # Out of iterations: keep only the rates the last step brought within tolerance
+        value, _ = _polynomial(flows[active], rate[active])
+        rate[active[np.abs(value) > scale[active]]] = np.nan
+    return rate.reshape(shape)
+
+
+def moic(flows):
+    """Multiple on invested capital: cash returned over cash put in."""
+    invested = -np.where(flows < 0, flows, 0.0).sum(axis=-1)
+    returned = np.where(flows > 0, flows, 0.0).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(invested > 0, returned / invested, np.nan)
+
+
+def payback(flows):
+    """Years until cumulative cash turns non-negative, with the cash of the
+    crossing year assumed to arrive evenly through it; inf when it never does."""
+    cumulative = np.cumsum(flows, axis=-1)
+    # Only a crossing after year 0 counts as being paid back
+    paid = (cumulative >= 0) & (np.arange(flows.shape[-1]) > 0)
+    year = np.argmax(paid, axis=-1)[..., None]
+    before = np.take_along_axis(cumulative, np.maximum(year - 1, 0), axis=-1)[..., 0]
+    flow = np.take_along_axis(flows, year, axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = year[..., 0] - 1 + np.where(flow > 0, -before / flow, 1.0)
+    return np.where(paid.any(axis=-1), years, np.inf)
+
+
+def schedule_matrix(sandbox_df, schedules_df):
+    """(companies, years) cash flows aligned with `sandbox_df`, and which
+    companies have a schedule. Flows of the same company and year add up;
+    schedules of companies not in the sandbox are ignored."""
+    rows = len(sandbox_df)
+    names = pd.Index(sandbox_df["Company"].to_numpy())
+    first = ~names.duplicated()  # repeated names: the first row
+    # Look up each distinct scheduled company once rather than every row
+    codes, scheduled = pd.factorize(schedules_df["Company"])
+    found = names[first].get_indexer(scheduled)
+    row = np.where(found >= 0, np.flatnonzero(first)[found], -1)[codes]
+    year = schedules_df["Year"].to_numpy()
+    known = (codes >= 0) & (row >= 0) & (year >= 0)
+    row, year = row[known], year[known].astype(np.int64)
+    width = int(year.max()) + 1 if len(year) else 1
+    flows = np.bincount(
+        row * width + year,
+        weights=schedules_df["Cash Flow ($M)"].to_numpy(dtype=float)[known],
+        minlength=rows * width,
+    ).reshape(rows, width)
+    has_schedule = np.zeros(rows, dtype=bool)
+    has_schedule[row] = True
+    return flows, has_schedule
+
+
+def schedule_at(flows, position):
+    """The `position`-th company's row of `schedule_matrix`, without the
+    empty years after its last flow."""
+    row = flows[position]
+    nonzero = np.flatnonzero(row)
+    return row[:nonzero[-1] + 1] if len(nonzero) else row[:1]
+
+
+def returns(flows, rate=DISCOUNT_RATE):
+    """IRR (%), NPV ($M), MOIC and payback (years) of each schedule."""
+    return {
+        "irr": irr(flows) * 100,
+        "npv": npv(flows, rate),
+        "moic": moic(flows),
+        "payback": payback(flows),
+    }
+
+
+def apply_schedules(sandbox_df, schedules_df, rate=DISCOUNT_RATE):
+    """The sandbox frame with IRR and payback computed from the cash flows
+    where a company has a schedule, plus NPV, MOIC and the basis of its
+    returns. NPV and MOIC are NaN for companies on stored values."""
+    flows, has_schedule = schedule_matrix(sandbox_df, schedules_df)
+    computed = returns(flows[has_schedule], rate)
+    df = sandbox_df.copy()
+    for column, metric in (("IRR (%)", "irr"), ("Payback Period (years)", "payback")):
+        values = df[column].to_numpy(dtype=float, copy=True)
+        # A schedule without an IRR leaves the stored value in place
+        values[has_schedule] = np.where(np.isnan(computed[metric]), values[has_schedule], computed[metric])
+        df[column] = values
+    for column, metric in (("NPV ($M)", "npv"), ("MOIC (x)", "moic")):
+        values = np.full(len(df), np.nan)
+        values[has_schedule] = computed[metric]
+        df[column] = values
+    df["Returns Basis"] = pd.Categorical(
+        np.where(has_schedule, "Cash flows", "Stored"), categories=["Cash flows", "Stored"]
+    )
+    return df
@@ -0,0 +1,136 @@
+"""Process-wide cache of rendered chart PNGs.
+
+Charts are keyed on (chart id, input data hash, chart parameters) and stored
+as the PNG bytes st.pyplot would have produced. The cache is shared by every
+session, bounded by a byte budget and evicts least recently used charts first.
+A hit returns the stored bytes without building a figure, so matplotlib is
+only touched on a miss. Misses are rendered in render_pool's worker processes:
+`chart_future` returns at once, so a caller can start every chart it needs
+before waiting on any, and a chart already being rendered for another session
+is waited on rather than rendered twice.
+
+Hashing a large input on every rerun would cost more than it saves, so
+callers whose inputs are fully determined by something cheaper (a dataset
+version plus the active filters) pass that as `data_key` instead.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+import render_pool
+
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+
+_entries = OrderedDict()
+_pending = {}  # key -> Future of a chart being rendered
+_lock = threading.Lock()
+_stats = {"bytes": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+
+def _feed(digest, value):
+    # Fold `value` into the digest; containers recurse, pandas and numpy
+    # objects are hashed by content rather than by repr
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        digest.update(type(value).__name__.encode())
+        names = value.columns if isinstance(value, pd.DataFrame) else [getattr(value, "name", None)]
+        digest.update(repr(list(names)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index)).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _feed(digest, item)
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode())
+    digest.update(b"|")
+
+
+def input_hash(*values):
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _feed(digest, value)
+    return digest.hexdigest()
+
+
+def _store(key, png):
+    with _lock:
+        if key in _entries:
+            return
+        _entries[key] = png
+        _stats["bytes"] += len(png)
+        while _stats["bytes"] > CHART_CACHE_BYTES and len(_entries) > 1:
+            _, evicted = _entries.popitem(last=False)
+            _stats["bytes"] -= len(evicted)
+            _stats["evictions"] += 1
+
+
+def _finish(key, rendered, future, build, inputs, params):
+    try:
+        try:
+            png = rendered.result()
+        except BrokenProcessPool:
+            # A worker died (or never started); render this one here
+            render_pool.reset()
+            png = render_pool.render(build, inputs, params)
+    except Exception as exc:
+        with _lock:
+            _pending.pop(key, None)
+        future.set_exception(exc)
+        return
+    _store(key, png)
+    with _lock:
+        _pending.pop(key, None)
+    future.set_result(png)
+
+
+def chart_future(chart_id, build, *inputs, data_key=None, **params):
+    """Future of the PNG bytes of `build(*inputs, **params)`, rendered at most once per key."""
+    key = (chart_id, data_key if data_key is not None else input_hash(*inputs), input_hash(params))
+    with _lock:
+        png = _entries.get(key)
+        if png is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            future = Future()
+            future.set_result(png)
+            return future
+        future = _pending.get(key)
+        if future is not None:
+            _stats["hits"] += 1
+            return future
+        _stats["misses"] += 1
+        future = _pending[key] = Future()
+
+    rendered = render_pool.submit(build, *inputs, **params)
+    rendered.add_done_callback(lambda rendered: _finish(key, rendered, future, build, inputs, params))
+    return future
+
+
+def chart_png(chart_id, build, *inputs, data_key=None, **params):
+    """PNG bytes of `build(*inputs, **params)`, rendered at most once per key."""
+    return chart_future(chart_id, build, *inputs, data_key=data_key, **params).result()
+
+
+def stats():
+    with _lock:
+        return {"entries": len(_entries), **_stats}
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _stats.update(bytes=0, hits=0, misses=0, evictions=0)
@@ -0,0 +1,152 @@
+"""Vega-Lite specs for the charts the browser can draw itself.
+
+Each function mirrors the matplotlib builder of the same name in charts.py but
+returns (data, spec) for st.vega_lite_chart: the browser rasterizes the chart,
+so the server only ships the points, and the user gets tooltips, zoom/pan and
+legend toggles. Charts without a spec here, and portfolios too large to ship
+point by point (see `fits`), are drawn with matplotlib; the matplotlib PNG is
+also what the export buttons download.
+"""
+import pandas as pd
+
+from charts import LABEL_POINTS, SECTOR_COLORS
+
+# Above this many points the PNG is the smaller payload
+MAX_POINTS = 5_000
+
+# Scroll to zoom, drag to pan; double-click resets
+ZOOM = {"name": "zoom", "select": "interval", "bind": "scales"}
+
+
+def fits(df):
+    return len(df) <= MAX_POINTS
+
+
+def _labels(x, y, count):
+    if count > LABEL_POINTS:
+        return []
+    return [{
+        "mark": {"type": "text", "dy": -12, "fontSize": 11, "fontWeight": "bold"},
+        "encoding": {"x": x, "y": y, "text": {"field": "company"}},
+    }]
+
+
+# ---------- SANDBOX ----------
+def investment_vs_impact(sandbox_df):
+    data = pd.DataFrame({
+        "company": sandbox_df["Company"],
+        "investment": sandbox_df["Investment ($M)"],
+        "lifetime_impact": sandbox_df["Lifetime tCO2e Avoided (M)"],
+        "irr": sandbox_df["IRR (%)"],
+    })
+    x = {"field": "investment", "type": "quantitative", "title": "Investment ($M)"}
+    y = {"field": "lifetime_impact", "type": "quantitative", "title": "Lifetime tCO₂e Avoided (M)"}
+    spec = {
+        "title": "Investment Size vs. Climate Impact",
+        "layer": [{
+            "params": [ZOOM],
+            "mark": {"type": "circle", "opacity": 0.7, "stroke": "black", "strokeWidth": 1},
+            "encoding": {
+                "x": x,
+                "y": y,
+                "size": {"field": "irr", "type": "quantitative", "legend": None},
+                "color": {"field": "irr", "type": "quantitative", "title": "IRR (%)",
+                          "scale": {"scheme": "redyellowgreen"}},
+                "tooltip": [
+                    {"field": "company", "title": "Company"},
+                    {"field": "investment", "title": "Investment ($M)", "format": ".1f"},
+                    {"field": "lifetime_impact", "title": "Lifetime tCO₂e (M)", "format": ".2f"},
+                    {"field": "irr", "title": "IRR (%)", "format": ".1f"},
+                ],
+            },
+        }] + _labels(x, y, len(data)),
+    }
+    return data, spec
+
+
+def irr_vs_efficiency(sandbox_df, efficiency):
+    data = pd.DataFrame({
+        "company": sandbox_df["Company"],
+        "irr": sandbox_df["IRR (%)"],
+        "efficiency": efficiency,
+        "investment": sandbox_df["Investment ($M)"],
+    })
+    x = {"field": "irr", "type": "quantitative", "title": "IRR (%)"}
+    y = {"field": "efficiency", "type": "quantitative", "title": "Impact Efficiency (tCO₂e per $1K)"}
+    spec = {
+        "title": "Financial Return vs. Impact Efficiency",
+        "layer": [{
+            "params": [ZOOM],
+            "mark": {"type": "circle", "opacity": 0.7, "stroke": "black", "strokeWidth": 1},
+            "encoding": {
+                "x": x,
+                "y": y,
+                "size": {"field": "investment", "type": "quantitative", "legend": None},
+                "color": {"field": "investment", "type": "quantitative", "title": "Investment Size ($M)",
+                          "scale": {"scheme": "viridis"}},
+                "tooltip": [
+                    {"field": "company", "title": "Company"},
+                    {"field": "irr", "title": "IRR (%)", "format": ".1f"},
+                    {"field": "efficiency", "title": "tCO₂e per $1K", "format": ".0f"},
+                    {"field": "investment", "title": "Investment ($M)", "format": ".1f"},
+                ],
+            },
+        }] + _labels(x, y, len(data)),
+    }
+    return data, spec
+
+
+# ---------- REAL PORTFOLIO ----------
+def materiality_matrix(scored, median_financial, median_impact):
+    data = pd.DataFrame({
+        "company": scored["company"],
+        "sector": scored["sector"].astype(str),
+        "financial": scored["financial_performance"],
+        "impact": scored["impact_performance"],
+        "funding": scored["funding_raised_m"],
+    }).dropna(subset=["financial", "impact"])
+    x = {"field": "financial", "type": "quantitative", "title": "Financial Performance Score (0-100)"}
+    y = {"field": "impact", "type": "quantitative", "title": "Impact Performance (K tCO₂e per $1M invested)"}
+    sectors = sorted(data["sector"].unique())
+    quadrants = pd.DataFrame({
+        "financial": [median_financial * 0.5, median_financial * 1.5, median_financial * 0.5, median_financial * 1.5],
+        "impact": [median_impact * 1.8, median_impact * 1.8, median_impact * 0.5, median_impact * 0.5],
+        "label": ["Impact Leaders", "⭐ Stars", "Underperformers", "Financial Leaders"],
+    })
+    spec = {
+        "title": "Impact Materiality Matrix: Portfolio Strategic Positioning",
+        "layer": [
+            {
+                # Clicking a sector in the legend fades the others
+                "params": [ZOOM, {"name": "sector_pick", "select": {"type": "point", "fields": ["sector"]},
+                                  "bind": "legend"}],
+                "mark": {"type": "circle", "stroke": "black", "strokeWidth": 1.5},
+                "encoding": {
+                    "x": x,
+                    "y": y,
+                    "size": {"field": "funding", "type": "quantitative", "legend": None},
+                    "color": {"field": "sector", "type": "nominal", "title": "Sector",
+                              "scale": {"domain": sectors,
+                                        "range": [SECTOR_COLORS.get(s, '#666666') for s in sectors]}},
+                    "opacity": {"condition": {"param": "sector_pick", "value": 0.6}, "value": 0.1},
+                    "tooltip": [
+                        {"field": "company", "title": "Company"},
+                        {"field": "sector", "title": "Sector"},
+                        {"field": "financial", "title": "Financial score", "format": ".1f"},
+                        {"field": "impact", "title": "K tCO₂e per $1M", "format": ".2f"},
+                        {"field": "funding", "title": "Funding ($M)", "format": ".0f"},
+                    ],
+                },
+            },
+            {"mark": {"type": "rule", "strokeDash": [4, 4], "color": "gray", "opacity": 0.5},
+             "encoding": {"x": {"datum": float(median_financial)}}},
+            {"mark": {"type": "rule", "strokeDash": [4, 4], "color": "gray", "opacity": 0.5},
+             "encoding": {"y": {"datum": float(median_impact)}}},
+            {"data": {"values": quadrants.to_dict("records")},
+             "mark": {"type": "text", "fontStyle": "italic", "color": "#555", "opacity": 0.7},
+             "encoding": {"x": {"field": "financial", "type": "quantitative"},
+                          "y": {"field": "impact", "type": "quantitative"},
+                          "text": {"field": "label"}}},
+        ] + _labels(x, y, len(data)),
+    }
+    return data, spec
@@ -0,0 +1,477 @@
+"""Matplotlib figure builders for the dashboard charts.
+
+Each function takes already-aggregated data and returns a Figure checked out
+of figure_pool; render_png turns it into PNG bytes and hands the figure back.
+"""
+import io
+
+import numpy as np
+from matplotlib.artist import setp
+
+import figure_pool
+
+SECTOR_COLORS = {
+    'Energy': '#059669',
+    'Software': '#2563EB',
+    'Agriculture': '#F59E0B',
+    'Industry': '#8B5CF6',
+    'Transportation': '#14B8A6'
+}
+# Company names drawn on scatter charts: every point up to this many, else
+# only the largest ones, so a large book doesn't draw a label per company
+LABEL_POINTS = 50
+
+
+def _labelled(sizes):
+    # Positions of the points to name: all of them, or the LABEL_POINTS largest
+    sizes = np.asarray(sizes, dtype=float)
+    if len(sizes) <= LABEL_POINTS:
+        return np.arange(len(sizes))
+    return np.argpartition(-np.nan_to_num(sizes, nan=-np.inf), LABEL_POINTS)[:LABEL_POINTS]
+
+
+# ---------- REAL PORTFOLIO ----------
+def attribution_pie(attribution, title, colors):
+    fig, ax = figure_pool.subplots(figsize=(8, 6))
+    wedges, texts, autotexts = ax.pie(
+        attribution.values,
+        labels=attribution.index,
+        autopct='%1.1f%%',
+        startangle=90,
+        colors=colors[:len(attribution)]
+    )
+    ax.set_title(title, fontweight='bold')
+
+    # Make percentage text more readable
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(10)
+
+    fig.tight_layout()
+    return fig
+
+
+def sector_bar(totals, color, xlabel, title):
+    fig, ax = figure_pool.subplots(figsize=(8, 5))
+    totals.plot(kind="barh", ax=ax, color=color)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("")
+    ax.set_title(title)
+    fig.tight_layout()
+    return fig
+
+
+def materiality_matrix(scored, median_financial, median_impact):
+    fig, ax = figure_pool.subplots(figsize=(12, 8))
+
+    # Plot each company, coloured by sector
+    for sector in scored['sector'].unique():
+        sector_data = scored[scored['sector'] == sector]
+        ax.scatter(
+            sector_data['financial_performance'],
+            sector_data['impact_performance'],
+            s=sector_data['funding_raised_m'] * 3,  # Size by funding
+            alpha=0.6,
+            color=SECTOR_COLORS.get(sector, '#666666'),
+            label=sector,
+            edgecolors='black',
+            linewidth=1.5
+        )
+
+    # Quadrant lines
+    ax.axvline(median_financial, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+    ax.axhline(median_impact, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+
+    # Quadrant labels
+    ax.text(median_financial * 0.5, median_impact * 1.8, 'Impact Leaders\n(High Impact, Lower Returns)',
+            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
+    ax.text(median_financial * 1.5, median_impact * 1.8, '⭐ Stars\n(High Impact, High Returns)',
+            ha='center', va='center', fontsize=11, fontweight='bold', color='#2E7D32', alpha=0.8)
+    ax.text(median_financial * 0.5, median_impact * 0.5, 'Underperformers\n(Lower Impact, Lower Returns)',
+            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
+    ax.text(median_financial * 1.5, median_impact * 0.5, 'Financial Leaders\n(High Returns, Lower Impact)',
+            ha='center', va='center', fontsize=10, style='italic', color='#555', alpha=0.7)
+
+    # Name each company on its point (only the largest by funding in a big book)
+    companies = scored['company'].to_numpy()
+    financial = scored['financial_performance'].to_numpy()
+    impact = scored['impact_performance'].to_numpy()
+    for position in _labelled(scored['funding_raised_m']):
+        ax.annotate(
+            companies[position],
+            (financial[position], impact[position]),
+            xytext=(5, 5),
+            textcoords='offset points',
+            fontsize=8,
+            alpha=0.8
+        )
+
+    ax.set_xlabel('Financial Performance Score (0-100)', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Impact Performance (K tCO₂e per $1M invested)', fontsize=12, fontweight='bold')
+    ax.set_title('Impact Materiality Matrix: Portfolio Strategic Positioning', fontsize=14, fontweight='bold')
+    ax.legend(loc='upper left', fontsize=9, framealpha=0.9)
+    ax.grid(True, alpha=0.2)
+
+    fig.tight_layout()
+    return fig
+
+
+def company_vs_portfolio(efficiency):
+    company = efficiency["company_data"]['company']
+    fig, (ax1, ax2, ax3) = figure_pool.subplots(1, 3, figsize=(15, 4))
+
+    # Chart 1: Impact per Employee
+    ax1.barh(['Portfolio Avg', company],
+             [efficiency["avg_impact_per_employee"], efficiency["impact_per_employee"]],
+             color=['#90A4AE', '#2E7D32'])
+    ax1.set_xlabel('tCO₂e per Employee')
+    ax1.set_title('Impact Efficiency')
+
+    # Chart 2: Impact per $1M
+    ax2.barh(['Portfolio Avg', company],
+             [efficiency["avg_impact_per_funding"], efficiency["impact_per_funding"]],
+             color=['#90A4AE', '#1565C0'])
+    ax2.set_xlabel('K tCO₂e per $1M Funding')
+    ax2.set_title('Capital Efficiency')
+
+    # Chart 3: Funding per Employee
+    ax3.barh(['Portfolio Avg', company],
+             [efficiency["avg_funding_per_employee"], efficiency["funding_per_employee"]],
+             color=['#90A4AE', '#F57C00'])
+    ax3.set_xlabel('$M per Employee')
+    ax3.set_title('Team Leverage')
+
+    fig.tight_layout()
+    return fig
+
+
+def tornado(tornado_frame, base, title):
+    fig, ax = figure_pool.subplots(figsize=(8, max(3, 0.6 * len(tornado_frame) + 1.5)))
+
+    y = np.arange(len(tornado_frame))
+    low = tornado_frame["low_impact"].to_numpy()
+    high = tornado_frame["high_impact"].to_numpy()
+    ax.barh(y, low - base, left=base, color='#E57373', label='Input at low value')
+    ax.barh(y, high - base, left=base, color='#81C784', label='Input at high value')
+    ax.axvline(base, color='#37474F', linewidth=1)
+
+    ax.set_yticks(y)
+    ax.set_yticklabels(tornado_frame["driver"])
+    ax.invert_yaxis()
+    ax.set_xlabel('Annual Impact (K tCO₂e)')
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3, axis='x')
+    ax.legend(loc='lower right')
+
+    fig.tight_layout()
+    return fig
+
+
+def portfolio_history(totals):
+    fig, (ax1, ax2, ax3) = figure_pool.subplots(1, 3, figsize=(15, 4))
+
+    taken = totals.index.tz_localize(None)
+    for ax, column, color, title in (
+        (ax1, "funding_raised_m", '#2563EB', 'Total Funding ($M)'),
+        (ax2, "employees", '#8B5CF6', 'Headcount'),
+        (ax3, "estimated_annual_tco2e_avoided_k", '#059669', 'Annual Impact (K tCO₂e)'),
+    ):
+        ax.plot(taken, totals[column], color=color, marker='o', linewidth=2)
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+        setp(ax.get_xticklabels(), rotation=30, ha='right')
+
+    fig.tight_layout()
+    return fig
+
+
+def company_vs_industry(efficiency, benchmark, performance_metrics):
+    fig, (ax1, ax2) = figure_pool.subplots(1, 2, figsize=(14, 5))
+
+    # Chart 1: Impact Efficiency Comparison
+    categories = ['Impact per\nEmployee', 'Impact per\n$1M Funding']
+    company_values = [efficiency["impact_per_employee"], efficiency["impact_per_funding"]]
+    industry_values = [benchmark['impact_per_employee'], benchmark['impact_per_funding']]
+
+    x = np.arange(len(categories))
+    width = 0.35
+
+    bars1 = ax1.bar(x - width/2, industry_values, width, label='Industry Average', color='#90A4AE', alpha=0.7)
+    bars2 = ax1.bar(x + width/2, company_values, width, label=efficiency["company_data"]['company'], color='#2E7D32', alpha=0.8)
+
+    ax1.set_ylabel('Impact Metrics', fontweight='bold')
+    ax1.set_title('Impact Performance vs. Industry', fontweight='bold')
+    ax1.set_xticks(x)
+    ax1.set_xticklabels(categories)
+    ax1.legend()
+    ax1.grid(axis='y', alpha=0.3)
+
+    # Add value labels on bars
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            height = bar.get_height()
+            ax1.text(bar.get_x() + bar.get_width()/2., height,
+                    f'{height:.1f}',
+                    ha='center', va='bottom', fontsize=9)
+
+    # Chart 2: Performance Index (100 = industry average)
+    colors = ['#059669' if v >= 100 else '#F59E0B' for v in performance_metrics.values()]
+    bars = ax2.barh(list(performance_metrics.keys()), list(performance_metrics.values()), color=colors, alpha=0.7)
+
+    ax2.axvline(100, color='gray', linestyle='--', linewidth=2, label='Industry Average (100)')
+    ax2.set_xlabel('Performance Index (100 = Industry Avg)', fontweight='bold')
+    ax2.set_title('Relative Performance Index', fontweight='bold')
+    ax2.legend()
+    ax2.grid(axis='x', alpha=0.3)
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, performance_metrics.values())):
+        ax2.text(value + 2, i, f'{value:.0f}', va='center', fontsize=10, fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+
+# ---------- SANDBOX ----------
+def investment_vs_impact(sandbox_df):
+    fig, ax = figure_pool.subplots(figsize=(8, 6))
+    scatter = ax.scatter(
+        sandbox_df["Investment ($M)"],
+        sandbox_df["Lifetime tCO2e Avoided (M)"],
+        s=sandbox_df["IRR (%)"] * 10,
+        c=sandbox_df["IRR (%)"],
+        cmap="RdYlGn",
+        alpha=0.7,
+        edgecolors="black"
+    )
+
+    companies = sandbox_df["Company"].to_numpy()
+    investment = sandbox_df["Investment ($M)"].to_numpy()
+    impact = sandbox_df["Lifetime tCO2e Avoided (M)"].to_numpy()
+    for position in _labelled(investment):
+        ax.annotate(
+            companies[position],
+            (investment[position], impact[position]),
+            fontsize=11,
+            fontweight='bold',
+            ha='center'
+        )
+
+    ax.set_xlabel("Investment ($M)", fontsize=12)
+    ax.set_ylabel("Lifetime tCO₂e Avoided (M)", fontsize=12)
+    ax.set_title("Investment Size vs. Climate Impact", fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+
+    cbar = fig.colorbar(scatter, ax=ax)
+    cbar.set_label("IRR (%)", fontsize=10)
+
+    fig.tight_layout()
+    return fig
+
+
+def irr_vs_efficiency(sandbox_df, efficiency):
+    fig, ax = figure_pool.subplots(figsize=(8, 6))
+
+    scatter = ax.scatter(
+        sandbox_df["IRR (%)"],
+        efficiency,
+        s=sandbox_df["Investment ($M)"] * 3,
+        c=sandbox_df["Investment ($M)"],
+        cmap="viridis",
+        alpha=0.7,
+        edgecolors="black"
+    )
+
+    companies = sandbox_df["Company"].to_numpy()
+    irr = sandbox_df["IRR (%)"].to_numpy()
+    efficiency = np.asarray(efficiency)
+    for position in _labelled(sandbox_df["Investment ($M)"]):
+        ax.annotate(
+            companies[position],
+            (irr[position], efficiency[position]),
+            fontsize=11,
+            fontweight='bold',
+            ha='center'
+        )
+
+    ax.set_xlabel("IRR (%)", fontsize=12)
+    ax.set_ylabel("Impact Efficiency (tCO₂e per $1K)", fontsize=12)
+    ax.set_title("Financial Return vs. Impact Efficiency", fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+
+    cbar = fig.colorbar(scatter, ax=ax)
+    cbar.set_label("Investment Size ($M)", fontsize=10)
+
+    fig.tight_layout()
+    return fig
+
+
+def financial_comparison(company_data, averages):
+    fig, ax = figure_pool.subplots(figsize=(8, 5))
+
+    metrics = ['IRR (%)', 'Payback\n(years)']
+    company_vals = [company_data['IRR (%)'], company_data['Payback Period (years)']]
+    portfolio_vals = [averages["avg_irr"], averages["avg_payback"]]
+
+    x = np.arange(len(metrics))
+    width = 0.35
+
+    ax.bar(x - width/2, portfolio_vals, width, label='Portfolio Avg', color='#90A4AE')
+    ax.bar(x + width/2, company_vals, width, label=company_data['Company'], color='#2E7D32')
+
+    ax.set_ylabel('Value')
+    ax.set_title('Financial Metrics Comparison')
+    ax.set_xticks(x)
+    ax.set_xticklabels(metrics)
+    ax.legend()
+    ax.grid(True, alpha=0.3, axis='y')
+
+    fig.tight_layout()
+    return fig
+
+
+def efficiency_comparison(company, efficiency, avg_efficiency):
+    fig, ax = figure_pool.subplots(figsize=(8, 5))
+
+    ax.barh(['Portfolio Average', company],
+           [avg_efficiency, efficiency],
+           color=['#90A4AE', '#1565C0'])
+    ax.set_xlabel('Impact Efficiency (tCO₂e per $1K)')
+    ax.set_title('Capital Efficiency Comparison')
+    ax.grid(True, alpha=0.3, axis='x')
+
+    fig.tight_layout()
+    return fig
+
+
+def risk_return(risk_scores, irr, company, company_risk_score, company_irr):
+    fig, ax = figure_pool.subplots(figsize=(10, 6))
+
+    # Plot all companies
+    ax.scatter(
+        risk_scores,
+        irr,
+        s=100,
+        c='lightgray',
+        alpha=0.5,
+        edgecolors="black"
+    )
+
+    # Highlight selected company
+    ax.scatter(
+        [company_risk_score],
+        [company_irr],
+        s=300,
+        c='red',
+        alpha=0.8,
+        edgecolors="black",
+        marker='*',
+        label=company
+    )
+
+    ax.set_xlabel("Risk Level", fontsize=12)
+    ax.set_ylabel("IRR (%)", fontsize=12)
+    ax.set_title("Risk-Return Profile", fontsize=14, fontweight='bold')
+    ax.set_xticks([1, 2, 3, 4])
+    ax.set_xticklabels(["Low", "Medium", "Medium-High", "High"])
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    fig.tight_layout()
+    return fig
+
+
+def cash_flow_schedule(flows, company, payback):
+    fig, ax = figure_pool.subplots(figsize=(10, 4.5))
+
+    years = np.arange(len(flows))
+    ax.bar(years, flows, color=np.where(flows < 0, '#E57373', '#81C784'), label='Cash flow')
+    ax.plot(years, np.cumsum(flows), color='#1565C0', marker='o', linewidth=2, label='Cumulative')
+    ax.axhline(0, color='#37474F', linewidth=1)
+    if np.isfinite(payback):
+        ax.axvline(payback, color='gray', linestyle='--', linewidth=1, label=f'Payback ({payback:.1f} years)')
+
+    ax.set_xlabel('Year')
+    ax.set_ylabel('$M')
+    ax.set_xticks(years)
+    ax.set_title(f'{company}: Cash-Flow Schedule')
+    ax.grid(True, alpha=0.3, axis='y')
+    ax.legend(loc='upper left')
+
+    fig.tight_layout()
+    return fig
+
+
+def scenario_bands(companies, p10, p50, p90, base, xlabel, title):
+    fig, ax = figure_pool.subplots(figsize=(8, max(3, 0.45 * len(companies) + 1.5)))
+
+    y = np.arange(len(companies))
+    ax.hlines(y, p10, p90, color='#90A4AE', linewidth=6, label='P10–P90')
+    ax.scatter(p50, y, s=60, c='#1565C0', zorder=3, label='P50')
+    ax.scatter(base, y, s=60, c='#2E7D32', marker='D', zorder=3, label='Base case')
+
+    ax.set_yticks(y)
+    ax.set_yticklabels(companies)
+    ax.invert_yaxis()
+    ax.set_xlabel(xlabel)
+    ax.set_title(title)
+    ax.grid(True, alpha=0.3, axis='x')
+    ax.legend(loc='lower right')
+
+    fig.tight_layout()
+    return fig
+
+
+def efficient_frontier(frontier, chosen, current):
+    fig, ax = figure_pool.subplots(figsize=(10, 6))
+
+    ax.plot(frontier["irr"], frontier["impact"], marker='o', color='#1565C0', label='Efficient frontier')
+    ax.scatter([current["irr"]], [current["impact"]], s=150, c='#90A4AE', edgecolors="black",
+               zorder=3, label='Current portfolio')
+    if chosen["deals"]:
+        ax.scatter([chosen["irr"]], [chosen["impact"]], s=300, c='#2E7D32', edgecolors="black",
+                   marker='*', zorder=4, label='Optimized allocation')
+
+    ax.set_xlabel('Blended IRR (%)', fontsize=12)
+    ax.set_ylabel('Lifetime tCO₂e Avoided (M)', fontsize=12)
+    ax.set_title('Impact vs. Return Frontier', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    fig.tight_layout()
+    return fig
+
+
+# ---------- INVESTMENT THESIS ----------
+def criteria_strength(criteria_scores):
+    fig, ax = figure_pool.subplots(figsize=(8, 6))
+
+    ax.bar(criteria_scores.keys(), criteria_scores.values(), color=['#2E7D32', '#1565C0', '#F57C00'])
+    ax.set_ylabel("Total Score Across Portfolio")
+    ax.set_title("Investment Criteria Strength")
+    ax.set_ylim(0, 30)
+    setp(ax.get_xticklabels(), rotation=15, ha='right')
+    fig.tight_layout()
+    return fig
+
+
+def top_performers(top_companies):
+    fig, ax = figure_pool.subplots(figsize=(8, 6))
+
+    ax.barh(top_companies["Company"], top_companies["Total Score"], color='#2E7D32')
+    ax.set_xlabel("Total Score (out of 9)")
+    ax.set_title("Highest Scoring Companies")
+    ax.set_xlim(0, 9)
+    fig.tight_layout()
+    return fig
+
+
+def render_png(fig):
+    # Same savefig options st.pyplot uses, so headless timings match the app
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
+    finally:
+        figure_pool.release(fig)
+    return buf.getvalue()
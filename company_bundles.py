@@ -0,0 +1,147 @@
+"""Deep-dive bundles for every company in a filtered view.
+
+The Company Deep Dive shows, for one company, its three efficiency ratios
+against the view's averages, its sector benchmark and the deltas to it, a
+performance index and a rating. `build_company_bundles` computes all of these
+for every company of the view in one vectorized pass, and the app caches the
+result per (data version, filters). Switching companies is then a lookup
+(`company_bundle`) rather than a recomputation.
+
+Charts are not rendered here for every company: at thousands of names that
+would cost far more than it saves. The app renders the selected company's
+charts through chart_cache and pre-renders its neighbours in the company list
+(`neighbours`) in render_pool's workers.
+"""
+import numpy as np
+import pandas as pd
+
+import derived_metrics
+import reference_data
+
+# (label, st.* alert) per rating, best first; see `_ratings`
+RATINGS = [
+    ("⭐⭐⭐ **Exceptional** - Significantly outperforms industry benchmarks", "success"),
+    ("✅ **Above Average** - Outperforms industry benchmarks", "success"),
+    ("🟡 **On Par** - Performs at industry average levels", "info"),
+    ("🔴 **Below Average** - Underperforms industry benchmarks (may indicate early stage or capital-intensive model)", "warning"),
+]
+BENCHMARK_FIELDS = ["impact_per_employee", "impact_per_funding", "employees_per_company"]
+
+
+def _benchmarks(sector):
+    # One benchmark lookup per distinct sector, spread over the rows by code
+    sector = sector.astype("category")
+    names = [str(value) for value in sector.cat.categories]
+    sectors, default = reference_data.sector_benchmarks()
+    table = [sectors.get(name, default) for name in names] + [default]
+    codes = sector.cat.codes.to_numpy()  # -1 (missing) picks the trailing default
+    columns = {field: np.array([entry[field] for entry in table], dtype=float)[codes] for field in BENCHMARK_FIELDS}
+    columns["benchmark_code"] = np.where(codes < 0, len(names), codes)
+    return columns, table
+
+
+def _ratings(impact_emp_vs_industry, impact_fund_vs_industry):
+    # Index into RATINGS; NaN fails every test and lands on "Below Average"
+    return np.select(
+        [
+            (impact_emp_vs_industry > 20) & (impact_fund_vs_industry > 20),
+            (impact_emp_vs_industry > 0) & (impact_fund_vs_industry > 0),
+            (impact_emp_vs_industry > -20) & (impact_fund_vs_industry > -20),
+        ],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int8)
+
+
+def build_company_bundles(filtered_df, real_metrics):
+    rows = derived_metrics.rows_for(real_metrics, filtered_df)
+    ratios = {column: rows[column].to_numpy(dtype=float)
+              for column in ("impact_per_employee", "impact_per_funding", "funding_per_employee")}
+    averages = {f"avg_{column}": float(np.nanmean(values)) if len(values) else np.nan
+                for column, values in ratios.items()}
+    benchmark, table = _benchmarks(filtered_df["sector"])
+    employees = filtered_df["employees"].to_numpy(dtype=float)
+
+    # Ratios to the industry benchmark, 1.0 = industry average
+    vs_industry = {
+        "impact_emp": ratios["impact_per_employee"] / benchmark["impact_per_employee"],
+        "impact_fund": ratios["impact_per_funding"] / benchmark["impact_per_funding"],
+        "team_size": employees / benchmark["employees_per_company"],
+    }
+    frame = pd.DataFrame({
+        **ratios,
+        **{f"{name}_vs_industry": (ratio - 1) * 100 for name, ratio in vs_industry.items()},
+        **{f"{name}_index": ratio * 100 for name, ratio in vs_industry.items()},
+        "benchmark_code": benchmark["benchmark_code"],
+    })
+    frame["rating"] = _ratings(frame["impact_emp_vs_industry"], frame["impact_fund_vs_industry"])
+    names = filtered_df["company"].astype(str)
+    return {
+        "rows": filtered_df,
+        "frame": frame,
+        "averages": averages,
+        "benchmarks": table,
+        "companies": pd.Index(names),
+        "names": names.tolist(),  # the deep dive's selectbox options
+    }
+
+
+def _position(bundles, company):
+    position = bundles["companies"].get_loc(company)
+    if isinstance(position, slice):  # duplicate names: the first one, as a row filter would pick
+        return position.start
+    if isinstance(position, np.ndarray):
+        return int(np.flatnonzero(position)[0])
+    return position
+
+
+def company_bundle(bundles, company):
+    """Everything the deep dive shows for `company`, as a dict."""
+    return bundle_at(bundles, _position(bundles, company))
+
+
+def bundle_at(bundles, position):
+    """The bundle of the view's `position`-th company."""
+    values = bundles["frame"].iloc[position]
+    rating, alert = RATINGS[int(values["rating"])]
+    return {
+        "company_data": bundles["rows"].iloc[position],
+        "impact_per_employee": values["impact_per_employee"],
+        "impact_per_funding": values["impact_per_funding"],
+        "funding_per_employee": values["funding_per_employee"],
+        **bundles["averages"],
+        "benchmark": bundles["benchmarks"][int(values["benchmark_code"])],
+        "impact_emp_vs_industry": values["impact_emp_vs_industry"],
+        "impact_fund_vs_industry": values["impact_fund_vs_industry"],
+        "team_size_vs_industry": values["team_size_vs_industry"],
+        # 100 = industry average
+        "performance_index": {
+            'Impact\nEfficiency': values["impact_emp_index"],
+            'Capital\nEfficiency': values["impact_fund_index"],
+            'Team\nSize': values["team_size_index"],
+        },
+        "rating": rating,
+        "rating_alert": alert,
+    }
+
+
+def bundles_slice(bundles, start, stop):
+    """The bundles of the view's companies start..stop-1 on their own, e.g. to
+    hand a chunk to a worker process without the rest of the view."""
+    return {
+        "rows": bundles["rows"].iloc[start:stop],
+        "frame": bundles["frame"].iloc[start:stop],
+        "averages": bundles["averages"],
+        "benchmarks": bundles["benchmarks"],
+        "companies": bundles["companies"][start:stop],
+        "names": bundles["names"][start:stop],
+    }
+
+
+def neighbours(bundles, company, count):
+    """Up to `count` companies after `company` in the list, then before it."""
+    names = bundles["names"]
+    position = _position(bundles, company)
+    after = names[position + 1:position + 1 + count]
+    before = names[max(0, position - (count - len(after))):position][::-1]
+    return after + before
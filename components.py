@@ -0,0 +1,78 @@
+"""HTML components for the dashboard's design system.
+
+The stylesheet lives in static/dashboard.css and is served by Streamlit's
+static file server (see .streamlit/config.toml), so a rerun sends one <link>
+tag instead of the whole design system. The URL carries a hash of the file's
+contents: browsers keep the stylesheet between reruns and sessions and fetch
+it again only when it changes.
+
+The cards and badges are template strings filled with their changing values;
+all of their styling comes from classes in the stylesheet.
+"""
+import hashlib
+import math
+from html import escape
+from pathlib import Path
+
+import streamlit as st
+
+STYLESHEET = Path(__file__).parent / "static" / "dashboard.css"
+
+_CSS = STYLESHEET.read_bytes()
+STYLESHEET_URL = f"app/static/{STYLESHEET.name}?v={hashlib.blake2b(_CSS, digest_size=6).hexdigest()}"
+
+_METRIC_CARD = (
+    '<div class="metric-card">'
+    '<div class="metric-label">{label}</div>'
+    '<div class="metric-value {color}">{value}</div>'
+    '<div class="metric-sublabel">{sublabel}</div>'
+    '{badge}'
+    '</div>'
+)
+_TREND_BADGE = '<div class="trend-badge {direction}">{arrow} {text}</div>'
+_METHODOLOGY_CARD = (
+    '<div class="methodology-card">'
+    '<div class="methodology-header">{title}</div>'
+    '</div>'
+)
+_FRAMEWORK_BADGE = (
+    '<div class="framework-badge"><div>'
+    '<div class="framework-badge-text">{name}</div>'
+    '<div class="framework-badge-sublabel">{detail}</div>'
+    '</div></div>'
+)
+
+
+def stylesheet():
+    """Load the design system; falls back to inlining it without static serving."""
+    if st.get_option("server.enableStaticServing"):
+        st.markdown(f'<link rel="stylesheet" href="{STYLESHEET_URL}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{_CSS.decode()}</style>", unsafe_allow_html=True)
+
+
+def trend_badge(text, positive=True):
+    direction, arrow = ("positive", "↗") if positive else ("negative", "↘")
+    return _TREND_BADGE.format(direction=direction, arrow=arrow, text=escape(text))
+
+
+def change_badge(change, since):
+    """trend_badge for a fractional change (e.g. 0.12 -> "+12% from last
+    quarter"), or no badge when there is nothing to compare with."""
+    if change is None or not math.isfinite(change):
+        return ""
+    return trend_badge(f"{change:+.0%} from {since}", positive=change >= 0)
+
+
+def metric_card(label, value, sublabel, color, badge=""):
+    st.markdown(_METRIC_CARD.format(
+        label=escape(label), value=escape(value), sublabel=escape(sublabel), color=color, badge=badge,
+    ), unsafe_allow_html=True)
+
+
+def methodology_card(title):
+    st.markdown(_METHODOLOGY_CARD.format(title=escape(title)), unsafe_allow_html=True)
+
+
+def framework_badge(name, detail):
+    st.markdown(_FRAMEWORK_BADGE.format(name=escape(name), detail=escape(detail)), unsafe_allow_html=True)
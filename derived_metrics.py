@@ -0,0 +1,38 @@
+"""Per-company ratios, computed once per dataset version.
+
+Every ratio the dashboard shows (impact per employee and per $M, funding per
+employee, sandbox impact efficiency and risk score) is computed for the whole
+portfolio in one vectorized pass; the materiality matrix's financial score is
+built on top of these in scoring.py. The result is a frame aligned with the
+portfolio's index, so a filtered view reads its rows with `rows_for` instead
+of recomputing columns on every rerun.
+"""
+import pandas as pd
+
+RISK_SCORES = {'Low': 1, 'Medium': 2, 'Medium-High': 3, 'High': 4}
+
+
+def build_real_metrics(real_df):
+    impact = real_df['estimated_annual_tco2e_avoided_k']
+    funding = real_df['funding_raised_m']
+    employees = real_df['employees']
+    return pd.DataFrame({
+        'impact_per_employee': impact / employees,
+        'impact_per_funding': impact / funding,  # K tCO2e per $1M, the matrix's impact performance
+        'funding_per_employee': funding / employees,
+    }, index=real_df.index)
+
+
+def build_sandbox_metrics(sandbox_df):
+    return pd.DataFrame({
+        # tCO2e per $1K invested
+        'impact_efficiency': (sandbox_df['Lifetime tCO2e Avoided (M)'] * 1000) / sandbox_df['Investment ($M)'],
+        'risk_score': sandbox_df['Risk Rating'].astype(str).map(RISK_SCORES),
+    }, index=sandbox_df.index)
+
+
+def rows_for(metrics, df):
+    """The metrics of the rows in `df`, a filtered view of the same portfolio."""
+    if len(df) == len(metrics) and df.index.equals(metrics.index):
+        return metrics
+    return metrics.loc[df.index]
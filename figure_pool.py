@@ -0,0 +1,68 @@
+"""Pooled matplotlib figures for the chart builders.
+
+Figures are created directly from matplotlib.figure.Figure with an Agg canvas,
+never through pyplot, so they are not registered in pyplot's global figure
+manager and cannot pile up there across reruns and sessions. A released
+figure is cleared (dropping every artist and the data it referenced), given a
+fresh canvas (dropping the cached render buffer) and kept for the next chart
+of the same size, up to MAX_IDLE_FIGURES. Axes are rebuilt on each checkout:
+colorbars, pie aspect ratios and limits leave state behind that Axes.clear()
+does not fully undo.
+
+`stats()` reports how many figures are checked out and idle, and the bytes
+held by their render buffers, so a leak shows up as a growing live count.
+"""
+import threading
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+MAX_IDLE_FIGURES = 8
+
+_idle = {}  # figsize -> [Figure]
+_live = {}  # id(fig) -> Figure
+_lock = threading.Lock()
+
+
+def subplots(nrows=1, ncols=1, figsize=(6.4, 4.8)):
+    """Pooled stand-in for plt.subplots: returns (fig, axes)."""
+    figsize = tuple(figsize)
+    with _lock:
+        pool = _idle.get(figsize)
+        fig = pool.pop() if pool else None
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows, ncols)
+    with _lock:
+        _live[id(fig)] = fig
+    return fig, axes
+
+
+def release(fig):
+    """Clear `fig` and return it to the pool; safe to call more than once."""
+    with _lock:
+        if _live.pop(id(fig), None) is None:
+            return
+    fig.clear()
+    FigureCanvasAgg(fig)
+    figsize = tuple(fig.get_size_inches())
+    with _lock:
+        if sum(len(pool) for pool in _idle.values()) < MAX_IDLE_FIGURES:
+            _idle.setdefault(figsize, []).append(fig)
+
+
+def _buffer_bytes(fig):
+    renderer = getattr(fig.canvas, "renderer", None)
+    return int(renderer.width * renderer.height * 4) if renderer is not None else 0
+
+
+def stats():
+    with _lock:
+        live = list(_live.values())
+        idle = [fig for pool in _idle.values() for fig in pool]
+    return {
+        "live": len(live),
+        "idle": len(idle),
+        "bytes": sum(_buffer_bytes(fig) for fig in live + idle),
+    }
@@ -0,0 +1,61 @@
+"""Precomputed row masks for the portfolio filters.
+
+For every value of each filter dimension (sector, stage, country, impact
+lever) the rows holding that value are stored once per dataset version as a
+packed bitset (one bit per row). A filter is then a bitwise OR of the chosen
+values within a dimension and a bitwise AND across dimensions, so multi-select
+costs the same as a single value and no filter touches the DataFrame itself.
+
+Filters follow the cube's convention (see portfolio_cube.py): each dimension
+maps to one value or a list of values, and "All" or an empty selection leaves
+that dimension unconstrained.
+"""
+import numpy as np
+
+
+def _selection(value):
+    # The selected values as a list, or None when the dimension is unconstrained
+    if value is None or value == "All":
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return list(value) or None
+    return [value]
+
+
+def build_filter_masks(df, dimensions):
+    masks = {}
+    for dimension in dimensions:
+        column = df[dimension].astype("category")
+        codes = column.cat.codes.to_numpy()
+        masks[dimension] = {
+            value: np.packbits(codes == code) for code, value in enumerate(column.cat.categories)
+        }
+    return {"n_rows": len(df), "masks": masks}
+
+
+def select(filter_masks, filters):
+    """Boolean row mask for `filters`, or None when nothing is constrained."""
+    combined = None
+    empty = np.zeros((filter_masks["n_rows"] + 7) // 8, dtype=np.uint8)
+    for dimension, value in (filters or {}).items():
+        values = _selection(value)
+        if values is None:
+            continue
+        by_value = filter_masks["masks"][dimension]
+        chosen = np.bitwise_or.reduce([by_value.get(v, empty) for v in values])
+        combined = chosen if combined is None else combined & chosen
+    if combined is None:
+        return None
+    return np.unpackbits(combined, count=filter_masks["n_rows"]).view(bool)
+
+
+def row_mask(df, filters):
+    """Same as `select`, computed directly from `df` when no masks were built."""
+    combined = None
+    for dimension, value in (filters or {}).items():
+        values = _selection(value)
+        if values is None:
+            continue
+        chosen = df[dimension].isin(values).to_numpy()
+        combined = chosen if combined is None else combined & chosen
+    return combined
@@ -0,0 +1,51 @@
+"""Impact Assessment Memo and methodology text for the Company Deep Dive.
+
+Hand-written memos and the sector methodologies are reference data (see
+reference_data.py); every company without a memo of its own gets one built
+from its deep-dive bundle (see company_bundles.py). A memo is only formatted
+for the company being shown or exported. The same text backs the dashboard
+and the batch reports (report_export.py).
+"""
+import reference_data
+
+# Memo keys in reading order, with their headings
+MEMO_SECTIONS = [
+    ("problem", "1. Problem Framing"),
+    ("solution", "2. Solution & Theory of Change"),
+    ("counterfactual", "3. Counterfactual Analysis"),
+    ("additionality", "4. Additionality Assessment"),
+    ("impact_estimate", "5. Impact Estimate"),
+    ("material_risks", "6. Material Risks"),
+    ("sensitivity", "7. Sensitivity Analysis"),
+    ("recommendation", "8. Investment Recommendation"),
+]
+
+
+def _default_memo(bundle):
+    company_data = bundle["company_data"]
+    impact_per_funding = bundle["impact_per_funding"]
+    avg_impact_per_funding = bundle["avg_impact_per_funding"]
+    return {
+        "problem": f"{company_data['company']} addresses critical challenges in the {company_data['sector']} sector, where conventional approaches result in significant carbon emissions and inefficiencies.",
+        "solution": f"{company_data['notes']}",
+        "counterfactual": f"Without {company_data['company']}'s solution, the market would continue using conventional {company_data['sector'].lower()} approaches with higher emissions intensity.",
+        "additionality": f"{company_data['company']}'s approach creates net-new emissions reductions by enabling solutions that wouldn't exist otherwise in the market.",
+        "impact_estimate": f"Based on current operations, {company_data['company']} avoids an estimated {company_data['estimated_annual_tco2e_avoided_k']:.0f}K tons CO₂e annually. Impact scales with company growth and market adoption.",
+        "material_risks": "**Market Risk:** Competition and technology adoption. **Technical Risk:** Execution and scalability. **Measurement Risk:** Impact attribution and data quality. **Financial Risk:** Capital requirements and path to profitability.",
+        "sensitivity": "Impact estimates are sensitive to baseline assumptions, attribution methodology, and data quality. Conservative assumptions applied where data is limited.",
+        "recommendation": f"**Impact Assessment:** {company_data['company']} demonstrates {'strong' if impact_per_funding > avg_impact_per_funding else 'solid'} impact potential in the {company_data['sector']} sector. {'Exceptional performance vs. portfolio benchmarks.' if impact_per_funding > avg_impact_per_funding * 1.2 else 'Performance in line with portfolio expectations.'} Recommend {'investment' if impact_per_funding > avg_impact_per_funding else 'further diligence'} with focus on impact measurement infrastructure and scalability."
+    }
+
+
+def methodology_for(sector):
+    return reference_data.methodology_for(sector)
+
+
+def decision_memo(bundle):
+    """The memo for the bundle's company, as a dict keyed like MEMO_SECTIONS."""
+    company_data = bundle["company_data"]
+    templates = reference_data.memo_template(company_data['company'])
+    if templates is None:
+        return _default_memo(bundle)
+    fields = {**company_data.to_dict(), **{key: value for key, value in bundle.items() if key != "company_data"}}
+    return {key: template.format_map(fields) for key, template in templates.items()}
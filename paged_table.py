@@ -0,0 +1,108 @@
+"""Server-side paging for the detail tables.
+
+Sending a whole frame to st.dataframe with a Styler formats and styles every
+cell before anything is shown, which is fine at 10 rows and unusable at
+100k. Instead the app keeps the frame on the server and sends one page at a
+time:
+
+- `view` turns a text filter and a sort column into the row positions to
+  show, with vectorized masks and a stable sort
+- `page_styler` formats and colours just the rows of one page
+
+Gradient colours match Styler.background_gradient, but the colour range is
+given by the caller (the whole column's, see `column_ranges`), so a value has
+the same colour on every page.
+"""
+import matplotlib
+import numpy as np
+import pandas as pd
+
+PAGE_SIZE = 100
+
+# Styler.background_gradient's defaults
+TEXT_COLOR_THRESHOLD = 0.408
+DARK_TEXT, LIGHT_TEXT = "#000000", "#f1f1f1"
+
+
+def _text_mask(column, query):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Match each label once and spread the result over the rows by code
+        labels = column.cat.categories
+        hits = np.fromiter((query in str(label).lower() for label in labels), dtype=bool, count=len(labels))
+        return np.append(hits, False)[column.cat.codes.to_numpy()]  # code -1 (missing) picks False
+    if pd.api.types.is_string_dtype(column.dtype):
+        return column.str.lower().str.contains(query, regex=False, na=False).to_numpy(dtype=bool)
+    return None
+
+
+def text_filter(frame, query):
+    """Rows with `query` in any of their text columns, ignoring case."""
+    query = query.strip().lower()
+    mask = np.zeros(len(frame), dtype=bool)
+    for _, column in frame.items():
+        hits = _text_mask(column, query)
+        if hits is not None:
+            mask |= hits
+    return mask
+
+
+def sort_positions(column, ascending=True):
+    """Row positions in sorted order; missing values last, ties in row order."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # By label rather than by category order
+        column = column.cat.set_categories(sorted(column.cat.categories, key=str), ordered=True)
+    column = column.reset_index(drop=True)
+    return column.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+
+def view(frame, query="", sort_by=None, ascending=True, columns=None):
+    """Positions of `frame`'s rows to show, filtered on `columns` (default
+    all) and sorted by `sort_by`."""
+    shown = frame if columns is None else frame[columns]
+    if sort_by is not None:
+        positions = sort_positions(frame[sort_by], ascending)
+    else:
+        positions = np.arange(len(frame))
+    if query.strip():
+        positions = positions[text_filter(shown, query)[positions]]
+    return positions
+
+
+def column_ranges(frame, columns):
+    """{column: (min, max)} ignoring missing values, for the gradient colours."""
+    ranges = {}
+    for column in columns:
+        values = frame[column].to_numpy(dtype=float)
+        finite = values[~np.isnan(values)]
+        ranges[column] = (finite.min(), finite.max()) if len(finite) else (np.nan, np.nan)
+    return ranges
+
+
+def gradient_styles(values, low, high, cmap="RdYlGn"):
+    """CSS per value: background from `cmap` over [low, high] and a text
+    colour that stays readable on it; no style for NaN."""
+    values = np.asarray(values, dtype=float)
+    span = high - low
+    scaled = (values - low) / span if span > 0 else np.zeros_like(values)
+    missing = np.isnan(values)
+    rgba = matplotlib.colormaps[cmap](np.where(missing, 0.0, scaled))
+    # Relative luminance (WCAG) of each background
+    rgb = rgba[:, :3]
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    hexes = [matplotlib.colors.rgb2hex(color) for color in rgba]
+    return [
+        "" if blank else f"background-color: {color};color: {LIGHT_TEXT if dark else DARK_TEXT};"
+        for color, dark, blank in zip(hexes, luminance < TEXT_COLOR_THRESHOLD, missing)
+    ]
+
+
+def page_styler(window, formats=None, gradients=None, cmap="RdYlGn"):
+    """Styler of one page. `gradients` is {column: (low, high)}."""
+    styler = window.style
+    if formats:
+        styler = styler.format({column: fmt for column, fmt in formats.items() if column in window.columns})
+    for column, (low, high) in (gradients or {}).items():
+        styles = gradient_styles(window[column], low, high, cmap)
+        styler = styler.apply(lambda _, styles=styles: styles, subset=[column])
+    return styler
@@ -0,0 +1,136 @@
+"""Per-section timings for the dashboard.
+
+A `Trace` belongs to one session and groups its records by script run: a full
+rerun or a fragment rerun. `trace.section(name)` wraps a block, or a function
+when used as a decorator. For each section it records:
+
+- wall time
+- CPU time of the script thread (charts rendered in render_pool's workers
+  count only in wall time)
+- bytes allocated, while tracemalloc is tracing
+
+Allocation tracking slows every allocation in the process. It is therefore
+off unless PERF_TRACE_ALLOCATIONS=1 is set when the server starts. The
+numbers are process-wide, so other sessions' concurrent reruns show up in
+them.
+
+`json_lines()` renders the records as one JSON object per section. If
+PERF_TRACE_LOG names a file, every finished run is also appended to it, for a
+log pipeline to pick up.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Runs kept per session for the panel and the export
+MAX_RUNS = 50
+
+LOG_PATH = os.environ.get("PERF_TRACE_LOG")
+if os.environ.get("PERF_TRACE_ALLOCATIONS") == "1" and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_log_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, session=None):
+        self.session = session
+        self.runs = deque(maxlen=MAX_RUNS)
+        self._count = 0
+        self._run = None
+        self._open = []  # sections entered and not yet exited, outermost first
+
+    @property
+    def active(self):
+        """Whether a run is being recorded."""
+        return self._run is not None
+
+    def begin(self, kind, name=None):
+        """Start a run; sections recorded until `end` belong to it."""
+        self._count += 1
+        self._open.clear()
+        self._run = {
+            "run": self._count,
+            "kind": kind,
+            "name": name,
+            "started": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "wall_ms": None,
+            "sections": [],
+            "_start": time.perf_counter(),
+        }
+
+    def end(self):
+        run, self._run = self._run, None
+        if run is None:
+            return
+        run["wall_ms"] = (time.perf_counter() - run.pop("_start")) * 1000
+        self.runs.append(run)
+        if LOG_PATH:
+            lines = self.json_lines([run])
+            with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as log:
+                log.write(lines)
+
+    @contextmanager
+    def section(self, name):
+        """Time a block (`with trace.section(name):`) or a function (`@trace.section(name)`)."""
+        if self._run is None:
+            yield
+            return
+        parent = self._open[-1] if self._open else None
+        frame = {"name": f"{parent['name']}/{name}" if parent else name, "peak": 0}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            start_bytes, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            # reset_peak hides the enclosing section's peak so far; it keeps it
+            if parent:
+                parent["peak"] = max(parent["peak"], peak)
+        self._open.append(frame)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            record = {
+                "section": frame["name"],
+                "wall_ms": (time.perf_counter() - wall) * 1000,
+                "cpu_ms": (time.thread_time() - cpu) * 1000,
+                "alloc_bytes": None,
+                "peak_bytes": None,
+            }
+            if tracing and tracemalloc.is_tracing():
+                end_bytes, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["peak"])
+                record["alloc_bytes"] = end_bytes - start_bytes
+                record["peak_bytes"] = peak - start_bytes
+            if self._open and self._open[-1] is frame:
+                self._open.pop()
+                if parent and record["peak_bytes"] is not None:
+                    parent["peak"] = max(parent["peak"], record["peak_bytes"] + start_bytes)
+            if self._run is not None:
+                self._run["sections"].append(record)
+
+    def last(self, kind=None):
+        """The most recent finished run, optionally of one kind."""
+        for run in reversed(self.runs):
+            if kind is None or run["kind"] == kind:
+                return run
+        return None
+
+    def json_lines(self, runs=None):
+        lines = []
+        for run in self.runs if runs is None else runs:
+            for record in run["sections"]:
+                lines.append(json.dumps({
+                    "session": self.session,
+                    "run": run["run"],
+                    "kind": run["kind"],
+                    "name": run["name"],
+                    "started": run["started"],
+                    **record,
+                }) + "\n")
+        return "".join(lines)
@@ -0,0 +1,66 @@
+"""Pre-aggregated cube for the sector/stage rollups.
+
+A cube is a small DataFrame with one row per observed combination of its
+dimensions, holding the summed measures and a company count. It is built once
+per dataset version; every rollup, share and filtered total the dashboard
+shows is then answered by summing cube cells instead of regrouping the raw
+portfolio, so the cost no longer depends on the number of companies.
+"""
+REAL_DIMENSIONS = ["sector", "investment_stage", "country", "impact_lever"]
+REAL_MEASURES = ["funding_raised_m", "employees", "estimated_annual_tco2e_avoided_k"]
+
+SANDBOX_DIMENSIONS = ["Sector", "Stage", "Risk Rating"]
+SANDBOX_MEASURES = [
+    "Investment ($M)",
+    "IRR (%)",
+    "Payback Period (years)",
+    "Lifetime tCO2e Avoided (M)",
+    "Annual tCO2e Avoided (K)",
+]
+
+COUNT = "count"
+
+
+def build_cube(df, dimensions, measures):
+    """Sum `measures` and count rows for every observed combination of `dimensions`."""
+    cells = df.groupby(dimensions, observed=True, dropna=False).agg(
+        **{measure: (measure, "sum") for measure in measures},
+        **{COUNT: (dimensions[0], "size")},
+    )
+    return cells.reset_index()
+
+
+def _cell_mask(cells, where):
+    # `where` maps a dimension to one value or a list of values; "All" and
+    # empty selections leave that dimension unconstrained
+    mask = None
+    for dimension, value in (where or {}).items():
+        if value is None or value == "All":
+            continue
+        if isinstance(value, (list, tuple, set)):
+            if not value:
+                continue
+            selected = cells[dimension].isin(list(value))
+        else:
+            selected = cells[dimension] == value
+        mask = selected if mask is None else mask & selected
+    return mask
+
+
+def slice_cube(cells, where=None):
+    mask = _cell_mask(cells, where)
+    return cells if mask is None else cells[mask]
+
+
+def rollup(cells, by, measure, where=None):
+    """Total of `measure` per value of `by` (a dimension or list of them)."""
+    return slice_cube(cells, where).groupby(by, observed=True)[measure].sum()
+
+
+def total(cells, measure, where=None):
+    return slice_cube(cells, where)[measure].sum()
+
+
+def mean(cells, measure, where=None):
+    cells = slice_cube(cells, where)
+    return cells[measure].sum() / cells[COUNT].sum()
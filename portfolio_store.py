@@ -0,0 +1,237 @@
+"""Typed columnar store for the portfolio CSVs.
+
+Each CSV is parsed once with an explicit schema (categoricals for the label
+columns, fixed-width numerics for the measures) and written next to the data
+as an uncompressed Arrow IPC file. Later loads memory-map that file instead of
+re-parsing the CSV; the CSV is only converted again when its content changes.
+When rows were only appended, just the new tail is parsed and merged into the
+cached frame.
+"""
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas.api.types import union_categoricals
+
+CACHE_DIR = ".portfolio_cache"
+HASH_CHUNK_BYTES = 1 << 20
+
+# ---------- SCHEMAS ----------
+# Free-text columns (company names, notes, insights) stay as plain strings;
+# everything with a small set of repeated values is stored as a category.
+DATASETS = {
+    "real": {
+        "file": "galvanize_portfolio_live_corrected.csv",
+        "dtypes": {
+            "company": "str",
+            "sector": "category",
+            "subsector": "category",
+            "country": "category",
+            "impact_lever": "category",
+            "notes": "str",
+            "funding_raised_m": "float64",
+            "employees": "int32",
+            "year_founded": "int16",
+            "estimated_annual_tco2e_avoided_k": "float64",
+            "scale_indicator": "category",
+            "scale_value": "int64",
+            "investment_stage": "category",
+        },
+    },
+    "sandbox": {
+        "file": "galvanize_sandbox_portfolio.csv",
+        "dtypes": {
+            "Company": "str",
+            "Sector": "category",
+            "Investment ($M)": "float64",
+            "IRR (%)": "float64",
+            "Payback Period (years)": "float64",
+            "Risk Rating": "category",
+            "Lifetime tCO2e Avoided (M)": "float64",
+            "Annual tCO2e Avoided (K)": "float64",
+            "Stage": "category",
+        },
+    },
+    "thesis": {
+        "file": "investment_thesis_scores.csv",
+        "dtypes": {
+            "Company": "str",
+            "Sector": "category",
+            "Hardware+Software": "float64",
+            "Capital Efficiency": "float64",
+            "Data Markets": "float64",
+            "Total Score": "float64",
+            "Strategic Archetype": "category",
+            "Key Insight": "str",
+        },
+    },
+    # Yearly cash flows of the sandbox deals (see cashflows.py); optional,
+    # companies without rows keep their stored IRR and payback
+    "cashflows": {
+        "file": "galvanize_sandbox_cashflows.csv",
+        "optional": True,
+        "dtypes": {
+            "Company": "str",
+            "Year": "int16",
+            "Cash Flow ($M)": "float64",
+        },
+    },
+}
+
+_SOURCE_KEY = b"galvanize.source"
+
+
+def source_path(name, data_dir="."):
+    return os.path.join(data_dir, DATASETS[name]["file"])
+
+
+def cache_path(name, data_dir="."):
+    stem = os.path.splitext(DATASETS[name]["file"])[0]
+    return os.path.join(data_dir, CACHE_DIR, stem + ".arrow")
+
+
+def _hash_file(path, length=None):
+    # blake2b over the first `length` bytes (whole file by default); also
+    # reports whether those bytes end on a line break, which decides whether
+    # a later append can be parsed on its own
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = length
+    last = b""
+    with open(path, "rb") as fh:
+        while remaining is None or remaining > 0:
+            size = HASH_CHUNK_BYTES if remaining is None else min(HASH_CHUNK_BYTES, remaining)
+            chunk = fh.read(size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            last = chunk[-1:]
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest(), last == b"\n"
+
+
+# path -> ((size, mtime_ns), digest, ends_with_newline); keeps reruns to a stat()
+_digest_memo = {}
+
+
+def source_stamp(path):
+    """Size, mtime and content hash of a source CSV."""
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    memo = _digest_memo.get(path)
+    if memo is None or memo[0] != key:
+        digest, newline = _hash_file(path)
+        memo = (key, digest, newline)
+        _digest_memo[path] = memo
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": memo[1], "newline": memo[2]}
+
+
+def _missing_optional(name, path):
+    return DATASETS[name].get("optional", False) and not os.path.exists(path)
+
+
+def dataset_version(name, data_dir="."):
+    """Cache key for a dataset: changes whenever the CSV is touched or edited.
+    None for an optional dataset whose CSV doesn't exist."""
+    path = source_path(name, data_dir)
+    if _missing_optional(name, path):
+        return None
+    stamp = source_stamp(path)
+    return f"{stamp['mtime_ns']}-{stamp['digest']}"
+
+
+def _cached_stamp(path):
+    # Only the schema footer is read here, not the column data
+    try:
+        with pa.memory_map(path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = metadata.get(_SOURCE_KEY)
+    return json.loads(raw) if raw else None
+
+
+def read_typed_csv(name, path):
+    """Parse one of the portfolio CSVs with its declared column types."""
+    dtypes = DATASETS[name]["dtypes"]
+    if _missing_optional(name, path):
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()})
+    return pd.read_csv(path, dtype={col: dtype for col, dtype in dtypes.items() if dtype != "str"})
+
+
+def _write_cache(df, path, stamp):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCE_KEY] = json.dumps(stamp).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def _read_cache(path):
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def _is_append(path, previous, stamp):
+    # The old file must be an exact byte prefix of the new one and have ended
+    # on a complete line, otherwise the tail can't be parsed on its own
+    if not previous.get("newline") or stamp["size"] <= previous["size"]:
+        return False
+    digest, _ = _hash_file(path, previous["size"])
+    return digest == previous["digest"]
+
+
+def _append_tail(name, df, path, offset):
+    dtypes = DATASETS[name]["dtypes"]
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        tail = fh.read()
+    new_rows = pd.read_csv(
+        io.BytesIO(tail),
+        header=None,
+        names=list(df.columns),
+        dtype={col: dtype for col, dtype in dtypes.items() if dtype != "str"},
+    )
+    merged = pd.concat([df, new_rows], ignore_index=True)
+    # concat falls back to object when category sets differ; union keeps the
+    # existing codes and only adds the new labels
+    for col, dtype in dtypes.items():
+        if dtype == "category":
+            merged[col] = union_categoricals([df[col], new_rows[col]])
+    return merged
+
+
+def load_dataset(name, data_dir="."):
+    """Return the typed frame for `name`, converting the CSV only if it changed.
+    An optional dataset without a CSV is an empty frame."""
+    source = source_path(name, data_dir)
+    if _missing_optional(name, source):
+        return read_typed_csv(name, source)
+    cached = cache_path(name, data_dir)
+    stamp = source_stamp(source)
+    previous = _cached_stamp(cached)
+
+    if previous == stamp:
+        return _read_cache(cached)
+
+    if previous is not None and previous.get("digest") == stamp["digest"]:
+        # Touched but not edited: keep the converted data, refresh the stamp
+        df = _read_cache(cached)
+    elif previous is not None and _is_append(source, previous, stamp):
+        df = _append_tail(name, _read_cache(cached), source, previous["size"])
+    else:
+        df = read_typed_csv(name, source)
+
+    try:
+        _write_cache(df, cached, stamp)
+    except OSError:
+        # Read-only deployments still get the typed frame, just uncached
+        pass
+    return df
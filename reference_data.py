@@ -0,0 +1,170 @@
+"""Versioned reference data behind the Company Deep Dive.
+
+The sector benchmarks, the sector methodologies, the impact model drivers
+(see sensitivity.py) and the bespoke Impact Assessment Memos live as JSON
+under reference/, each file carrying a `version`. The tables are read and
+validated once per process on first use, and lookups are dict reads. A memo is stored one
+file per company (reference/memos/<slug>.json). Only the directory listing is
+read up front, and a memo's file is read and checked the first time that
+company is shown, so adding thousands of memos costs nothing at startup.
+
+Memo sections are str.format templates over the company's row and deep-dive
+bundle, e.g. "{estimated_annual_tco2e_avoided_k:.0f}K tons". Invalid files
+raise ValueError naming the file and the problem.
+"""
+import functools
+import json
+import os
+import re
+import string
+
+REFERENCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference")
+
+BENCHMARK_FIELDS = {"impact_per_employee": (int, float), "impact_per_funding": (int, float),
+                    "employees_per_company": (int, float), "description": str}
+METHODOLOGY_FIELDS = {"baseline": str, "framework": str, "data_quality": str, "description": str}
+MEMO_KEYS = ("problem", "solution", "counterfactual", "additionality",
+             "impact_estimate", "material_risks", "sensitivity", "recommendation")
+
+DRIVER_KINDS = ("factor", "baseline", "solution")
+
+MEMO_CACHE_SIZE = 1024
+
+
+def slug(company):
+    return re.sub(r"[^a-z0-9]+", "-", str(company).lower()).strip("-")
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise ValueError(f"{path}: {exc}") from exc
+
+
+def _check_entry(path, name, entry, fields):
+    if not isinstance(entry, dict):
+        raise ValueError(f"{path}: {name} is not an object")
+    for field, kind in fields.items():
+        value = entry.get(field)
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError(f"{path}: {name}.{field} is missing or not {kind}")
+        if kind != str and value <= 0:
+            raise ValueError(f"{path}: {name}.{field} must be positive")
+
+
+def _sector_table(filename, fields):
+    path = os.path.join(REFERENCE_DIR, filename)
+    data = _read(path)
+    if not isinstance(data.get("version"), str) or not isinstance(data.get("sectors"), dict):
+        raise ValueError(f"{path}: needs a version string and a sectors object")
+    _check_entry(path, "default", data.get("default"), fields)
+    for sector, entry in data["sectors"].items():
+        _check_entry(path, sector, entry, fields)
+    return data
+
+
+@functools.cache
+def _benchmarks():
+    return _sector_table("sector_benchmarks.json", BENCHMARK_FIELDS)
+
+
+@functools.cache
+def _methodologies():
+    return _sector_table("sector_methodologies.json", METHODOLOGY_FIELDS)
+
+
+def _check_model(path, name, model):
+    if not isinstance(model, dict) or not model:
+        raise ValueError(f"{path}: {name} is not a non-empty object")
+    for driver, entry in model.items():
+        where = f"{name}.{driver}"
+        if not isinstance(entry, dict) or not isinstance(entry.get("label"), str):
+            raise ValueError(f"{path}: {where} needs a label")
+        if entry.get("kind") not in DRIVER_KINDS:
+            raise ValueError(f"{path}: {where}.kind must be one of {DRIVER_KINDS}")
+        values = [entry.get(field) for field in ("low", "base", "high")]
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            raise ValueError(f"{path}: {where} needs numeric low, base and high")
+        if not values[0] <= values[1] <= values[2]:
+            raise ValueError(f"{path}: {where} needs low <= base <= high")
+    kinds = [entry["kind"] for entry in model.values()]
+    if kinds.count("baseline") != kinds.count("solution") or kinds.count("baseline") > 1:
+        raise ValueError(f"{path}: {name} needs at most one baseline and one solution driver, together")
+    if "baseline" in kinds:
+        baseline, solution = (next(entry for entry in model.values() if entry["kind"] == kind)
+                              for kind in ("baseline", "solution"))
+        if baseline["low"] <= solution["high"]:
+            raise ValueError(f"{path}: {name} baseline must stay above solution across their ranges")
+
+
+@functools.cache
+def _impact_models():
+    path = os.path.join(REFERENCE_DIR, "impact_models.json")
+    data = _read(path)
+    if not isinstance(data.get("version"), str) or not isinstance(data.get("sectors"), dict):
+        raise ValueError(f"{path}: needs a version string and a sectors object")
+    _check_model(path, "default", data.get("default"))
+    for sector, model in data["sectors"].items():
+        _check_model(path, sector, model)
+    return data
+
+
+@functools.cache
+def _memo_files():
+    directory = os.path.join(REFERENCE_DIR, "memos")
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return {}
+    return {name[:-len(".json")]: os.path.join(directory, name) for name in names if name.endswith(".json")}
+
+
+def sector_benchmarks():
+    """{sector: benchmark} and the default benchmark for sectors not listed."""
+    data = _benchmarks()
+    return data["sectors"], data["default"]
+
+
+def methodology_for(sector):
+    data = _methodologies()
+    return data["sectors"].get(sector, data["default"])
+
+
+def impact_models():
+    """{sector: {driver: {label, kind, low, base, high}}} and the default model."""
+    data = _impact_models()
+    return data["sectors"], data["default"]
+
+
+@functools.lru_cache(maxsize=MEMO_CACHE_SIZE)
+def memo_template(company):
+    """The bespoke memo templates for `company`, or None if it has none."""
+    path = _memo_files().get(slug(company))
+    if path is None:
+        return None
+    data = _read(path)
+    if data.get("company") != company:
+        return None  # a different company with the same slug
+    sections = data.get("sections")
+    if not isinstance(data.get("version"), str) or not isinstance(sections, dict):
+        raise ValueError(f"{path}: needs a version string and a sections object")
+    for key in MEMO_KEYS:
+        if not isinstance(sections.get(key), str):
+            raise ValueError(f"{path}: sections.{key} is missing or not a string")
+        try:
+            list(string.Formatter().parse(sections[key]))
+        except ValueError as exc:
+            raise ValueError(f"{path}: sections.{key}: {exc}") from exc
+    return {key: sections[key] for key in MEMO_KEYS}
+
+
+def versions():
+    """Version of each reference table, e.g. for a report footer or cache key."""
+    return {
+        "sector_benchmarks": _benchmarks()["version"],
+        "sector_methodologies": _methodologies()["version"],
+        "impact_models": _impact_models()["version"],
+        "memos": len(_memo_files()),
+    }
@@ -0,0 +1,70 @@
+"""Worker processes for rendering matplotlib charts.
+
+Agg rasterization is CPU-bound and holds the GIL, so charts rendered on the
+script thread run one after another. `submit` hands a chart builder and its
+inputs to a process pool and returns a Future of the PNG bytes, so a rerun
+that needs several charts waits for the slowest one rather than for all of
+them in turn. Workers are spawned rather than forked (the Streamlit server is
+multi-threaded) and build their figures from their own figure_pool.
+
+With a single core, or if the pool cannot start, charts are rendered on the
+calling thread and the Future is returned already resolved.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import charts
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def render(build, inputs, params):
+    """PNG bytes of `build(*inputs, **params)`; what each worker runs."""
+    return charts.render_png(build(*inputs, **params))
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None and MAX_WORKERS > 1:
+            try:
+                _executor = ProcessPoolExecutor(MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError):
+                return None
+        return _executor
+
+
+def reset():
+    """Drop the pool (e.g. after a worker died); the next submit starts a new one."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _inline(build, inputs, params):
+    future = Future()
+    try:
+        future.set_result(render(build, inputs, params))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def submit(build, *inputs, **params):
+    """Future of the PNG bytes of `build(*inputs, **params)`."""
+    executor = _pool()
+    if executor is None:
+        return _inline(build, inputs, params)
+    try:
+        return executor.submit(render, build, inputs, params)
+    except (BrokenProcessPool, RuntimeError):
+        reset()
+        return _inline(build, inputs, params)
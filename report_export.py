@@ -0,0 +1,206 @@
+"""Batch export of per-company impact reports.
+
+    python report_export.py --out reports                 # every company in the real portfolio
+    python report_export.py --data bench_data/1000 --out reports --workers 8 --no-charts
+
+Each report is one self-contained HTML file holding what the dashboard's
+Company Deep Dive shows: key metrics, comparative efficiency, sector
+benchmarking, methodology and the Impact Assessment Memo, with the two
+comparison charts embedded as PNGs. The parent loads the portfolio and
+builds the bundles once, then hands worker processes chunks of CHUNK_SIZE
+companies with just their rows and bundle values; the workers render and
+write them straight to disk. Worker memory therefore doesn't grow with the
+portfolio or the number of workers, and the parent only appends a line per
+finished report to index.html.
+
+Averages are over the whole portfolio, as in the unfiltered dashboard.
+"""
+import argparse
+import base64
+import html
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import charts
+import company_bundles
+import derived_metrics
+import impact_memo
+import reference_data
+from portfolio_store import load_dataset
+
+CHUNK_SIZE = 32
+
+_CSS = """
+body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; color: #111827; max-width: 960px; margin: 40px auto; padding: 0 24px; line-height: 1.5; }
+h1 { margin-bottom: 4px; } h2 { margin-top: 40px; border-bottom: 1px solid #E5E7EB; padding-bottom: 6px; }
+.muted { color: #6B7280; }
+table { border-collapse: collapse; width: 100%; margin: 12px 0; }
+th, td { text-align: left; padding: 6px 10px; border-bottom: 1px solid #E5E7EB; }
+th { background: #F9FAFB; }
+img { width: 100%; margin: 12px 0; }
+.rating { padding: 12px 16px; border-radius: 8px; background: #F3F4F6; }
+.rating.success { background: #ECFDF5; } .rating.info { background: #EFF6FF; } .rating.warning { background: #FFFBEB; }
+.memo { padding: 8px 24px; background: #F8F9FA; border-left: 4px solid #2563EB; border-radius: 8px; }
+"""
+_PAGE = '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>{title}</title><style>{css}</style></head>\n<body>\n{body}\n</body></html>\n'
+
+# index.html is written a line at a time as reports finish
+_INDEX_HEAD = '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>Impact reports</title><style>{css}</style></head>\n<body>\n<h1>Impact reports</h1>\n<ul>\n'
+_INDEX_TAIL = "</ul>\n</body></html>\n"
+
+# Set in each worker by _init_worker
+_worker = {}
+
+
+def _text(value):
+    # Escape, then render the **bold** markup the dashboard's text uses
+    return re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", html.escape(str(value)))
+
+
+def _table(header, rows):
+    head = "".join(f"<th>{_text(cell)}</th>" for cell in header)
+    body = "".join("<tr>" + "".join(f"<td>{_text(cell)}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def _png(fig):
+    return f'<img alt="" src="data:image/png;base64,{base64.b64encode(charts.render_png(fig)).decode()}">'
+
+
+def _vs(value, average):
+    return f"{(value / average - 1) * 100:+.0f}%"
+
+
+def report_html(bundle, with_charts=True):
+    company_data = bundle["company_data"]
+    benchmark = bundle["benchmark"]
+    methodology = impact_memo.methodology_for(company_data["sector"])
+    memo = impact_memo.decision_memo(bundle)
+    parts = [
+        f"<h1>{_text(company_data['company'])}</h1>",
+        f"<p><strong>{_text(company_data['notes'])}</strong></p>",
+        f"<p class=\"muted\">{_text(company_data['sector'])} · {_text(company_data['subsector'])} · "
+        f"{_text(company_data['country'])} · {_text(company_data['impact_lever'])}</p>",
+        _table(["Funding Raised", "Employees", "Founded", "Stage", "Annual Impact", company_data["scale_indicator"]], [[
+            f"${company_data['funding_raised_m']:.0f}M", f"{company_data['employees']:,}",
+            int(company_data["year_founded"]), company_data["investment_stage"],
+            f"{company_data['estimated_annual_tco2e_avoided_k']:.0f}K tCO₂e", f"{company_data['scale_value']:,}",
+        ]]),
+        "<h2>Comparative Efficiency Metrics</h2>",
+        _table(["Metric", "Company", "Portfolio avg", "vs portfolio"], [
+            ["Impact per Employee", f"{bundle['impact_per_employee']:.1f} tCO₂e",
+             f"{bundle['avg_impact_per_employee']:.1f} tCO₂e",
+             _vs(bundle["impact_per_employee"], bundle["avg_impact_per_employee"])],
+            ["Impact per $1M Funding", f"{bundle['impact_per_funding']:.1f}K tCO₂e",
+             f"{bundle['avg_impact_per_funding']:.1f}K tCO₂e",
+             _vs(bundle["impact_per_funding"], bundle["avg_impact_per_funding"])],
+            ["Funding per Employee", f"${bundle['funding_per_employee']:.2f}M",
+             f"${bundle['avg_funding_per_employee']:.2f}M",
+             _vs(bundle["funding_per_employee"], bundle["avg_funding_per_employee"])],
+        ]),
+    ]
+    if with_charts:
+        parts.append(_png(charts.company_vs_portfolio(bundle)))
+    parts += [
+        "<h2>Sector Benchmarking Analysis</h2>",
+        f"<p><strong>Industry Benchmark:</strong> {_text(benchmark['description'])}</p>",
+        _table(["Metric", "Company", "Industry avg", "vs industry"], [
+            ["Impact per Employee", f"{bundle['impact_per_employee']:.1f} tCO₂e",
+             f"{benchmark['impact_per_employee']} tCO₂e", f"{bundle['impact_emp_vs_industry']:+.0f}%"],
+            ["Impact per $1M Funding", f"{bundle['impact_per_funding']:.1f}K tCO₂e",
+             f"{benchmark['impact_per_funding']}K tCO₂e", f"{bundle['impact_fund_vs_industry']:+.0f}%"],
+            ["Team Size", f"{company_data['employees']:,}",
+             benchmark["employees_per_company"], f"{bundle['team_size_vs_industry']:+.0f}%"],
+        ]),
+    ]
+    if with_charts:
+        parts.append(_png(charts.company_vs_industry(bundle, benchmark, bundle["performance_index"])))
+    parts += [
+        f"<p class=\"rating {bundle['rating_alert']}\"><strong>Sector Performance Rating:</strong> {_text(bundle['rating'])}</p>",
+        "<h2>Impact Measurement Methodology</h2>",
+        _table(["", ""], [
+            ["Baseline Comparison", methodology["baseline"]],
+            ["Framework Applied", methodology["framework"]],
+            ["Data Quality Tier", methodology["data_quality"]],
+            ["Approach", methodology["description"]],
+        ]),
+        "<h2>Impact Assessment Memo</h2>",
+        '<div class="memo">',
+        *(f"<h3>{_text(heading)}</h3><p>{_text(memo[key])}</p>" for key, heading in impact_memo.MEMO_SECTIONS),
+        "</div>",
+    ]
+    return _PAGE.format(title=_text(company_data["company"]), css=_CSS, body="\n".join(parts))
+
+
+def _init_worker(out_dir, with_charts, width):
+    _worker.update(out_dir=out_dir, with_charts=with_charts, width=width)
+
+
+def _write_reports(bundles, start):
+    """Write the reports of `bundles` (a bundles_slice from position `start`);
+    returns (file, company, rating) per report."""
+    written = []
+    for offset in range(len(bundles["names"])):
+        bundle = company_bundles.bundle_at(bundles, offset)
+        company = bundle["company_data"]["company"]
+        filename = f"{start + offset:0{_worker['width']}d}-{reference_data.slug(company)[:60] or 'company'}.html"
+        with open(os.path.join(_worker["out_dir"], filename), "w", encoding="utf-8") as fh:
+            fh.write(report_html(bundle, _worker["with_charts"]))
+        written.append((filename, str(company), bundle["rating"]))
+    return written
+
+
+def export(data_dir, out_dir, workers, with_charts=True, limit=None, chunk_size=CHUNK_SIZE):
+    os.makedirs(out_dir, exist_ok=True)
+    real_df = load_dataset("real", data_dir)
+    bundles = company_bundles.build_company_bundles(real_df, derived_metrics.build_real_metrics(real_df))
+    total = len(real_df) if limit is None else min(len(real_df), limit)
+    chunks = ((start, min(start + chunk_size, total)) for start in range(0, total, chunk_size))
+    done = 0
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as index, ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(out_dir, with_charts, len(str(len(real_df)))),
+    ) as pool:
+        index.write(_INDEX_HEAD.format(css=_CSS))
+        # A bounded window of chunks in flight, so pending results never pile up
+        pending = set()
+        while True:
+            while len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                start, stop = chunk
+                pending.add(pool.submit(_write_reports, company_bundles.bundles_slice(bundles, start, stop), start))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for filename, company, rating in future.result():
+                    index.write(f'<li><a href="{html.escape(filename)}">{_text(company)}</a> — {_text(rating)}</li>\n')
+                    done += 1
+            index.flush()
+            print(f"\r{done:,}/{total:,} reports", end="", flush=True)
+        index.write(_INDEX_TAIL)
+    print()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=".", help="directory holding the portfolio CSVs")
+    parser.add_argument("--out", default="reports", help="directory the reports are written to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--limit", type=int, help="only the first N companies")
+    parser.add_argument("--no-charts", action="store_true", help="leave out the comparison charts (much faster)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    done = export(args.data, args.out, args.workers, with_charts=not args.no_charts, limit=args.limit)
+    print(f"wrote {done:,} reports to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
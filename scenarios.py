@@ -0,0 +1,189 @@
+"""Monte Carlo scenarios for the Sandbox portfolio.
+
+Each company's stored IRR, payback period and lifetime impact are treated as
+the base case. Every scenario draws one performance shock per company:
+
+- a lognormal multiplier with mean 1 and a spread set by the company's Risk
+  Rating, applied to IRR (and inversely to the payback period)
+- a correlated shock, with the same spread, on lifetime impact
+- a failure with a probability set by the company's Stage, in which case
+  FAILURE_RECOVERY of the capital comes back after FAILURE_YEARS, the
+  investment is never paid back and only FAILURE_IMPACT_SHARE of the impact
+  is delivered
+
+The spreads and failure rates below are illustrative assumptions, not fitted
+to data. All companies and scenarios of a chunk are one (companies, draws)
+array operation. Chunks are fixed blocks of companies, each with its own
+random stream derived from the seed. The same seed therefore gives the same
+results however many workers `simulate` uses. The worker processes are one
+long-lived pool per process, as in render_pool, so a run doesn't pay for
+starting interpreters.
+
+A run is capped at MAX_CELLS companies x draws: a large book gets fewer draws
+per company (`draws_for`), down to MIN_DRAWS, so the time of a run grows with
+the number of companies only.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DRAWS = 100_000
+# Companies x draws of one run; past it each company gets fewer draws
+MAX_CELLS = 20_000_000
+# Fewest draws per company, however large the book
+MIN_DRAWS = 100
+# Companies x draws per chunk, which bounds the memory of one chunk
+CHUNK_CELLS = 2_000_000
+PERCENTILES = (10, 50, 90)
+
+# Lognormal sigma of the performance multiplier
+RISK_VOLATILITY = {'Low': 0.20, 'Medium': 0.30, 'Medium-High': 0.40, 'High': 0.55}
+# Probability that the investment fails
+STAGE_FAILURE = {'Early': 0.30, 'Growth': 0.15, 'Late': 0.08, 'Mature': 0.05}
+DEFAULT_VOLATILITY = 0.35
+DEFAULT_FAILURE = 0.20
+# Correlation between the IRR and impact shocks
+IMPACT_CORRELATION = 0.5
+FAILURE_RECOVERY = 0.25
+FAILURE_YEARS = 5
+FAILURE_IMPACT_SHARE = 0.1
+
+METRICS = ("irr", "payback", "impact")
+
+_executor = None
+_executor_workers = 0
+_lock = threading.Lock()
+
+
+def _lookup(column, table, default):
+    column = column.astype("category")
+    values = np.array([table.get(str(value), default) for value in column.cat.categories] + [default])
+    return values[column.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing default
+
+
+def scenario_inputs(sandbox_df):
+    """The per-company arrays the simulation reads."""
+    return {
+        "investment": sandbox_df["Investment ($M)"].to_numpy(dtype=float),
+        "irr": sandbox_df["IRR (%)"].to_numpy(dtype=float),
+        "payback": sandbox_df["Payback Period (years)"].to_numpy(dtype=float),
+        "impact": sandbox_df["Lifetime tCO2e Avoided (M)"].to_numpy(dtype=float),
+        "volatility": _lookup(sandbox_df["Risk Rating"], RISK_VOLATILITY, DEFAULT_VOLATILITY),
+        "failure": _lookup(sandbox_df["Stage"], STAGE_FAILURE, DEFAULT_FAILURE),
+    }
+
+
+def simulate_chunk(inputs, draws, seed, chunk):
+    """Scenarios for one chunk of companies (arrays of equal length in
+    `inputs`). Returns their percentiles and loss probability, and the
+    chunk's per-draw investment-weighted IRR and impact sums."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    rows = len(inputs["irr"])
+    sigma = inputs["volatility"][:, None]
+    performance = rng.standard_normal((rows, draws))
+    idiosyncratic = rng.standard_normal((rows, draws))
+    failed = rng.random((rows, draws)) < inputs["failure"][:, None]
+
+    multiplier = np.exp(sigma * performance - sigma ** 2 / 2)
+    impact_shock = IMPACT_CORRELATION * performance + np.sqrt(1 - IMPACT_CORRELATION ** 2) * idiosyncratic
+    failure_irr = (FAILURE_RECOVERY ** (1 / FAILURE_YEARS) - 1) * 100
+    outcomes = {
+        "irr": np.where(failed, failure_irr, inputs["irr"][:, None] * multiplier),
+        "payback": np.where(failed, np.inf, inputs["payback"][:, None] / multiplier),
+        "impact": inputs["impact"][:, None] * np.where(
+            failed, FAILURE_IMPACT_SHARE, np.exp(sigma * impact_shock - sigma ** 2 / 2)
+        ),
+    }
+    # inverted_cdf picks observed values, so an infinite payback never gets
+    # interpolated into a NaN
+    bands = {
+        metric: np.percentile(values, PERCENTILES, axis=1, method="inverted_cdf")
+        for metric, values in outcomes.items()
+    }
+    return {
+        "bands": bands,
+        "loss_probability": failed.mean(axis=1),
+        "weighted_irr": inputs["investment"] @ outcomes["irr"],
+        "impact": outcomes["impact"].sum(axis=0),
+    }
+
+
+def draws_for(companies, draws=DEFAULT_DRAWS):
+    """The draws per company a run of `companies` makes when `draws` are
+    asked for: at most MAX_CELLS in total, but at least MIN_DRAWS each."""
+    return int(min(draws, max(MIN_DRAWS, MAX_CELLS // max(companies, 1))))
+
+
+def _chunks(rows, draws):
+    size = max(1, CHUNK_CELLS // draws)
+    return [(start, min(start + size, rows)) for start in range(0, rows, size)]
+
+
+def _pool(workers):
+    global _executor, _executor_workers
+    with _lock:
+        if _executor is not None and _executor_workers != workers:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _executor is None:
+            try:
+                _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError):
+                return None
+            _executor_workers = workers
+        return _executor
+
+
+def reset():
+    """Drop the pool (e.g. after a worker died); the next run starts a new one."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(jobs, workers):
+    if workers > 1 and len(jobs) > 1:
+        executor = _pool(workers)
+        if executor is not None:
+            try:
+                return list(executor.map(simulate_chunk, *zip(*jobs)))
+            except (BrokenProcessPool, RuntimeError):
+                reset()
+    return [simulate_chunk(*job) for job in jobs]
+
+
+def simulate(sandbox_df, draws=DEFAULT_DRAWS, seed=0, workers=1):
+    """P10/P50/P90 of IRR, payback and impact per company (a frame aligned
+    with `sandbox_df`) and for the whole portfolio (a frame indexed by
+    percentile), and the draws per company made (see `draws_for`)."""
+    draws = draws_for(len(sandbox_df), draws)
+    inputs = scenario_inputs(sandbox_df)
+    chunks = _chunks(len(sandbox_df), draws)
+    jobs = [
+        ({name: values[start:stop] for name, values in inputs.items()}, draws, seed, number)
+        for number, (start, stop) in enumerate(chunks)
+    ]
+    results = _run(jobs, workers)
+
+    columns = {}
+    for metric in METRICS:
+        bands = np.concatenate([result["bands"][metric] for result in results], axis=1)
+        for percentile, values in zip(PERCENTILES, bands):
+            columns[f"{metric}_p{percentile}"] = values
+    columns["loss_probability"] = np.concatenate([result["loss_probability"] for result in results])
+    companies = pd.DataFrame(columns, index=sandbox_df.index)
+
+    total_investment = inputs["investment"].sum()
+    weighted_irr = sum(result["weighted_irr"] for result in results)
+    impact = sum(result["impact"] for result in results)
+    portfolio = pd.DataFrame({
+        "blended_irr": np.percentile(weighted_irr / total_investment, PERCENTILES),
+        "total_impact": np.percentile(impact, PERCENTILES),
+    }, index=[f"P{percentile}" for percentile in PERCENTILES])
+    return {"companies": companies, "portfolio": portfolio, "draws": draws}
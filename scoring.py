@@ -0,0 +1,63 @@
+"""Synthetic financial performance score for the materiality matrix.
+
+We don't have real IRR data for the real portfolio, so financial performance
+is a proxy: a weighted blend of stage maturity, funding per employee and a
+sector multiplier. The weights and both lookup tables are parameters, and the
+score is computed by one NumPy kernel over the whole portfolio, so re-scoring
+1M companies after a weight change is a few array operations. The app caches
+the result per (data version, weights).
+"""
+import numpy as np
+import pandas as pd
+
+# Share of the 0-100 score each component contributes
+DEFAULT_WEIGHTS = {"stage": 0.4, "funding_efficiency": 0.3, "sector": 0.3}
+
+STAGE_SCORES = {'Early': 30, 'Growth': 70, 'Late': 90, 'Mature': 90}
+# Sector performance multipliers (based on typical VC returns)
+SECTOR_MULTIPLIERS = {'Energy': 0.9, 'Software': 1.2, 'Agriculture': 0.85, 'Industry': 0.95, 'Transportation': 0.88}
+
+
+def normalize_weights(weights):
+    """Scale `weights` to sum to 1 so the score stays on a 0-100 scale."""
+    total = sum(weights.values())
+    if total <= 0:
+        return dict(DEFAULT_WEIGHTS)
+    return {component: weight / total for component, weight in weights.items()}
+
+
+def _lookup(column, table):
+    # Map through the category codes, so the table is consulted once per
+    # distinct value rather than once per company
+    column = column.astype("category")
+    values = np.array([table.get(str(value), np.nan) for value in column.cat.categories] + [np.nan])
+    return values[column.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing NaN
+
+
+def financial_performance(stage_score, funding_per_employee, sector_multiplier, weights):
+    """The scoring kernel: plain arrays in, 0-100 scores out."""
+    # Normalize funding per employee to 0-100 scale
+    funding_efficiency_score = funding_per_employee / np.nanmax(funding_per_employee) * 100
+    score = (
+        stage_score * weights["stage"] +
+        funding_efficiency_score * weights["funding_efficiency"] +
+        sector_multiplier * 100 * weights["sector"]
+    )
+    return funding_efficiency_score, score
+
+
+def score_portfolio(real_df, real_metrics, weights=None, stage_scores=None, sector_multipliers=None):
+    """Score every company; returns a frame aligned with `real_df`."""
+    weights = normalize_weights(weights or DEFAULT_WEIGHTS)
+    stage_score = _lookup(real_df["investment_stage"], stage_scores or STAGE_SCORES)
+    sector_multiplier = _lookup(real_df["sector"], sector_multipliers or SECTOR_MULTIPLIERS)
+    funding_per_employee = real_metrics["funding_per_employee"].to_numpy(dtype=float)
+    funding_efficiency_score, score = financial_performance(
+        stage_score, funding_per_employee, sector_multiplier, weights
+    )
+    return pd.DataFrame({
+        "stage_score": stage_score,
+        "funding_efficiency_score": funding_efficiency_score,
+        "sector_multiplier": sector_multiplier,
+        "financial_performance": score,
+    }, index=real_df.index)
@@ -0,0 +1,224 @@
+"""Inverted text index for the company search box.
+
+Company names, notes, subsectors and the thesis "Key Insight" text are
+tokenized once per dataset version into a sorted vocabulary and CSR posting
+lists (token -> row positions, with a per-field weight). Queries resolve each
+term against the vocabulary instead of scanning every row:
+
+- exact and prefix matches come from a binary search on the sorted vocabulary,
+- substring matches (the old ``str.contains`` behaviour) from a trigram index
+  over the vocabulary,
+- typos from the same trigram index plus a bounded edit-distance check.
+
+Every query term must match (AND); rows are ranked by the summed weight of
+their best match per term.
+"""
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = r"[0-9a-z]+"
+
+# How much a hit in each field counts towards a row's rank
+FIELD_WEIGHTS = {"company": 3.0, "subsector": 1.5, "notes": 1.0, "insight": 0.5}
+
+# How much each kind of term match counts
+EXACT, PREFIX, INFIX, FUZZY = 1.0, 0.8, 0.6, 0.4
+
+MAX_FUZZY_CANDIDATES = 64
+
+
+def _tokenize(text):
+    return pd.Series([text]).str.lower().str.findall(TOKEN_PATTERN).iloc[0]
+
+
+def _field_tokens(values):
+    # Tokenize each distinct value once: returns every row's value code, the
+    # flattened tokens of the distinct values and how many tokens each has
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna("").astype(str), sort=False)
+    unique_tokens = pd.Series(uniques, dtype=object).str.lower().str.findall(TOKEN_PATTERN)
+    lengths = unique_tokens.str.len().to_numpy(dtype=np.int64)
+    flat = np.array([token for tokens in unique_tokens for token in tokens], dtype=str)
+    return codes, flat, lengths
+
+
+def _expand(codes, token_ids, lengths):
+    # CSR expansion of per-value token ids back to (row position, token id)
+    starts = np.cumsum(lengths) - lengths
+    row_lengths = lengths[codes]
+    rows = np.repeat(np.arange(len(codes)), row_lengths)
+    offsets = np.arange(row_lengths.sum()) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    return rows, token_ids[np.repeat(starts[codes], row_lengths) + offsets]
+
+
+def _trigram_index(vocab):
+    # vocabulary token id -> trigrams, inverted to trigram -> sorted token ids
+    series = pd.Series(vocab)
+    lengths = series.str.len().to_numpy()
+    grams, ids = [], []
+    for start in range(int(lengths.max(initial=0)) - 2):
+        has = np.flatnonzero(lengths >= start + 3)
+        grams.append(series.iloc[has].str.slice(start, start + 3).to_numpy())
+        ids.append(has)
+    if not grams:
+        return {}, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    pairs = pd.DataFrame({"gram": np.concatenate(grams), "id": np.concatenate(ids)}).drop_duplicates()
+    codes, uniques = pd.factorize(pairs["gram"], sort=True)
+    order = np.lexsort((pairs["id"].to_numpy(), codes))
+    indptr = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {gram: i for i, gram in enumerate(uniques)}, indptr, pairs["id"].to_numpy()[order].astype(np.int32)
+
+
+def build_search_index(real_df, thesis_df=None):
+    """Index the searchable text of `real_df` (row positions are the doc ids)."""
+    fields = {
+        "company": real_df["company"],
+        "subsector": real_df["subsector"],
+        "notes": real_df["notes"],
+    }
+    if thesis_df is not None:
+        insights = thesis_df.drop_duplicates("Company").set_index("Company")["Key Insight"]
+        fields["insight"] = insights.reindex(real_df["company"].to_numpy())
+
+    # Heaviest field first, so the first posting kept per (token, row) below
+    # carries that row's best field weight
+    fields = dict(sorted(fields.items(), key=lambda item: -FIELD_WEIGHTS[item[0]]))
+    tokenized = {field: _field_tokens(values.to_numpy()) for field, values in fields.items()}
+    vocab = np.unique(np.concatenate([flat for _, flat, _ in tokenized.values()]))
+
+    n_rows = len(real_df)
+    stride = max(n_rows, 1)
+    keys, weights = [], []
+    for field, (codes, flat, lengths) in tokenized.items():
+        rows, token_ids = _expand(codes, np.searchsorted(vocab, flat), lengths)
+        keys.append(token_ids.astype(np.int64) * stride + rows)
+        weights.append(np.full(len(rows), FIELD_WEIGHTS[field], dtype=np.float32))
+    keys, first = np.unique(np.concatenate(keys), return_index=True)
+    weights = np.concatenate(weights)[first]
+
+    gram_lookup, gram_indptr, gram_ids = _trigram_index(vocab)
+    return {
+        "n_rows": n_rows,
+        "vocab": vocab,
+        "indptr": np.searchsorted(keys // stride, np.arange(len(vocab) + 1)),
+        "rows": (keys % stride).astype(np.int32),
+        "weights": weights,
+        "gram_lookup": gram_lookup,
+        "gram_indptr": gram_indptr,
+        "gram_ids": gram_ids,
+    }
+
+
+def _edit_distance(a, b, limit):
+    # Levenshtein with an early exit once every cell in a row exceeds `limit`
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _gram_candidates(index, term):
+    grams = {term[i:i + 3] for i in range(len(term) - 2)}
+    lists = [index["gram_ids"][index["gram_indptr"][code]:index["gram_indptr"][code + 1]]
+             for code in (index["gram_lookup"].get(gram) for gram in grams) if code is not None]
+    return grams, lists
+
+
+def _term_tokens(index, term):
+    """Vocabulary ids matching `term` and the match quality of each."""
+    vocab = index["vocab"]
+    lo = np.searchsorted(vocab, term, side="left")
+    hi = np.searchsorted(vocab, term + "\U0010ffff", side="left")
+    ids = list(range(lo, hi))
+    scores = [EXACT if vocab[i] == term else PREFIX for i in ids]
+
+    if len(term) >= 3:
+        grams, lists = _gram_candidates(index, term)
+        if len(lists) == len(grams):
+            candidates = lists[0]
+            for other in lists[1:]:
+                candidates = np.intersect1d(candidates, other, assume_unique=True)
+            for i in candidates:
+                if not lo <= i < hi and term in vocab[i]:
+                    ids.append(int(i))
+                    scores.append(INFIX)
+
+        if not ids and len(term) >= 4 and lists:
+            # Nothing matched literally: fall back to near-miss spellings
+            limit = 1 if len(term) <= 6 else 2
+            counts = np.bincount(np.concatenate(lists))
+            needed = max(1, len(grams) - 3 * limit)
+            candidates = np.flatnonzero(counts >= needed)
+            candidates = candidates[np.argsort(-counts[candidates], kind="stable")][:MAX_FUZZY_CANDIDATES]
+            for i in candidates:
+                distance = _edit_distance(term, vocab[i], limit)
+                if distance <= limit:
+                    ids.append(int(i))
+                    scores.append(FUZZY * (1 - distance / (len(term) + 1)))
+    return ids, scores
+
+
+def _postings(index, token_id):
+    start, stop = index["indptr"][token_id], index["indptr"][token_id + 1]
+    return index["rows"][start:stop], index["weights"][start:stop]
+
+
+def _term_scores(index, token_ids, qualities):
+    # Sorted rows holding any of a term's tokens, with each row's best match
+    if len(token_ids) == 1:
+        rows, weights = _postings(index, token_ids[0])
+        return rows, weights * qualities[0]
+    postings = [_postings(index, token_id) for token_id in token_ids]
+    # One sort of (row, score) keys: the bits of a positive float32 order as
+    # the float does, so each row's last key holds its best score
+    keys = np.concatenate([
+        rows.astype(np.int64) << 32 | (weights * quality).view(np.uint32)
+        for (rows, weights), quality in zip(postings, qualities)
+    ])
+    keys.sort()
+    last = np.flatnonzero(np.concatenate((keys[1:] >> 32 != keys[:-1] >> 32, [True])))
+    keys = keys[last]
+    return (keys >> 32).astype(np.int32), (keys & 0xFFFFFFFF).astype(np.uint32).view(np.float32)
+
+
+def search(index, query):
+    """Row positions matching every term of `query`, best matches first."""
+    terms = list(dict.fromkeys(_tokenize(query)))
+    if not terms:
+        return np.arange(index["n_rows"])
+
+    matches = [_term_tokens(index, term) for term in terms]
+    if not all(token_ids for token_ids, _ in matches):
+        return np.zeros(0, dtype=np.int64)
+
+    # Every result must contain the rarest term, so only its rows are scored;
+    # nothing below scans all n_rows
+    scored = [_term_scores(index, token_ids, qualities) for token_ids, qualities in matches]
+    candidates = min((rows for rows, _ in scored), key=len)
+
+    total = np.zeros(len(candidates), dtype=np.float32)
+    keep = np.ones(len(candidates), dtype=bool)
+    for rows, scores in scored:
+        if rows is candidates:
+            total += scores
+            continue
+        # Each candidate's score for the term; 0 where it lacks the term
+        positions = np.searchsorted(rows, candidates)
+        found = positions < len(rows)
+        found[found] = rows[positions[found]] == candidates[found]
+        score = np.zeros(len(candidates), dtype=np.float32)
+        score[found] = scores[positions[found]]
+        keep &= found
+        total += score
+
+    rows, total = candidates[keep], total[keep]
+    # Ranks only need a few significant digits; a 16-bit key lets numpy use
+    # its radix sort, which keeps broad queries cheap at 1M rows
+    rank = np.minimum(total * 1000, np.iinfo(np.uint16).max).astype(np.uint16)
+    return rows[np.argsort(np.iinfo(np.uint16).max - rank, kind="stable")]
@@ -0,0 +1,122 @@
+"""One-at-a-time sensitivity of each company's impact estimate.
+
+Each sector has an impact model in reference/impact_models.json: annual
+tCO2e avoided is proportional to the product of its `factor` drivers, times
+(baseline - solution) emission intensity where the sector displaces an
+emitting alternative. A company's model is scaled so its base case equals
+the company's reported estimate. Each driver is then moved to its low and its
+high value with the others held at base, and the impact re-evaluated.
+
+All companies and all perturbations are one batched evaluation: an input
+array of shape (companies, 1 + 2 * drivers, drivers) whose rows are the base
+case and each low/high perturbation. Sectors with fewer drivers are padded
+with neutral ones that never move. `build_sensitivity` runs it for the whole
+portfolio, the app caches the result per data and model version, and
+`company_tornado` reads one company's drivers from it ranked by swing.
+"""
+import numpy as np
+import pandas as pd
+
+import reference_data
+
+# Companies evaluated per batch, which bounds the size of the input array
+CHUNK_ROWS = 100_000
+
+_KINDS = {"factor": 0, "baseline": 1, "solution": 2}
+
+
+def _model_arrays(models, width):
+    # (models, width) arrays of low/base/high and kind codes, padded with
+    # neutral factors of 1
+    shape = (len(models), width)
+    values = {field: np.ones(shape) for field in ("low", "base", "high")}
+    kinds = np.zeros(shape, dtype=np.int8)
+    active = np.zeros(shape, dtype=bool)
+    for row, model in enumerate(models):
+        for slot, entry in enumerate(model.values()):
+            for field in values:
+                values[field][row, slot] = entry[field]
+            kinds[row, slot] = _KINDS[entry["kind"]]
+            active[row, slot] = True
+    return values, kinds, active
+
+
+def evaluate(inputs, kinds):
+    """Relative impact of each input row: the product of the factor drivers
+    times (baseline - solution) when the model has that pair.
+
+    `inputs` is (..., drivers); `kinds` broadcasts against it."""
+    factors = np.prod(np.where(kinds == _KINDS["factor"], inputs, 1.0), axis=-1)
+    baseline = np.where(kinds == _KINDS["baseline"], inputs, 0.0).sum(axis=-1)
+    solution = np.where(kinds == _KINDS["solution"], inputs, 0.0).sum(axis=-1)
+    displaces = (kinds == _KINDS["baseline"]).any(axis=-1)
+    return factors * np.where(displaces, baseline - solution, 1.0)
+
+
+def _perturb(base, low, high):
+    # (rows, 1 + 2 * width, width): the base case, then each driver at its
+    # low value, then each at its high value
+    rows, width = base.shape
+    inputs = np.repeat(base[:, None, :], 1 + 2 * width, axis=1)
+    slots = np.arange(width)
+    inputs[:, 1 + slots, slots] = low
+    inputs[:, 1 + width + slots, slots] = high
+    return inputs
+
+
+def build_sensitivity(real_df):
+    """Low/high impact (K tCO2e) for every company and driver."""
+    sector_models, default = reference_data.impact_models()
+    sector = real_df["sector"].astype("category")
+    names = [str(value) for value in sector.cat.categories]
+    models = [sector_models.get(name, default) for name in names] + [default]
+    codes = sector.cat.codes.to_numpy()
+    codes = np.where(codes < 0, len(names), codes)  # missing sector: the default model
+    width = max(len(model) for model in models)
+    values, kinds, active = _model_arrays(models, width)
+
+    reported = real_df["estimated_annual_tco2e_avoided_k"].to_numpy(dtype=float)
+    low_impact = np.empty((len(real_df), width))
+    high_impact = np.empty((len(real_df), width))
+    for start in range(0, len(real_df), CHUNK_ROWS):
+        rows = codes[start:start + CHUNK_ROWS]
+        inputs = _perturb(values["base"][rows], values["low"][rows], values["high"][rows])
+        relative = evaluate(inputs, kinds[rows][:, None, :])
+        impact = reported[start:start + CHUNK_ROWS, None] * relative / relative[:, :1]
+        low_impact[start:start + CHUNK_ROWS] = impact[:, 1:1 + width]
+        high_impact[start:start + CHUNK_ROWS] = impact[:, 1 + width:]
+
+    swing = np.where(active[codes], np.abs(high_impact - low_impact), -1.0)
+    return {
+        "models": models,
+        "codes": codes,
+        "values": values,
+        "reported": reported,
+        "low_impact": low_impact,
+        "high_impact": high_impact,
+        # Drivers of each company, largest swing first; padding sorts last
+        "ranking": np.argsort(-swing, axis=1, kind="stable"),
+        "swing": swing,
+    }
+
+
+def company_tornado(sensitivity, position):
+    """The drivers of the `position`-th company, largest swing first."""
+    code = sensitivity["codes"][position]
+    model = list(sensitivity["models"][code].values())
+    slots = [slot for slot in sensitivity["ranking"][position] if slot < len(model)]
+    base = sensitivity["reported"][position]
+    low = sensitivity["low_impact"][position, slots]
+    high = sensitivity["high_impact"][position, slots]
+    return pd.DataFrame({
+        "driver": [model[slot]["label"] for slot in slots],
+        "low_input": sensitivity["values"]["low"][code, slots],
+        "base_input": sensitivity["values"]["base"][code, slots],
+        "high_input": sensitivity["values"]["high"][code, slots],
+        "low_impact": low,
+        "high_impact": high,
+        # Rounded so a driver at its base value reads 0%, not -0%
+        "low_change": np.round((low / base - 1) * 100, 9) + 0.0 if base else np.nan,
+        "high_change": np.round((high / base - 1) * 100, 9) + 0.0 if base else np.nan,
+        "swing": sensitivity["swing"][position, slots],
+    })
@@ -0,0 +1,189 @@
+"""Append-only history of the real portfolio CSV.
+
+    python snapshot_history.py                         # record the current CSV
+    python snapshot_history.py --csv old.csv --as-of 2025-06-30
+
+Each version of the CSV that differs from the one before it is recorded as a
+dated snapshot (a CSV reverted to an earlier version is recorded again): one
+Parquet file under HISTORY_DIR named <timestamp>-<content digest>.parquet,
+holding the company name and the tracked MEASURES sorted by company. Files
+are only ever added, never rewritten, so a snapshot is read at most once per
+process.
+
+The portfolio totals of each snapshot are stored in its file footer, so the
+per-snapshot totals behind the trend badges and the history chart come from
+footers alone, however many companies there are. Quarter-over-quarter and
+year-over-year changes compare the latest snapshot with the last one taken at
+least a quarter (a year) earlier: two snapshots, however long the history.
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from portfolio_store import read_typed_csv, source_path, source_stamp
+
+HISTORY_DIR = "portfolio_history"
+MEASURES = ["funding_raised_m", "employees", "estimated_annual_tco2e_avoided_k"]
+# Rows per row group; sorted by company, so a company lookup reads one group
+ROW_GROUP_ROWS = 65_536
+QUARTER = pd.DateOffset(months=3)
+YEAR = pd.DateOffset(years=1)
+
+_TOTALS_KEY = b"galvanize.totals"
+_STAMP_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def _snapshot_name(taken, digest):
+    return f"{taken.strftime(_STAMP_FORMAT)}-{digest}.parquet"
+
+
+def snapshots(history_dir=HISTORY_DIR):
+    """[(taken, digest, path)] of the recorded snapshots, oldest first."""
+    try:
+        names = os.listdir(history_dir)
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        taken, _, digest = stem.partition("-")
+        if ext != ".parquet" or not digest:
+            continue  # including in-progress .tmp files
+        try:
+            taken = pd.Timestamp(datetime.strptime(taken, _STAMP_FORMAT).replace(tzinfo=timezone.utc))
+        except ValueError:
+            continue
+        found.append((taken, digest, os.path.join(history_dir, name)))
+    return sorted(found)
+
+
+def version(history_dir=HISTORY_DIR):
+    """Cache key for the history: the snapshot count and the latest one.
+    Snapshots are only added, so this changes exactly when one is."""
+    found = snapshots(history_dir)
+    return f"{len(found)}-{os.path.basename(found[-1][2])}" if found else "0"
+
+
+def record(df, stamp, history_dir=HISTORY_DIR, taken=None):
+    """Record `df` as the snapshot of the CSV with `stamp`
+    (portfolio_store.source_stamp), taken at `taken` (default: the CSV's
+    mtime). Content unchanged since the last snapshot taken by then isn't
+    recorded again. Returns the snapshot's path."""
+    if taken is None:
+        taken = pd.Timestamp(stamp["mtime_ns"], unit="ns", tz="UTC")
+    earlier = [(digest, path) for when, digest, path in snapshots(history_dir) if when <= taken]
+    if earlier and earlier[-1][0] == stamp["digest"]:
+        return earlier[-1][1]
+
+    frame = df[["company"] + MEASURES].sort_values("company", kind="stable")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    totals = {measure: float(frame[measure].sum()) for measure in MEASURES}
+    totals["companies"] = len(frame)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_TOTALS_KEY] = json.dumps(totals).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(history_dir, exist_ok=True)
+    path = os.path.join(history_dir, _snapshot_name(taken, stamp["digest"]))
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_ROWS, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+# path -> totals; snapshot files never change, so each footer is read once
+_totals_memo = {}
+
+
+def _snapshot_totals(path):
+    totals = _totals_memo.get(path)
+    if totals is None:
+        metadata = pq.read_schema(path).metadata or {}
+        totals = json.loads(metadata[_TOTALS_KEY])
+        _totals_memo[path] = totals
+    return totals
+
+
+def totals(history_dir=HISTORY_DIR):
+    """Portfolio totals of each snapshot, indexed by when it was taken."""
+    found = snapshots(history_dir)
+    frame = pd.DataFrame(
+        [_snapshot_totals(path) for _, _, path in found],
+        index=pd.DatetimeIndex([taken for taken, _, _ in found], name="taken"),
+        columns=MEASURES + ["companies"],
+    )
+    return frame
+
+
+def _baseline_position(taken, offset):
+    # The last snapshot at least `offset` older than the latest one
+    position = taken.searchsorted(taken[-1] - offset, side="right") - 1
+    return position if position >= 0 else None
+
+
+def changes(totals_frame, offset=QUARTER):
+    """Fractional change of each measure's total between the latest snapshot
+    and the last one at least `offset` older, or None without one."""
+    if totals_frame.empty:
+        return None
+    position = _baseline_position(totals_frame.index, offset)
+    if position is None:
+        return None
+    latest, baseline = totals_frame.iloc[-1], totals_frame.iloc[position]
+    return {
+        "since": totals_frame.index[position],
+        **{measure: latest[measure] / baseline[measure] - 1 if baseline[measure] else None for measure in MEASURES},
+    }
+
+
+def _read_snapshot(path):
+    return pq.read_table(path).to_pandas().drop_duplicates("company").set_index("company")
+
+
+def company_changes(history_dir=HISTORY_DIR, offset=QUARTER):
+    """Per-company fractional change of each measure, as `changes` but for
+    every company of the latest snapshot (NaN for companies new since)."""
+    found = snapshots(history_dir)
+    if not found:
+        return None
+    position = _baseline_position(pd.DatetimeIndex([taken for taken, _, _ in found]), offset)
+    if position is None:
+        return None
+    latest = _read_snapshot(found[-1][2])
+    baseline = _read_snapshot(found[position][2]).reindex(latest.index)
+    return latest[MEASURES] / baseline[MEASURES].where(baseline[MEASURES] != 0) - 1
+
+
+def company_history(company, history_dir=HISTORY_DIR):
+    """One company's measures in every snapshot, indexed by when it was taken.
+    Only the row groups whose company range covers it are read."""
+    rows = []
+    for taken, _, path in snapshots(history_dir):
+        table = pq.read_table(path, filters=[("company", "=", company)], columns=MEASURES)
+        if table.num_rows:
+            rows.append((taken, table.slice(0, 1).to_pylist()[0]))
+    return pd.DataFrame(
+        [values for _, values in rows],
+        index=pd.DatetimeIndex([taken for taken, _ in rows], name="taken"),
+        columns=MEASURES,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=source_path("real"), help="a version of the real portfolio CSV")
+    parser.add_argument("--as-of", help="date the snapshot describes (default: the file's mtime)")
+    parser.add_argument("--history", default=HISTORY_DIR)
+    args = parser.parse_args()
+
+    taken = pd.Timestamp(args.as_of, tz="UTC") if args.as_of else None
+    print(record(read_typed_csv("real", args.csv), source_stamp(args.csv), args.history, taken))
+
+
+if __name__ == "__main__":
+    main()
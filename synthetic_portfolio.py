@@ -0,0 +1,261 @@
+"""Generate synthetic portfolios matching the three CSV schemas.
+
+    python synthetic_portfolio.py                      # 10, 1k, 100k and 1M rows
+    python synthetic_portfolio.py --rows 1000 --out bench_data
+
+Each size is written to <out>/<rows>/ using the same file names as the real
+data, so the directory can be pointed at with portfolio_store.load_dataset.
+All files describe the same companies, as in the real data. A share of the
+sandbox companies also get a yearly cash-flow schedule whose IRR is their
+stored IRR.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from portfolio_store import DATASETS
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+# Share of sandbox companies with a cash-flow schedule, and its length in years
+CASHFLOW_SHARE = 0.5
+CASHFLOW_YEARS = (7, 12)
+
+# sector -> (weight, [(subsector, scale_indicator, typical scale value)])
+SECTORS = {
+    "Energy": (0.25, [
+        ("Geothermal", "MW capacity", 300),
+        ("Clean energy infrastructure", "MW capacity", 150),
+        ("Long-duration storage", "MWh deployed", 800),
+    ]),
+    "Software": (0.30, [
+        ("Carbon accounting", "Enterprise customers", 400),
+        ("ESG data", "Enterprise customers", 250),
+        ("Supply chain sustainability", "Supply chain nodes", 20_000),
+    ]),
+    "Agriculture": (0.15, [
+        ("Ag carbon MRV", "Acres monitored", 3_000_000),
+        ("Ag-sensing", "Acres covered", 1_000_000),
+    ]),
+    "Industry": (0.20, [
+        ("Cement decarbonization", "Plants optimized", 40),
+        ("Mining optimization", "Mining operations", 30),
+        ("Green steel", "Plants optimized", 10),
+    ]),
+    "Transportation": (0.10, [
+        ("Transit optimization", "Annual riders", 2_000_000),
+        ("Fleet electrification", "Vehicles electrified", 5_000),
+    ]),
+}
+
+COUNTRIES = (["USA", "Germany", "Australia", "United Kingdom", "France", "Canada", "India"],
+             [0.55, 0.12, 0.08, 0.08, 0.06, 0.06, 0.05])
+
+STAGES = (["Early", "Growth", "Mature"], [0.35, 0.5, 0.15])
+STAGE_FUNDING_MEDIAN = {"Early": 25.0, "Growth": 150.0, "Mature": 450.0}  # $M
+STAGE_RISK = {
+    "Early": (["Low", "Medium", "Medium-High", "High"], [0.1, 0.3, 0.35, 0.25]),
+    "Growth": (["Low", "Medium", "Medium-High", "High"], [0.3, 0.45, 0.2, 0.05]),
+    "Mature": (["Low", "Medium", "Medium-High", "High"], [0.2, 0.4, 0.25, 0.15]),
+}
+RISK_IRR = {"Low": 27.0, "Medium": 23.0, "Medium-High": 20.0, "High": 16.0}
+
+ARCHETYPES = {
+    "Energy": ["Infrastructure + Ops Tech", "Clean Energy Infrastructure"],
+    "Software": ["Climate Data SaaS", "Supply Chain Data"],
+    "Agriculture": ["Ag Data Platform", "Hardware-Enabled Data"],
+    "Industry": ["Industrial Software", "Hardware-Enabled Data"],
+    "Transportation": ["Transit Optimization SaaS"],
+}
+
+NAME_HEADS = ["Terra", "Volt", "Carbo", "Helio", "Aqua", "Geo", "Zephyr", "Lumen", "Verda", "Flux",
+              "Nova", "Boreal", "Sol", "Kinet", "Ferro", "Hydra", "Cirrus", "Atlas", "Ember", "Tidal"]
+NAME_TAILS = ["grid", "works", "loop", "path", "sense", "metrics", "forge", "core", "field", "wave",
+              "stack", "shift", "labs", "scale", "flow", "mesh", "ledger", "cycle", "point", "base"]
+
+NOTE_TEMPLATES = [
+    "{sub} platform for {country} customers",
+    "Next-gen {sub} developer",
+    "AI-powered {sub} software",
+    "{sub} measurement and verification",
+    "Hardware and software for {sub}",
+]
+
+INSIGHT_TEMPLATES = [
+    "Atoms+bits model in {sub}. Recurring data revenue on installed hardware.",
+    "Capital-light {sub} play with regulatory tailwinds.",
+    "Infrastructure-heavy {sub} with long-dated offtake contracts.",
+    "Data moat in {sub}: measurement becomes the product.",
+]
+
+
+def _company_names(rows):
+    heads = np.array(NAME_HEADS)
+    tails = np.array(NAME_TAILS)
+    idx = np.arange(rows)
+    combos = len(heads) * len(tails)
+    names = pd.Series(heads[idx % len(heads)]).str.cat(pd.Series(tails[(idx // len(heads)) % len(tails)]))
+    # Past the first few hundred names add a numeric suffix to keep them unique
+    suffix = idx // combos
+    return names.where(suffix == 0, names + " " + pd.Series(suffix).astype(str)).to_numpy()
+
+
+def _templated(templates, rng, subsectors, countries=None):
+    choice = rng.integers(0, len(templates), len(subsectors))
+    if countries is None:
+        countries = subsectors
+    out = np.empty(len(subsectors), dtype=object)
+    for i, template in enumerate(templates):
+        mask = choice == i
+        leading = template.startswith("{sub}")
+        out[mask] = [template.format(sub=sub if leading else sub.lower(), country=country)
+                     for sub, country in zip(subsectors[mask], countries[mask])]
+    return out
+
+
+def _cashflows(sandbox_df, rng):
+    # Invest in year 0, small growing distributions from year 2, and an exit
+    # in the last year sized so the schedule's IRR is the stored IRR
+    chosen = np.flatnonzero(rng.random(len(sandbox_df)) < CASHFLOW_SHARE)
+    investment = sandbox_df["Investment ($M)"].to_numpy()[chosen]
+    rate = sandbox_df["IRR (%)"].to_numpy()[chosen] / 100
+    distribution = investment / sandbox_df["Payback Period (years)"].to_numpy()[chosen] * 0.5
+    horizon = rng.integers(CASHFLOW_YEARS[0], CASHFLOW_YEARS[1] + 1, len(chosen))
+
+    years = np.arange(CASHFLOW_YEARS[1] + 1)
+    flows = np.where(
+        (years >= 2) & (years < horizon[:, None]),
+        distribution[:, None] * (years - 1) / (horizon[:, None] / 2),
+        0.0,
+    )
+    flows[:, 0] = -investment
+    flows = np.round(flows, 2)
+    discount = (1 + rate[:, None]) ** -years
+    exit_value = -(flows * discount).sum(axis=1) / discount[np.arange(len(chosen)), horizon]
+    flows[np.arange(len(chosen)), horizon] = np.round(exit_value.clip(0), 2)
+
+    row, year = np.nonzero(flows)
+    return pd.DataFrame({
+        "Company": sandbox_df["Company"].to_numpy()[chosen][row],
+        "Year": year,
+        "Cash Flow ($M)": flows[row, year],
+    })
+
+
+def generate(rows, seed=42):
+    """Return (real_df, sandbox_df, thesis_df, cashflows_df) for `rows` companies."""
+    rng = np.random.default_rng(seed)
+
+    sector_names = list(SECTORS)
+    sector_weights = np.array([SECTORS[s][0] for s in sector_names])
+    sector = np.array(sector_names)[rng.choice(len(sector_names), rows, p=sector_weights / sector_weights.sum())]
+
+    subsector = np.empty(rows, dtype=object)
+    scale_indicator = np.empty(rows, dtype=object)
+    scale_typical = np.empty(rows)
+    for name in sector_names:
+        mask = sector == name
+        options = SECTORS[name][1]
+        pick = rng.integers(0, len(options), mask.sum())
+        subsector[mask] = np.array([o[0] for o in options], dtype=object)[pick]
+        scale_indicator[mask] = np.array([o[1] for o in options], dtype=object)[pick]
+        scale_typical[mask] = np.array([o[2] for o in options])[pick]
+
+    country = np.array(COUNTRIES[0])[rng.choice(len(COUNTRIES[0]), rows, p=COUNTRIES[1])]
+    stage = np.array(STAGES[0])[rng.choice(len(STAGES[0]), rows, p=STAGES[1])]
+    funding_median = pd.Series(stage).map(STAGE_FUNDING_MEDIAN).to_numpy()
+
+    funding = np.round(funding_median * rng.lognormal(0.0, 0.6, rows)).clip(1)
+    employees = np.round(funding * rng.uniform(0.4, 2.5, rows) + rng.integers(5, 40, rows)).astype(int)
+    year_founded = np.where(stage == "Early", rng.integers(2018, 2024, rows), rng.integers(2008, 2020, rows))
+    tco2e = np.round(funding * rng.lognormal(np.log(2.5), 0.7, rows)).clip(5)
+    scale_value = np.round(scale_typical * rng.lognormal(0.0, 0.8, rows)).clip(1).astype(np.int64)
+    impact_lever = np.where(sector == "Software", "Enabling decarbonization", "Direct decarbonization")
+    software_direct = (sector == "Software") & (rng.random(rows) < 0.1)
+    impact_lever[software_direct] = "Direct decarbonization"
+
+    company = _company_names(rows)
+    notes = _templated(NOTE_TEMPLATES, rng, subsector, country)
+
+    real_df = pd.DataFrame({
+        "company": company,
+        "sector": sector,
+        "subsector": subsector,
+        "country": country,
+        "impact_lever": impact_lever,
+        "notes": notes,
+        "funding_raised_m": funding.astype(int),
+        "employees": employees,
+        "year_founded": year_founded,
+        "estimated_annual_tco2e_avoided_k": tco2e.astype(int),
+        "scale_indicator": scale_indicator,
+        "scale_value": scale_value,
+        "investment_stage": stage,
+    })
+
+    # Sandbox: a cheque into each company, with risk driven by stage
+    risk = np.empty(rows, dtype=object)
+    for name, (ratings, weights) in STAGE_RISK.items():
+        mask = stage == name
+        risk[mask] = np.array(ratings, dtype=object)[rng.choice(len(ratings), mask.sum(), p=weights)]
+    irr = pd.Series(risk).map(RISK_IRR).to_numpy() + rng.normal(0.0, 4.0, rows)
+    investment = np.round((funding * rng.uniform(0.02, 0.12, rows)).clip(2, 40) * 2) / 2
+    annual_k = np.round(tco2e * rng.uniform(0.2, 1.0, rows)).clip(1)
+    lifetime_years = rng.uniform(15, 30, rows)
+
+    sandbox_df = pd.DataFrame({
+        "Company": company,
+        "Sector": sector,
+        "Investment ($M)": investment,
+        "IRR (%)": np.round(irr.clip(5, 45), 1),
+        "Payback Period (years)": np.round((130 / irr.clip(5, 45)) + rng.normal(0, 0.5, rows), 1).clip(2, 15),
+        "Risk Rating": risk,
+        "Lifetime tCO2e Avoided (M)": np.round(annual_k * lifetime_years / 1000, 2),
+        "Annual tCO2e Avoided (K)": annual_k.astype(int),
+        "Stage": stage,
+    })
+
+    # Thesis scores in half-point steps on a 0-3 scale
+    scores = np.round(rng.uniform(0, 3, (rows, 3)) * 2) / 2
+    archetype = np.empty(rows, dtype=object)
+    for name, options in ARCHETYPES.items():
+        mask = sector == name
+        archetype[mask] = np.array(options, dtype=object)[rng.integers(0, len(options), mask.sum())]
+
+    thesis_df = pd.DataFrame({
+        "Company": company,
+        "Sector": sector,
+        "Hardware+Software": scores[:, 0],
+        "Capital Efficiency": scores[:, 1],
+        "Data Markets": scores[:, 2],
+        "Total Score": scores.sum(axis=1),
+        "Strategic Archetype": archetype,
+        "Key Insight": _templated(INSIGHT_TEMPLATES, rng, subsector),
+    })
+
+    return real_df, sandbox_df, thesis_df, _cashflows(sandbox_df, rng)
+
+
+def write(rows, out_dir, seed=42):
+    """Write the CSVs for `rows` companies to out_dir/<rows>/; returns that directory."""
+    target = os.path.join(out_dir, str(rows))
+    os.makedirs(target, exist_ok=True)
+    for name, df in zip(("real", "sandbox", "thesis", "cashflows"), generate(rows, seed)):
+        df.to_csv(os.path.join(target, DATASETS[name]["file"]), index=False)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--out", default="bench_data")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"{rows:>9,} rows -> {write(rows, args.out, args.seed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Table downloads in several formats.
+
+`export_bytes` writes a frame as CSV, gzip-compressed CSV, Parquet or Excel.
+Rows are written in chunks of CHUNK_ROWS, so a large frame is never turned
+into one giant string or Arrow table on top of the file being built. The app
+passes it to st.download_button as a callable, so nothing is written until
+the button is clicked.
+
+Excel is written with XlsxWriter (a requirement), or openpyxl if that is what
+is installed; without either the format is not offered.
+"""
+import gzip
+import io
+from importlib.util import find_spec
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 100_000
+# Rows per worksheet, leaving one for the header
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def _csv(frame, stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    for start in range(0, max(len(frame), 1), CHUNK_ROWS):
+        frame.iloc[start:start + CHUNK_ROWS].to_csv(text, header=start == 0, index=False)
+    text.flush()
+    text.detach()
+
+
+def _csv_gz(frame, stream):
+    with gzip.GzipFile(fileobj=stream, mode="wb", mtime=0) as compressed:
+        _csv(frame, compressed)
+
+
+def _parquet(frame, stream):
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(stream, schema) as writer:
+        for start in range(0, len(frame), CHUNK_ROWS):
+            chunk = frame.iloc[start:start + CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _excel_engine():
+    for engine, module in (("xlsxwriter", "xlsxwriter"), ("openpyxl", "openpyxl")):
+        if find_spec(module) is not None:
+            return engine
+    return None
+
+
+def _excel(frame, stream):
+    with pd.ExcelWriter(stream, engine=_excel_engine()) as writer:
+        # Past Excel's row limit the rows continue on further sheets
+        for sheet, sheet_start in enumerate(range(0, max(len(frame), 1), EXCEL_MAX_ROWS), start=1):
+            sheet_name = "Data" if sheet == 1 else f"Data {sheet}"
+            sheet_stop = min(sheet_start + EXCEL_MAX_ROWS, len(frame))
+            for start in range(sheet_start, max(sheet_stop, sheet_start + 1), CHUNK_ROWS):
+                chunk = frame.iloc[start:min(start + CHUNK_ROWS, sheet_stop)]
+                first = start == sheet_start
+                chunk.to_excel(writer, sheet_name=sheet_name, index=False, header=first,
+                               startrow=0 if first else start - sheet_start + 1)
+
+
+# key: (label, file extension, mime type, writer)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv", _csv),
+    "csv.gz": ("CSV (gzip)", "csv.gz", "application/gzip", _csv_gz),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet", _parquet),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _excel),
+}
+
+
+def available_formats():
+    """FORMATS, less Excel when no Excel writer is installed."""
+    if _excel_engine() is None:
+        return {key: fmt for key, fmt in FORMATS.items() if key != "xlsx"}
+    return FORMATS
+
+
+def export_bytes(frame, fmt):
+    """The file contents of `frame` in format `fmt` (a FORMATS key)."""
+    stream = io.BytesIO()
+    FORMATS[fmt][3](frame, stream)
+    return stream.getvalue()